@@ -0,0 +1,148 @@
+"""
+Additive Index - Prefix + fuzzy lookup over the FSSAI regulation snapshot
+
+Resolves what users type in the additive modal or manual lookup:
+"E3", "e-211", "INS 211", "211", "sodium benz", "tartrazin".
+
+Built once from the regulation snapshot:
+
+- a sorted key list (codes, full names, name suffixes starting at each
+  word, parenthetical synonyms) searched with bisect for prefixes
+- a symmetric-delete table (every key word with one character removed)
+  for edit-distance-1 typos
+
+Both lookups touch a bounded number of entries, so query time does not
+grow with the size of the table.
+"""
+import bisect
+import re
+import threading
+from typing import Optional, Dict, Any, List, Set, Tuple
+
+from fssai_regulations import additive_dictionary, current_snapshot, snapshot_version
+
+# Match kinds, best first
+CODE_EXACT, CODE_PREFIX, NAME_PREFIX, WORD_PREFIX, FUZZY = range(5)
+MATCH_NAMES = ("code", "code_prefix", "name_prefix", "word_prefix", "fuzzy")
+
+MAX_PREFIX_SCAN = 200
+_CODE_QUERY_RE = re.compile(r"^(?:E|INS)?[\s\-]*(\d+[A-Z]?)(?:\s*\(?[IVX]+\)?)?$")
+_WORD_RE = re.compile(r"[a-z0-9]+")
+
+
+def normalize_code_query(text: str) -> Optional[str]:
+    """'INS 211', 'e-211', '211', 'E150d' -> 'E211' / 'E150D'; None if not code-like."""
+    match = _CODE_QUERY_RE.match(text.strip().upper())
+    return f"E{match.group(1)}" if match else None
+
+
+def _deletes(word: str) -> Set[str]:
+    return {word[:i] + word[i + 1:] for i in range(len(word))}
+
+
+class AdditiveIndex:
+    """Immutable lookup structure for one regulation snapshot."""
+
+    def __init__(self, snapshot: Dict[str, dict], version: str):
+        self.version = version
+        self._entries: Dict[str, Dict[str, Any]] = {}
+        keys: List[Tuple[str, int, str]] = []
+        self._fuzzy: Dict[str, Set[str]] = {}
+
+        for code, info in snapshot.items():
+            code = code.upper()
+            name = info.get("name", "Unknown")
+            self._entries[code] = {
+                "code": code,
+                "name": name,
+                "fssai_status": info.get("fssai_status"),
+                "category": info.get("category"),
+                "severity": info.get("severity") or 0,
+            }
+            keys.append((code, CODE_PREFIX, code))
+
+            # "Tartrazine (Yellow)" -> "tartrazine (yellow)", "tartrazine", "yellow"
+            lowered = name.lower()
+            synonyms = {lowered, re.sub(r"\s*\(.*?\)", "", lowered).strip()}
+            synonyms.update(s.strip() for s in re.findall(r"\((.*?)\)", lowered))
+            for synonym in filter(None, synonyms):
+                keys.append((synonym, NAME_PREFIX, code))
+                words = _WORD_RE.findall(synonym)
+                for i in range(1, len(words)):
+                    keys.append((" ".join(words[i:]), WORD_PREFIX, code))
+                for word in words:
+                    if len(word) >= 4:
+                        for variant in _deletes(word) | {word}:
+                            self._fuzzy.setdefault(variant, set()).add(code)
+
+        keys.sort()
+        self._keys = [k for k, _, _ in keys]
+        self._key_meta = [(kind, code) for _, kind, code in keys]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def _prefix(self, prefix: str, kinds: Tuple[int, ...], best: Dict[str, int]):
+        i = bisect.bisect_left(self._keys, prefix)
+        for j in range(i, min(i + MAX_PREFIX_SCAN, len(self._keys))):
+            if not self._keys[j].startswith(prefix):
+                break
+            kind, code = self._key_meta[j]
+            if kind in kinds and best.get(code, FUZZY + 1) > kind:
+                best[code] = kind
+
+    def search(self, query: str, limit: int = 10) -> List[Dict[str, Any]]:
+        """Best matches for a code/name fragment, most specific match first."""
+        query = query.strip()
+        if not query:
+            return []
+        best: Dict[str, int] = {}
+
+        code = normalize_code_query(query)
+        if code:
+            if code in self._entries:
+                best[code] = CODE_EXACT
+            self._prefix(code, (CODE_PREFIX,), best)
+
+        text = " ".join(_WORD_RE.findall(query.lower()))
+        if text:
+            self._prefix(text, (NAME_PREFIX, WORD_PREFIX), best)
+
+        # Fuzzy fallback: codes matched by more query words rank higher
+        word_hits: Dict[str, int] = {}
+        if not best:
+            for word in _WORD_RE.findall(query.lower()):
+                if len(word) < 4:
+                    continue
+                matched: Set[str] = set()
+                for variant in _deletes(word) | {word}:
+                    matched.update(self._fuzzy.get(variant, ()))
+                for match in matched:
+                    best[match] = FUZZY
+                    word_hits[match] = word_hits.get(match, 0) + 1
+
+        ranked = sorted(best.items(), key=lambda item: (
+            item[1], -word_hits.get(item[0], 0), -(self._entries[item[0]].get("severity") or 0), item[0],
+        ))
+        return [
+            dict(self._entries[c], match=MATCH_NAMES[kind])
+            for c, kind in ranked[:limit]
+        ]
+
+
+_index: Optional[AdditiveIndex] = None
+_index_for: Optional[str] = None  # regulation_version the index was built for
+_index_lock = threading.Lock()
+
+
+def get_additive_index() -> AdditiveIndex:
+    """Index for the regulation snapshot in effect, rebuilt when the regulations change."""
+    global _index, _index_for
+    version = additive_dictionary()[0]
+    if _index is None or _index_for != version:
+        with _index_lock:
+            if _index is None or _index_for != version:
+                snapshot = current_snapshot()
+                _index = AdditiveIndex(snapshot, snapshot_version(snapshot))
+                _index_for = version
+    return _index
@@ -0,0 +1,170 @@
+"""
+Admission Control - Per-client rate limiting and cold-path load shedding
+
+Two independent guards:
+
+- ClientRateLimiter: a token bucket per API key (X-API-Key, only keys
+  listed in API_KEYS) or client IP (the socket peer, or the hop recorded
+  by our own proxies when TRUSTED_PROXY_HOPS is set). Clients over their
+  budget get 429 with Retry-After before any work.
+- ColdPathGate: a global cap on concurrent Open Food Facts fetches. Cache
+  hits never take a slot, so they keep flowing while cold-path work is
+  saturated; excess cold requests are shed quickly with 503 + Retry-After
+  instead of queueing on the threadpool.
+
+Tuned via environment variables (see .env.example).
+"""
+import math
+import os
+import threading
+import time
+from collections import OrderedDict
+from contextlib import contextmanager
+from typing import Optional, Tuple
+
+
+class RateLimited(Exception):
+    """Client exceeded its request budget (HTTP 429)."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Rate limit exceeded")
+        self.retry_after = retry_after
+
+
+class Overloaded(Exception):
+    """Server is shedding cold-path work (HTTP 503)."""
+
+    def __init__(self, retry_after: float):
+        super().__init__("Server busy, please retry")
+        self.retry_after = retry_after
+
+
+def retry_after_header(seconds: float) -> str:
+    """Retry-After must be a whole number of seconds (at least 1)."""
+    return str(max(1, math.ceil(seconds)))
+
+
+# ============================================================
+# TOKEN BUCKETS
+# ============================================================
+class TokenBucket:
+    """Classic token bucket; not thread-safe on its own (guarded by the limiter)."""
+    __slots__ = ("rate", "capacity", "tokens", "updated")
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+
+    def take(self, cost: float = 1.0) -> Tuple[bool, float]:
+        """Try to spend `cost` tokens. Returns (allowed, seconds until allowed)."""
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+        if self.tokens >= cost:
+            self.tokens -= cost
+            return True, 0.0
+        return False, (cost - self.tokens) / self.rate
+
+
+class ClientRateLimiter:
+    """Token bucket per client key, with LRU eviction to bound memory."""
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 100_000):
+        self.rate = rate
+        self.burst = burst
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, client_key: str, cost: float = 1.0):
+        """Raise RateLimited if the client is over budget."""
+        if self.rate <= 0:
+            return
+        with self._lock:
+            bucket = self._buckets.get(client_key)
+            if bucket is None:
+                bucket = self._buckets[client_key] = TokenBucket(self.rate, self.burst)
+                if len(self._buckets) > self.max_clients:
+                    self._buckets.popitem(last=False)
+            else:
+                self._buckets.move_to_end(client_key)
+            allowed, wait = bucket.take(cost)
+        if not allowed:
+            raise RateLimited(wait)
+
+
+# Keys issued to partners; anything else in X-API-Key is ignored, so a
+# client can't mint fresh buckets by sending random keys
+API_KEYS = frozenset(k.strip() for k in os.getenv("API_KEYS", "").split(",") if k.strip())
+
+# Reverse proxies in front of us that append to X-Forwarded-For (Vercel: 1).
+# 0 trusts no header and keys on the socket peer.
+TRUSTED_PROXY_HOPS = int(os.getenv("TRUSTED_PROXY_HOPS", "0"))
+
+
+def client_ip(headers, client_host: Optional[str], trusted_hops: int = TRUSTED_PROXY_HOPS) -> str:
+    """
+    The client address as seen by our outermost trusted proxy. Hops left
+    of it in X-Forwarded-For are client-supplied and never trusted.
+    """
+    if trusted_hops > 0:
+        hops = [h.strip() for h in (headers.get("x-forwarded-for") or "").split(",") if h.strip()]
+        if len(hops) >= trusted_hops:
+            return hops[-trusted_hops]
+    return client_host or "unknown"
+
+
+def client_key(headers, client_host: Optional[str]) -> str:
+    """Validated API key if the client sent one, else the client IP."""
+    api_key = headers.get("x-api-key")
+    if api_key and api_key in API_KEYS:
+        return f"key:{api_key}"
+    return f"ip:{client_ip(headers, client_host)}"
+
+
+# ============================================================
+# COLD-PATH CONCURRENCY
+# ============================================================
+class ColdPathGate:
+    """Bounded concurrency for expensive upstream work, with fast rejection."""
+
+    def __init__(self, max_concurrent: int, wait_seconds: float, retry_after: float = 2.0):
+        self.max_concurrent = max_concurrent
+        self.wait_seconds = wait_seconds
+        self.retry_after = retry_after
+        self._semaphore = threading.BoundedSemaphore(max_concurrent)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.shed = 0
+
+    @contextmanager
+    def slot(self):
+        """Hold one cold-path slot for the duration of the block, or raise Overloaded."""
+        if not self._semaphore.acquire(timeout=self.wait_seconds):
+            with self._lock:
+                self.shed += 1
+            raise Overloaded(self.retry_after)
+        with self._lock:
+            self.in_flight += 1
+        try:
+            yield
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+            self._semaphore.release()
+
+    def stats(self) -> dict:
+        return {"max_concurrent": self.max_concurrent, "in_flight": self.in_flight, "shed": self.shed}
+
+
+rate_limiter = ClientRateLimiter(
+    rate=float(os.getenv("RATE_LIMIT_PER_SEC", "5")),
+    burst=float(os.getenv("RATE_LIMIT_BURST", "20")),
+)
+
+cold_path_gate = ColdPathGate(
+    max_concurrent=int(os.getenv("COLD_PATH_CONCURRENCY", "8")),
+    wait_seconds=int(os.getenv("COLD_PATH_WAIT_MS", "250")) / 1000,
+)
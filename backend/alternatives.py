@@ -0,0 +1,258 @@
+"""
+Healthier Alternatives - Lowest-concern products in the same category
+
+Rankings are precomputed, never built per request:
+
+- Supabase: `category_rankings` (one row per barcode, indexed on
+  (category_key, concern_score)), upserted by the background ingest and
+  by reenrich_job (supabase_migration_v7_category_rankings.sql)
+- Demo/offline: CategoryRanking, an in-memory sorted list per category,
+  updated incrementally as products are recorded
+
+Products stored before rankings existed are ranked by the backfill:
+
+    python alternatives.py --backfill
+"""
+import bisect
+import sys
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+from fssai_categories import normalize_segment
+from fssai_regulations import BANNED, RESTRICTED, NOT_LISTED, check_product_fssai
+
+
+def normalize_category(category: Optional[str]) -> Optional[str]:
+    """
+    Most specific OFF category as a stable key.
+    'Biscuits, Sweet biscuits' -> 'sweet biscuits'; 'en:snacks,en:potato-chips' -> 'potato chips'
+    """
+    if not category:
+        return None
+    parts = [p.strip() for p in category.split(",") if p.strip()]
+    if not parts:
+        return None
+    return normalize_segment(parts[-1]) or None
+
+
+def concern_score(findings: List[dict]) -> int:
+    """
+    Single sortable number for "how worrying are this product's additives"
+    (lower is better). Banned additives dominate, then restricted ones by
+    severity, then everything else by severity.
+    """
+    score = 0
+    for f in findings:
+        if f["fssai_status"] == BANNED:
+            score += 1000
+        elif f["fssai_status"] in (RESTRICTED, NOT_LISTED):
+            score += 10 * f["severity"]
+        else:
+            score += f["severity"]
+    return score
+
+
+def ranking_row(barcode: str, product: Dict[str, Any], findings: List[dict]) -> Optional[Dict[str, Any]]:
+    """Row for category_rankings, or None if the product has no usable category."""
+    category_key = normalize_category(product.get("category"))
+    if not category_key:
+        return None
+    return {
+        "barcode": barcode,
+        "category_key": category_key,
+        "concern_score": concern_score(findings),
+        "product_name": product.get("product_name"),
+        "brand": product.get("brand"),
+    }
+
+
+# ============================================================
+# IN-MEMORY RANKING (demo / offline mode)
+# ============================================================
+class CategoryRanking:
+    """Per-category sorted (concern_score, barcode) lists with O(log n) updates."""
+
+    def __init__(self):
+        self._by_category: Dict[str, List[Tuple[int, str]]] = {}
+        self._rows: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+
+    def upsert(self, row: Dict[str, Any]):
+        with self._lock:
+            old = self._rows.get(row["barcode"])
+            if old:
+                ranked = self._by_category[old["category_key"]]
+                i = bisect.bisect_left(ranked, (old["concern_score"], old["barcode"]))
+                if i < len(ranked) and ranked[i][1] == old["barcode"]:
+                    ranked.pop(i)
+            self._rows[row["barcode"]] = row
+            bisect.insort(self._by_category.setdefault(row["category_key"], []),
+                          (row["concern_score"], row["barcode"]))
+
+    def get(self, barcode: str) -> Optional[Dict[str, Any]]:
+        return self._rows.get(barcode)
+
+    def top(self, category_key: str, limit: int, exclude: Optional[str] = None) -> List[Dict[str, Any]]:
+        results = []
+        for _, barcode in self._by_category.get(category_key, ()):
+            if barcode == exclude:
+                continue
+            results.append(self._rows[barcode])
+            if len(results) >= limit:
+                break
+        return results
+
+
+_local_ranking: Optional[CategoryRanking] = None
+
+
+def get_local_ranking() -> CategoryRanking:
+    """Ranking over the demo catalog (built on first use)."""
+    global _local_ranking
+    if _local_ranking is None:
+        from demo_data import DEMO_PRODUCTS
+
+        ranking = CategoryRanking()
+        for barcode, product in DEMO_PRODUCTS.items():
+            row = ranking_row(barcode, product, check_product_fssai(product.get("additives", []), product.get("category")))
+            if row:
+                ranking.upsert(row)
+        _local_ranking = ranking
+    return _local_ranking
+
+
+# ============================================================
+# SUPABASE
+# ============================================================
+def record_product_ranking(supabase, barcode: str, product: Dict[str, Any], findings: List[dict]):
+    """Upsert one product's ranking row (called from the background ingest)."""
+    row = ranking_row(barcode, product, findings)
+    if row:
+        supabase.table("category_rankings").upsert(row, on_conflict="barcode").execute()
+
+
+def _supabase_alternatives(barcode: str, category_key: Optional[str], limit: int) -> Dict[str, Any]:
+    from database import supabase
+
+    current = supabase.table("category_rankings") \
+        .select("category_key, concern_score") \
+        .eq("barcode", barcode) \
+        .limit(1) \
+        .execute().data
+    if not category_key:
+        if not current:
+            return {"barcode": barcode, "category": None, "alternatives": []}
+        category_key = current[0]["category_key"]
+
+    query = supabase.table("category_rankings") \
+        .select("barcode, product_name, brand, concern_score") \
+        .eq("category_key", category_key) \
+        .neq("barcode", barcode) \
+        .order("concern_score") \
+        .order("barcode") \
+        .limit(limit)
+    if current:
+        query = query.lte("concern_score", current[0]["concern_score"])
+    return {"barcode": barcode, "category": category_key, "alternatives": query.execute().data or []}
+
+
+def _local_alternatives(barcode: str, category_key: Optional[str], limit: int) -> Dict[str, Any]:
+    ranking = get_local_ranking()
+    current = ranking.get(barcode)
+    if not category_key:
+        if not current:
+            return {"barcode": barcode, "category": None, "alternatives": []}
+        category_key = current["category_key"]
+
+    candidates = ranking.top(category_key, limit, exclude=barcode)
+    if current:
+        candidates = [c for c in candidates if c["concern_score"] <= current["concern_score"]]
+    return {
+        "barcode": barcode,
+        "category": category_key,
+        "alternatives": [
+            {k: c[k] for k in ("barcode", "product_name", "brand", "concern_score")}
+            for c in candidates
+        ],
+    }
+
+
+def get_alternatives(
+    barcode: str,
+    category: Optional[str] = None,
+    limit: int = 5,
+    demo: bool = False,
+) -> Dict[str, Any]:
+    """
+    Top-N lowest-concern products sharing the scanned product's category,
+    never worse than the scanned product itself.
+
+    Args:
+        barcode: Canonical barcode of the scanned product
+        category: Optional OFF category string (for products not ranked yet)
+    """
+    category_key = normalize_category(category)
+    if demo:
+        return _local_alternatives(barcode, category_key, limit)
+    return _supabase_alternatives(barcode, category_key, limit)
+
+
+# ============================================================
+# BACKFILL (existing catalog)
+# ============================================================
+def backfill_rankings(page_size: int = 200) -> Dict[str, int]:
+    """
+    Upsert a ranking row for every stored product, streaming the enriched
+    catalog (catalog_export) and writing one upsert per page. Safe to
+    re-run: rows are keyed by barcode.
+    """
+    from catalog_export import iter_catalog_records
+    from database import supabase
+
+    totals = {"scanned": 0, "ranked": 0}
+    rows: List[Dict[str, Any]] = []
+
+    def flush():
+        if rows:
+            supabase.table("category_rankings").upsert(rows, on_conflict="barcode").execute()
+            totals["ranked"] += len(rows)
+            rows.clear()
+            print(f"⏳ Rankings backfill: {totals['ranked']}/{totals['scanned']} products ranked")
+
+    for record in iter_catalog_records(page_size=page_size, demo=False):
+        totals["scanned"] += 1
+        row = ranking_row(record["barcode"], record, record["fssai"]["findings"])
+        if row:
+            rows.append(row)
+        if len(rows) >= page_size:
+            flush()
+    flush()
+
+    print(f"✅ Rankings backfill finished: {totals}")
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from dotenv import load_dotenv
+    from fssai_regulations import init_fssai_supabase
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Category rankings for healthier alternatives")
+    parser.add_argument("--backfill", action="store_true", help="Rank every stored product")
+    parser.add_argument("--page-size", type=int, default=200)
+    args = parser.parse_args(argv)
+
+    if not args.backfill:
+        parser.print_help()
+        return 2
+    init_fssai_supabase()
+    started = time.monotonic()
+    backfill_rankings(page_size=args.page_size)
+    print(f"⏱️ Took {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
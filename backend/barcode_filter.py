@@ -0,0 +1,273 @@
+"""
+Barcode Filter - Per-worker Bloom filter of stored barcodes
+
+Each worker keeps a Bloom filter of stored barcodes, sized from an
+estimated row count and filled by streaming the `barcodes` table in
+keyset pages. It is updated in-process on every ingest, catches up on
+barcodes other workers stored every BARCODE_FILTER_SYNC_S (rows by
+`created_at`, supabase_migration_v15_barcode_created_at.sql) and is
+rebuilt every BARCODE_FILTER_REFRESH_S.
+
+Lookups trust it: a miss goes straight to Open Food Facts without
+touching Supabase. A barcode another worker stored within the last sync
+interval can miss here; it costs one OFF fetch, and ingestion is
+idempotent. BARCODE_FILTER_CONFIRM_MISSES=true instead confirms each
+miss with an indexed existence check (stale_misses counts misses that
+turned out to be stored).
+
+Until the first build finishes every barcode is "maybe present".
+"""
+import hashlib
+import math
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Optional, Dict, Any, Set
+
+# Re-read this far behind the sync watermark: rows committed late can
+# carry a created_at earlier than ones already seen
+_SYNC_OVERLAP = timedelta(seconds=60)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over strings (double hashing on blake2b)."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        capacity = max(1, capacity)
+        self.capacity = capacity
+        self.error_rate = error_rate
+        self.num_bits = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+        self.count = 0
+        self._bits = bytearray((self.num_bits + 7) // 8)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode(), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def add(self, key: str):
+        for pos in self._positions(key):
+            self._bits[pos >> 3] |= 1 << (pos & 7)
+        self.count += 1
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[pos >> 3] & (1 << (pos & 7)) for pos in self._positions(key))
+
+    def estimated_error_rate(self) -> float:
+        """False-positive rate at the current fill."""
+        return (1 - math.exp(-self.num_hashes * self.count / self.num_bits)) ** self.num_hashes
+
+    def size_bytes(self) -> int:
+        return len(self._bits)
+
+
+class BarcodeFilter:
+    """
+    Membership filter for stored barcodes. Rebuilds swap in a fresh
+    filter atomically; barcodes added while a rebuild streams are replayed
+    into the new filter before the swap, so none are lost.
+    """
+
+    def __init__(self, error_rate: float = 0.001, min_capacity: int = 100_000,
+                 page_size: int = 1000, refresh_seconds: float = 3600,
+                 sync_seconds: float = 30, confirm_misses: bool = False):
+        self.error_rate = error_rate
+        self.min_capacity = min_capacity
+        self.page_size = page_size
+        self.refresh_seconds = refresh_seconds
+        self.sync_seconds = sync_seconds
+        self.confirm_misses = confirm_misses
+        self._bloom: Optional[BloomFilter] = None
+        self._synced_through: Optional[str] = None
+        self._lock = threading.Lock()
+        self._added_during_build: Optional[Set[str]] = None
+        self._thread: Optional[threading.Thread] = None
+        self.built_at: Optional[float] = None
+        self.build_seconds: Optional[float] = None
+        self.builds = 0
+        self.build_errors = 0
+        self.syncs = 0
+        self.sync_errors = 0
+        self.misses = 0
+        self.stale_misses = 0
+
+    @property
+    def ready(self) -> bool:
+        return self._bloom is not None
+
+    def might_contain(self, barcode: str) -> bool:
+        """False when this worker's filter has not seen the barcode (stored within the last sync at most)."""
+        bloom = self._bloom
+        if bloom is None or barcode in bloom:
+            return True
+        self.misses += 1
+        return False
+
+    def add_stale(self, barcode: str):
+        """Record a confirmed miss that turned out to be stored (ingested elsewhere since the sync)."""
+        self.stale_misses += 1
+        self.add(barcode)
+
+    def add(self, barcode: str):
+        with self._lock:
+            if self._bloom is not None:
+                self._bloom.add(barcode)
+            if self._added_during_build is not None:
+                self._added_during_build.add(barcode)
+
+    def rebuild(self, supabase) -> int:
+        """Stream every stored barcode into a new filter and swap it in."""
+        started = time.monotonic()
+        with self._lock:
+            self._added_during_build = set()
+        try:
+            watermark = self._latest_created_at(supabase)
+            # Estimated count (planner statistics on large tables), with
+            # headroom for its error and for growth until the next rebuild
+            estimate = supabase.table("barcodes") \
+                .select("id", count="estimated") \
+                .limit(1) \
+                .execute().count or 0
+            bloom = BloomFilter(max(self.min_capacity, int(estimate * 1.5)), self.error_rate)
+
+            last = None
+            while True:
+                query = supabase.table("barcodes") \
+                    .select("barcode_number") \
+                    .order("barcode_number") \
+                    .limit(self.page_size)
+                if last is not None:
+                    query = query.gt("barcode_number", last)
+                rows = query.execute().data or []
+                for row in rows:
+                    bloom.add(row["barcode_number"])
+                if len(rows) < self.page_size:
+                    break
+                last = rows[-1]["barcode_number"]
+
+            with self._lock:
+                for barcode in self._added_during_build:
+                    bloom.add(barcode)
+                self._bloom = bloom
+                self._synced_through = watermark
+        finally:
+            with self._lock:
+                self._added_during_build = None
+
+        self.built_at = time.time()
+        self.build_seconds = round(time.monotonic() - started, 2)
+        self.builds += 1
+        print(f"✅ Barcode filter built: {bloom.count} barcodes, "
+              f"{bloom.size_bytes() // 1024} KiB, {self.build_seconds}s")
+        return bloom.count
+
+    @staticmethod
+    def _latest_created_at(supabase) -> Optional[str]:
+        """Newest barcodes.created_at, or None if the column is missing (no syncs)."""
+        try:
+            rows = supabase.table("barcodes") \
+                .select("created_at") \
+                .order("created_at", desc=True) \
+                .limit(1) \
+                .execute().data or []
+        except Exception as e:
+            print(f"⚠️ Barcode filter sync disabled until the next rebuild (barcodes.created_at): {e}")
+            return None
+        return rows[0]["created_at"] if rows else "1970-01-01T00:00:00+00:00"
+
+    def sync(self, supabase) -> int:
+        """Add barcodes stored since the last sync (by any worker); returns how many were new."""
+        bloom, since = self._bloom, self._synced_through
+        if bloom is None or since is None:
+            return 0
+        since = (datetime.fromisoformat(since) - _SYNC_OVERLAP).isoformat()
+        latest = self._synced_through
+        added = 0
+        offset = 0
+        while True:
+            rows = supabase.table("barcodes") \
+                .select("barcode_number, created_at") \
+                .gt("created_at", since) \
+                .order("created_at,barcode_number") \
+                .range(offset, offset + self.page_size) \
+                .execute().data or []
+            if not rows:
+                break
+            with self._lock:
+                for row in rows:
+                    if row["barcode_number"] not in bloom:
+                        bloom.add(row["barcode_number"])
+                        added += 1
+            latest = max(latest, rows[-1]["created_at"])
+            # Advance by what came back (postgrest-py range() end bound, see regional_rules)
+            offset += len(rows)
+        with self._lock:
+            if self._bloom is bloom:
+                self._synced_through = latest
+        self.syncs += 1
+        return added
+
+    def start(self, supabase):
+        """Build now (in the background), sync every sync_seconds and rebuild every refresh_seconds."""
+        if self._thread is not None:
+            return
+
+        def run():
+            while True:
+                if not self.ready or time.time() - (self.built_at or 0) >= self.refresh_seconds:
+                    try:
+                        self.rebuild(supabase)
+                    except Exception as e:
+                        self.build_errors += 1
+                        print(f"⚠️ Barcode filter build failed (lookups fall back to Supabase): {e}")
+                else:
+                    try:
+                        self.sync(supabase)
+                    except Exception as e:
+                        self.sync_errors += 1
+                        print(f"⚠️ Barcode filter sync failed: {e}")
+                # Retry a failed first build sooner than the regular refresh
+                time.sleep(min(self.sync_seconds, self.refresh_seconds) if self.ready
+                           else min(self.refresh_seconds, 60))
+
+        self._thread = threading.Thread(target=run, name="barcode-filter", daemon=True)
+        self._thread.start()
+
+    def stats(self) -> Dict[str, Any]:
+        bloom = self._bloom
+        return {
+            "ready": bloom is not None,
+            "barcodes": bloom.count if bloom else 0,
+            "capacity": bloom.capacity if bloom else None,
+            "size_bytes": bloom.size_bytes() if bloom else 0,
+            "hashes": bloom.num_hashes if bloom else None,
+            "estimated_error_rate": round(bloom.estimated_error_rate(), 6) if bloom else None,
+            "misses": self.misses,
+            "stale_misses": self.stale_misses,
+            "confirm_misses": self.confirm_misses,
+            "builds": self.builds,
+            "build_errors": self.build_errors,
+            "syncs": self.syncs,
+            "sync_errors": self.sync_errors,
+            "synced_through": self._synced_through,
+            "build_seconds": self.build_seconds,
+            "built_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(self.built_at)) if self.built_at else None,
+        }
+
+
+def barcode_filter_from_env() -> Optional[BarcodeFilter]:
+    """Filter configured from the environment, or None if BARCODE_FILTER=false."""
+    if os.getenv("BARCODE_FILTER", "true").lower() != "true":
+        return None
+    return BarcodeFilter(
+        error_rate=float(os.getenv("BARCODE_FILTER_ERROR_RATE", "0.001")),
+        min_capacity=int(os.getenv("BARCODE_FILTER_MIN_CAPACITY", "100000")),
+        page_size=int(os.getenv("BARCODE_FILTER_PAGE_SIZE", "1000")),
+        refresh_seconds=float(os.getenv("BARCODE_FILTER_REFRESH_S", "3600")),
+        sync_seconds=float(os.getenv("BARCODE_FILTER_SYNC_S", "30")),
+        confirm_misses=os.getenv("BARCODE_FILTER_CONFIRM_MISSES", "false").lower() == "true",
+    )
@@ -0,0 +1,208 @@
+"""
+Catalog Export - Stream the enriched product catalog as NDJSON
+
+Pages through `barcodes` (joined to `products`) with keyset pagination on
+barcodes.id, enriches each page with a few chunked bulk queries plus one
+batched FSSAI lookup, and yields NDJSON lines (optionally gzipped).
+Everything is a generator, so memory stays constant regardless of catalog
+size.
+
+Usage (CLI):
+    python catalog_export.py -o catalog.ndjson.gz --gzip
+    DEMO_MODE=true python catalog_export.py -o - | head
+"""
+import contextlib
+import json
+import os
+import sys
+import zlib
+from typing import Optional, Dict, Any, List, Iterator, Iterable
+
+from fssai_regulations import check_products_fssai, build_fssai_report, init_fssai_supabase
+
+DEFAULT_PAGE_SIZE = 200
+
+
+# ============================================================
+# PAGE SOURCES
+# ============================================================
+def _iter_demo_pages(page_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Demo mode: pages of demo products (already in response shape)."""
+    from demo_data import DEMO_PRODUCTS
+
+    page = []
+    for barcode in sorted(DEMO_PRODUCTS):
+        page.append(dict(DEMO_PRODUCTS[barcode]))
+        if len(page) >= page_size:
+            yield page
+            page = []
+    if page:
+        yield page
+
+
+def _iter_supabase_pages(page_size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Live mode: keyset-paginated pages of products built from normalized tables."""
+    from database import supabase
+
+    last_id = None
+    while True:
+        query = supabase.table("barcodes") \
+            .select("id, barcode_number, product_id, products(product_name, brand_name, category, nutrition)") \
+            .order("id") \
+            .limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        if not rows:
+            return
+
+        last_id = rows[-1]["id"]
+        yield _hydrate_page(supabase, rows)
+
+        if len(rows) < page_size:
+            return
+
+
+# Product ids per `in.(...)` filter: ~37 chars each keeps request URLs
+# well under proxy limits
+CHILD_ID_CHUNK = 50
+
+
+def _fetch_children(supabase, table: str, columns: str, product_ids: List[str],
+                    page_size: int = 1000) -> List[dict]:
+    """
+    Every `table` row for the given products. Ids go in chunks so the URL
+    stays short, and each chunk is keyset-paged on id so PostgREST's
+    max-rows cap can't silently truncate it.
+    """
+    rows: List[dict] = []
+    for start in range(0, len(product_ids), CHILD_ID_CHUNK):
+        chunk = product_ids[start:start + CHILD_ID_CHUNK]
+        last_id = None
+        while True:
+            query = supabase.table(table) \
+                .select(f"id, {columns}") \
+                .in_("product_id", chunk) \
+                .order("id") \
+                .limit(page_size)
+            if last_id is not None:
+                query = query.gt("id", last_id)
+            page = query.execute().data or []
+            rows.extend(page)
+            if len(page) < page_size:
+                break
+            last_id = page[-1]["id"]
+    return rows
+
+
+def _hydrate_page(supabase, rows: List[dict]) -> List[Dict[str, Any]]:
+    """Fetch ingredients, additives and flags for a whole page in bulk."""
+    product_ids = sorted({r["product_id"] for r in rows})
+
+    ingredients = _fetch_children(supabase, "ingredient_raw", "product_id, raw_text", product_ids)
+    additives = _fetch_children(supabase, "product_additives", "product_id, additives(code)", product_ids)
+    flags = _fetch_children(supabase, "product_flags", "product_id, flag_type, explanation, region", product_ids)
+
+    ingredients_by_product: Dict[str, str] = {}
+    for row in ingredients:
+        ingredients_by_product.setdefault(row["product_id"], row["raw_text"])
+
+    additives_by_product: Dict[str, List[str]] = {}
+    for row in additives:
+        additives_by_product.setdefault(row["product_id"], []).append(row["additives"]["code"])
+
+    flags_by_product: Dict[str, List[dict]] = {}
+    for row in flags:
+        row.pop("id")
+        product_id = row.pop("product_id")
+        flags_by_product.setdefault(product_id, []).append(row)
+
+    page = []
+    for r in rows:
+        product = r.get("products") or {}
+        product_id = r["product_id"]
+        page.append({
+            "barcode": r["barcode_number"],
+            "product_name": product.get("product_name"),
+            "brand": product.get("brand_name"),
+            "category": product.get("category"),
+            "ingredients": ingredients_by_product.get(product_id, "Ingredients not available"),
+            "additives": additives_by_product.get(product_id, []),
+            "flags": flags_by_product.get(product_id, []),
+            "nutrition": product.get("nutrition"),
+        })
+    return page
+
+
+# ============================================================
+# ENRICHMENT + SERIALIZATION
+# ============================================================
+def enrich_page(page: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Attach the `fssai` block to every product using one batched lookup."""
+    all_findings = check_products_fssai(
+        [p.get("additives", []) for p in page], [p.get("category") for p in page],
+    )
+    for product, findings in zip(page, all_findings):
+        product["fssai"] = build_fssai_report(findings, product.get("category"))
+    return page
+
+
+def iter_catalog_records(
+    page_size: int = DEFAULT_PAGE_SIZE,
+    demo: Optional[bool] = None,
+) -> Iterator[Dict[str, Any]]:
+    """Yield every catalog product, enriched, one page in memory at a time."""
+    if demo is None:
+        demo = os.getenv("DEMO_MODE", "false").lower() == "true"
+    pages = _iter_demo_pages(page_size) if demo else _iter_supabase_pages(page_size)
+    for page in pages:
+        yield from enrich_page(page)
+
+
+def iter_ndjson(records: Iterable[Dict[str, Any]], gzip: bool = False) -> Iterator[bytes]:
+    """Serialize records as NDJSON byte chunks, optionally as a gzip stream."""
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31) if gzip else None
+    for record in records:
+        line = json.dumps(record, ensure_ascii=False, separators=(",", ":")).encode("utf-8") + b"\n"
+        if compressor:
+            chunk = compressor.compress(line)
+            if chunk:
+                yield chunk
+        else:
+            yield line
+    if compressor:
+        yield compressor.flush()
+
+
+# ============================================================
+# CLI
+# ============================================================
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Export the enriched product catalog as NDJSON")
+    parser.add_argument("-o", "--output", default="-", help="Output file ('-' for stdout)")
+    parser.add_argument("--gzip", action="store_true", help="Gzip the output stream")
+    parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+    args = parser.parse_args(argv)
+
+    # Keep stdout clean for the NDJSON stream; status logs go to stderr
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            init_fssai_supabase()
+            records = iter_catalog_records(page_size=args.page_size)
+            for chunk in iter_ndjson(records, gzip=args.gzip):
+                out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+
+    print(f"✅ Catalog export complete: {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -4,7 +4,7 @@ Compatible with supabase-py 2.x
 """
 import os
 from dotenv import load_dotenv
-from supabase import create_client
+from supabase_pool import get_supabase
 
 # Load environment variables
 load_dotenv()
@@ -15,7 +15,7 @@ SUPABASE_KEY = os.getenv("SUPABASE_KEY")
 if not SUPABASE_URL or not SUPABASE_KEY:
     raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY in environment variables")
 
-# Create Supabase client
-supabase = create_client(SUPABASE_URL, SUPABASE_KEY)
+# Shared, pooled Supabase client (see supabase_pool.py)
+supabase = get_supabase()
 
 print(f"✅ Connected to Supabase: {SUPABASE_URL}")
@@ -2,6 +2,7 @@
 Demo/Offline Mode Data
 Mock product data for testing when Supabase/Open Food Facts are unavailable
 """
+import os
 
 DEMO_PRODUCTS = {
     "8901063010116": {
@@ -94,3 +95,11 @@ def get_demo_product(barcode: str):
 def get_all_demo_barcodes():
     """Get all available demo barcodes"""
     return {bc: p["product_name"] for bc, p in DEMO_PRODUCTS.items()}
+
+
+# Optional: pad the demo catalog with synthetic products for scale testing
+# (see synthetic_catalog.py). Must run before search/ranking indexes are built.
+if int(os.getenv("DEMO_SYNTHETIC_PRODUCTS", "0")) > 0:
+    from synthetic_catalog import load_into_demo
+
+    print(f"📋 Added {load_into_demo(int(os.environ['DEMO_SYNTHETIC_PRODUCTS']))} synthetic demo products")
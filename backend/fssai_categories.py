@@ -0,0 +1,239 @@
+"""
+FSSAI Food Categories - Category-aware additive rules
+
+An additive's verdict can depend on the food it is in: MSG is permitted
+in noodles but not in infant food, sodium nitrite only in meat products,
+potassium iodate is banned in bread but used to iodize salt. This module
+holds:
+
+- FOOD_CATEGORIES: a small normalized taxonomy following the FSSAI food
+  category system, with the OFF category keywords that map onto it
+- classify_category(): OFF category string -> taxonomy key
+- CATEGORY_RULES: (additive or functional class, food categories) ->
+  status / limit / note overrides
+- compile_rules(): expands CATEGORY_RULES against a regulation snapshot
+  into a flat {(code, food_category): override} table, so evaluating a
+  product is one dict probe per additive
+
+Only overrides live here; everything else comes from the product's base
+regulation entry (fssai_regulations).
+"""
+import hashlib
+import json
+import re
+from functools import lru_cache
+from typing import Optional, Dict, List, Tuple
+
+GENERAL = "general"  # category unknown / unmapped: base regulation applies
+ALL_OTHER = "*"      # in a rule: every mapped category not listed for that code
+
+# Bump when classify_category() maps the same strings differently, so
+# snapshots built with the old mapping are rebuilt
+CLASSIFIER_REVISION = 2
+
+# key -> (FSSAI food category number, label, OFF keywords)
+# A keyword listed under two categories maps to the first.
+FOOD_CATEGORIES: Dict[str, Tuple[str, str, Tuple[str, ...]]] = {
+    "infant_food": ("13.1", "Foods for infants and young children",
+                    ("infant", "infants", "baby food", "baby foods", "baby milk", "baby milks", "babies",
+                     "toddler", "toddlers", "infant formula", "infant formulas", "follow-on formula",
+                     "follow-on formulas", "weaning")),
+    "dairy": ("01", "Dairy products",
+              ("milk", "dairy", "dairies", "yogurt", "yoghurt", "curd", "cheese", "paneer", "dahi", "lassi")),
+    "fats_oils": ("02", "Fats and oils",
+                  ("oil", "oils", "ghee", "butter", "margarine", "vanaspati", "fats")),
+    "edible_ices": ("03", "Edible ices",
+                    ("ice cream", "ice creams", "frozen dessert", "frozen desserts", "kulfi")),
+    "fruit_veg": ("04", "Fruit and vegetable products",
+                  ("fruit", "fruits", "vegetable", "vegetables", "jam", "jams", "pickle", "pickles", "dried fruit",
+                   "peanut butter", "nut butter", "nut spread")),
+    "confectionery": ("05", "Confectionery",
+                      ("confectionery", "confectioneries", "candy", "candies", "chocolate", "chocolates",
+                       "sweets", "chewing gum", "toffee", "toffees")),
+    "cereal_products": ("06", "Cereals and cereal products",
+                        ("cereal", "cereals", "noodle", "noodles", "instant noodles", "pasta", "rice",
+                         "flour", "flours", "atta", "breakfast cereals", "oats")),
+    "bakery": ("07", "Bakery products",
+               ("bread", "breads", "biscuit", "biscuits", "cookie", "cookies", "cake", "cakes",
+                "bakery", "rusk", "rusks", "pastries")),
+    "meat": ("08", "Meat and meat products",
+             ("meat", "meats", "sausage", "sausages", "ham", "bacon", "salami", "chicken", "mutton", "poultry")),
+    "fish": ("09", "Fish and fish products",
+             ("fish", "fishes", "seafood", "seafoods", "prawn", "prawns", "shrimp")),
+    "sweeteners": ("11", "Sweeteners and honey",
+                   ("sugar", "sugars", "honey", "jaggery", "syrup", "syrups")),
+    "salts_sauces": ("12", "Salts, spices, soups and sauces",
+                     ("salt", "salts", "spice", "spices", "condiment", "condiments", "sauce", "sauces",
+                      "ketchup", "ketchups", "soup", "soups", "seasoning", "seasonings", "masala")),
+    "beverages": ("14", "Beverages",
+                  ("beverage", "beverages", "drink", "drinks", "juice", "juices", "soda", "sodas",
+                   "soft drinks", "carbonated drinks", "water", "waters", "tea", "teas", "coffee", "coffees")),
+    "savoury_snacks": ("15", "Ready-to-eat savouries",
+                       ("snack", "snacks", "salty snacks", "chips", "crisps", "namkeen", "bhujia", "nuts")),
+}
+
+# (additive code or functional class, food categories, override)
+# Overrides may set fssai_status, max_limit, fssai_note and severity.
+CATEGORY_RULES: List[Tuple[str, Tuple[str, ...], Dict[str, object]]] = [
+    ("class:flavour enhancer", ("infant_food",), {
+        "fssai_status": "banned", "max_limit": "0 (not permitted)", "severity": 4,
+        "fssai_note": "Not permitted in food for infants and young children.",
+    }),
+    ("class:synthetic colour", ("infant_food",), {
+        "fssai_status": "banned", "max_limit": "0 (not permitted)", "severity": 4,
+        "fssai_note": "Synthetic colours are not permitted in food for infants and young children.",
+    }),
+    ("class:artificial sweetener", ("infant_food",), {
+        "fssai_status": "banned", "max_limit": "0 (not permitted)", "severity": 4,
+        "fssai_note": "Artificial sweeteners are not permitted in food for infants and young children.",
+    }),
+    ("E250", ("meat", "fish"), {
+        "fssai_status": "restricted", "max_limit": "200 ppm",
+        "fssai_note": "Permitted in cured meat and fish products up to 200 ppm.",
+    }),
+    ("E250", (ALL_OTHER,), {
+        "fssai_status": "banned", "max_limit": "0 (not permitted in this food category)", "severity": 4,
+        "fssai_note": "Permitted only in certain meat products; not in this food category.",
+    }),
+    ("E251", ("meat", "fish"), {
+        "fssai_status": "restricted", "max_limit": "500 ppm",
+        "fssai_note": "Permitted in meat products up to 500 ppm.",
+    }),
+    ("E251", (ALL_OTHER,), {
+        "fssai_status": "banned", "max_limit": "0 (not permitted in this food category)", "severity": 4,
+        "fssai_note": "Permitted only in meat products; not in this food category.",
+    }),
+    ("E917", ("salts_sauces",), {
+        "fssai_status": "permitted", "max_limit": "As iodizing agent in salt", "severity": 1,
+        "fssai_note": "Permitted for salt iodization under separate regulations; banned as a bread additive.",
+    }),
+]
+
+_LANG_PREFIX_RE = re.compile(r"^[a-z]{2}:")
+_SEPARATOR_RE = re.compile(r"[\s_\-]+")
+
+
+def normalize_segment(text: str) -> str:
+    """One OFF category segment, lowercased without language prefix or separators ('en:potato-chips' -> 'potato chips')."""
+    return _SEPARATOR_RE.sub(" ", _LANG_PREFIX_RE.sub("", text.strip().lower())).strip()
+
+
+def _keyword_index() -> Dict[str, str]:
+    index: Dict[str, str] = {}
+    for key, (_, _, keywords) in FOOD_CATEGORIES.items():
+        for keyword in keywords:
+            index.setdefault(normalize_segment(keyword), key)
+    return index
+
+
+_KEYWORDS = _keyword_index()
+_INFANT_RE = re.compile(
+    r"\b(" + "|".join(re.escape(normalize_segment(k)) for k in FOOD_CATEGORIES["infant_food"][2]) + r")\b"
+)
+
+
+def _singular(word: str) -> str:
+    """Simple English plural -> singular ('honeys', 'candies', 'peaches')."""
+    if len(word) > 3 and word.endswith("ies"):
+        return word[:-3] + "y"
+    if len(word) > 3 and word.endswith("es") and word[:-2].endswith(("s", "x", "ch", "sh")):
+        return word[:-2]
+    if len(word) > 2 and word.endswith("s") and not word.endswith("ss"):
+        return word[:-1]
+    return word
+
+
+def _phrase_category(words: List[str]) -> Optional[str]:
+    phrase = " ".join(words)
+    key = _KEYWORDS.get(phrase)
+    if key is None and words[-1] != _singular(words[-1]):
+        key = _KEYWORDS.get(" ".join(words[:-1] + [_singular(words[-1])]))
+    return key
+
+
+def _segment_match(segment: str) -> Optional[Tuple[int, str]]:
+    """(words in the matched keyword, taxonomy key) for one normalized OFF category segment, or None."""
+    words = segment.split()
+    # Longest phrase first ("soft drinks" before "drinks"), then rightmost,
+    # since the head noun comes last ("fruit drinks" is a drink). Plural
+    # heads not listed as keywords fall back to their singular.
+    for size in range(len(words), 0, -1):
+        for start in range(len(words) - size, -1, -1):
+            key = _phrase_category(words[start:start + size])
+            if key:
+                return size, key
+    return None
+
+
+@lru_cache(maxsize=4096)
+def classify_category(category: Optional[str]) -> str:
+    """
+    FSSAI food category key for an OFF category string.
+    'Beverages, Fruit drinks' -> 'beverages'; 'en:baby-foods,en:cereals' -> 'infant_food'
+
+    Infant food wins wherever it appears (the strictest rules attach to
+    it); otherwise the segment with the most specific (longest) keyword
+    match decides, the last one on a tie: 'Instant noodles, Snacks' ->
+    'cereal_products'. Unmapped strings are GENERAL.
+    """
+    if not category:
+        return GENERAL
+    segments = [s for s in (normalize_segment(part) for part in category.split(",")) if s]
+    if any(_INFANT_RE.search(s) for s in segments):
+        return "infant_food"
+    best = None
+    for position, segment in enumerate(segments):
+        match = _segment_match(segment)
+        if match and (best is None or (match[0], position) > best[0]):
+            best = ((match[0], position), match[1])
+    return best[1] if best else GENERAL
+
+
+def category_label(key: str) -> Optional[str]:
+    entry = FOOD_CATEGORIES.get(key)
+    return entry[1] if entry else None
+
+
+def rules_version() -> str:
+    """Short content hash of CATEGORY_RULES, the taxonomy and the classifier revision."""
+    canonical = json.dumps([CATEGORY_RULES, FOOD_CATEGORIES, CLASSIFIER_REVISION], sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+def compile_rules(snapshot: Dict[str, dict]) -> Dict[Tuple[str, str], Dict[str, object]]:
+    """
+    Flatten CATEGORY_RULES into {(code, food_category): override} for the
+    codes in a regulation snapshot. Code rules take precedence over class
+    rules, and explicit categories over ALL_OTHER.
+    """
+    by_class: Dict[str, List[str]] = {}
+    for code, info in snapshot.items():
+        by_class.setdefault((info.get("category") or "").lower(), []).append(code)
+
+    table: Dict[Tuple[str, str], Dict[str, object]] = {}
+    explicit: Dict[str, set] = {}
+
+    def place(code: str, categories: Tuple[str, ...], override: Dict[str, object]):
+        for cat in categories:
+            if cat == ALL_OTHER:
+                continue
+            table[(code, cat)] = override
+            explicit.setdefault(code, set()).add(cat)
+
+    # Class rules first so code rules overwrite them
+    for target, categories, override in CATEGORY_RULES:
+        if target.startswith("class:"):
+            for code in by_class.get(target[len("class:"):], []):
+                place(code, categories, override)
+    for target, categories, override in CATEGORY_RULES:
+        if not target.startswith("class:"):
+            place(target.upper(), categories, override)
+
+    for target, categories, override in CATEGORY_RULES:
+        if ALL_OTHER not in categories or target.startswith("class:"):
+            continue
+        code = target.upper()
+        for cat in FOOD_CATEGORIES:
+            if cat not in explicit.get(code, ()):
+                table[(code, cat)] = override
+    return table
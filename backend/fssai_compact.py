@@ -0,0 +1,241 @@
+"""
+Compact FSSAI Regulation Table
+
+A read-only, memory-mappable encoding of the regulation snapshot:
+
+- every distinct string (names, categories, limits, notes) is stored once
+  in a string table and referenced by index
+- statuses are small integers (FssaiStatus)
+- each additive is a fixed-width record, sorted by code
+
+Built once into a file (FSSAI_TABLE_PATH) and mmap'd read-only by every
+uvicorn worker on the host, so the table lives in the shared page cache
+instead of being copied per process. Workers keep no per-process index
+or string table: the first lookup of a code binary-searches the mapped
+records and decodes its finding from the blob; the finding is cached on
+the table (one dict per additive looked up, at most len(table)), so
+later lookups are a single dict probe and allocate nothing. A new table
+version is a new table object, so the cache never outlives its version.
+
+File layout (little-endian):
+    header   MAGIC(8) version(12s) n_strings(u32) n_records(u32)
+    offsets  (n_strings + 1) x u32   byte offsets into the string blob
+    records  n_records x RECORD       sorted by code
+    blob     UTF-8 string data
+
+Build manually:
+    python fssai_compact.py /var/run/truth-lens/fssai.tbl
+"""
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from enum import IntEnum
+from typing import Optional, Dict, List, Callable
+
+MAGIC = b"FSSAIT01"
+HEADER = struct.Struct("<8s12sII")
+OFFSET = struct.Struct("<I")
+# code, name, status, severity, category, max_limit, health_concern, fssai_note
+RECORD = struct.Struct("<16sIBBIIII")
+
+
+class FssaiStatus(IntEnum):
+    PERMITTED = 0
+    RESTRICTED = 1
+    BANNED = 2
+    NOT_LISTED = 3
+
+
+STATUS_NAMES = ("permitted", "restricted", "banned", "not_listed")
+_STATUS_BY_NAME = {name: FssaiStatus(i) for i, name in enumerate(STATUS_NAMES)}
+
+
+# ============================================================
+# ENCODING
+# ============================================================
+def encode_table(snapshot: Dict[str, dict], version: str) -> bytes:
+    """Serialize a regulation snapshot (FSSAI_DATABASE shape) to the binary layout."""
+    strings: List[str] = []
+    index: Dict[str, int] = {}
+
+    def intern(text) -> int:
+        text = "" if text is None else str(text)
+        if text not in index:
+            index[text] = len(strings)
+            strings.append(text)
+        return index[text]
+
+    records = []
+    for code in sorted(snapshot):
+        info = snapshot[code]
+        records.append(RECORD.pack(
+            code.encode("ascii")[:16],
+            intern(info.get("name", "Unknown")),
+            _STATUS_BY_NAME.get(info.get("fssai_status"), FssaiStatus.NOT_LISTED),
+            int(info.get("severity", 0)),
+            intern(info.get("category", "unknown")),
+            intern(info.get("max_limit", "unknown")),
+            intern(info.get("health_concern", "")),
+            intern(info.get("fssai_note", "")),
+        ))
+
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets, pos = [], 0
+    for data in encoded:
+        offsets.append(pos)
+        pos += len(data)
+    offsets.append(pos)
+
+    return b"".join([
+        HEADER.pack(MAGIC, version.encode("ascii")[:12], len(strings), len(records)),
+        b"".join(OFFSET.pack(o) for o in offsets),
+        b"".join(records),
+        b"".join(encoded),
+    ])
+
+
+def build_table_file(path: str, snapshot: Dict[str, dict], version: str):
+    """Write the table atomically so concurrently starting workers never map a partial file."""
+    directory = os.path.dirname(os.path.abspath(path))
+    os.makedirs(directory, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix=".fssai-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(encode_table(snapshot, version))
+        os.chmod(tmp, 0o444)
+        os.replace(tmp, path)
+    except Exception:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+        raise
+
+
+# ============================================================
+# READ-ONLY TABLE
+# ============================================================
+class CompactRegulationTable:
+    """Lookups over an encoded table held in bytes or a shared read-only mmap."""
+
+    def __init__(self, buffer):
+        magic, version, n_strings, n_records = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a compact FSSAI table")
+
+        self.version = version.rstrip(b"\0").decode("ascii")
+        self._buffer = buffer
+        self._n_records = n_records
+        self._offsets_at = HEADER.size
+        self._records_at = self._offsets_at + (n_strings + 1) * OFFSET.size
+        self._blob_at = self._records_at + n_records * RECORD.size
+        self._findings: Dict[str, dict] = {}
+
+    @classmethod
+    def from_snapshot(cls, snapshot: Dict[str, dict], version: str) -> "CompactRegulationTable":
+        return cls(encode_table(snapshot, version))
+
+    @classmethod
+    def open(cls, path: str) -> "CompactRegulationTable":
+        """Map a table file read-only; pages are shared by every process mapping it."""
+        with open(path, "rb") as f:
+            mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return cls(mapped)
+
+    def __len__(self) -> int:
+        return self._n_records
+
+    def __contains__(self, code: str) -> bool:
+        return self._find(code) is not None
+
+    def _code_at(self, i: int) -> bytes:
+        at = self._records_at + i * RECORD.size
+        return self._buffer[at:at + 16]
+
+    def _find(self, code: str) -> Optional[int]:
+        """Byte offset of a code's record (binary search over the sorted records), or None."""
+        try:
+            key = code.encode("ascii").ljust(16, b"\0")
+        except UnicodeEncodeError:
+            return None
+        if len(key) > 16:
+            return None
+        lo, hi = 0, self._n_records
+        while lo < hi:
+            mid = (lo + hi) // 2
+            probe = self._code_at(mid)
+            if probe < key:
+                lo = mid + 1
+            elif probe > key:
+                hi = mid
+            else:
+                return self._records_at + mid * RECORD.size
+        return None
+
+    def codes(self) -> List[str]:
+        return [self._code_at(i).rstrip(b"\0").decode("ascii") for i in range(self._n_records)]
+
+    def string(self, string_id: int) -> str:
+        """Decode a string-table entry from the buffer."""
+        start, end = struct.unpack_from("<II", self._buffer, self._offsets_at + string_id * OFFSET.size)
+        return str(self._buffer[self._blob_at + start:self._blob_at + end], "utf-8")
+
+    def finding(self, code: str) -> Optional[dict]:
+        """
+        API finding dict for a normalized code (same shape as
+        fssai_regulations._build_finding). Shared between lookups: copy it
+        before changing it.
+        """
+        cached = self._findings.get(code)
+        if cached is not None:
+            return cached
+        at = self._find(code)
+        if at is None:
+            return None
+        _, name, status, severity, category, max_limit, concern, note = RECORD.unpack_from(self._buffer, at)
+        string = self.string
+        finding = self._findings[code] = {
+            "code": code,
+            "name": string(name),
+            "fssai_status": STATUS_NAMES[status],
+            "category": string(category),
+            "max_limit": string(max_limit),
+            "health_concern": string(concern),
+            "fssai_note": string(note),
+            "severity": severity,
+        }
+        return finding
+
+    def snapshot(self) -> Dict[str, dict]:
+        """Decode the whole table back into the snapshot shape it was built from."""
+        snapshot = {}
+        for code in self.codes():
+            snapshot[code] = {key: value for key, value in self.finding(code).items() if key != "code"}
+        return snapshot
+
+
+def load_shared_table(path: str, version: str, snapshot: Callable[[], Dict[str, dict]]) -> CompactRegulationTable:
+    """
+    Map the table at `path`, (re)building it from `snapshot()` first if it
+    is missing or was built from a different source version.
+    """
+    try:
+        table = CompactRegulationTable.open(path)
+        if table.version == version:
+            return table
+    except (OSError, ValueError, struct.error):
+        pass
+    build_table_file(path, snapshot(), version)
+    return CompactRegulationTable.open(path)
+
+
+if __name__ == "__main__":
+    from fssai_data import FSSAI_DATABASE
+    from fssai_regulations import local_source_version
+
+    if len(sys.argv) != 2:
+        print("Usage: python fssai_compact.py <output-path>")
+        sys.exit(2)
+    build_table_file(sys.argv[1], FSSAI_DATABASE, local_source_version())
+    table = CompactRegulationTable.open(sys.argv[1])
+    print(f"✅ Built compact FSSAI table {table.version} ({len(table)} additives) at {sys.argv[1]}")
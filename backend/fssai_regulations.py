@@ -3,10 +3,8 @@ FSSAI (Food Safety and Standards Authority of India) Regulation Database
 Based on FSS (Food Products Standards and Food Additives) Regulations, 2011
 and subsequent amendments through 2025.
 
-Sources:
-- FSSAI Appendix A: List of Food Additives
-- FSSAI Chapter 3: Substances Added to Food
-- FSSAI ban orders (Potassium Bromate 2016, etc.)
+Lookups go to Supabase (`fssai_additives`) when available, else to the
+bundled list (fssai_data) in its compact, mmap-shared form (fssai_compact).
 
 Each additive has:
 - ins_number: INS/E number
@@ -19,7 +17,15 @@ Each additive has:
 - fssai_note: Regulatory note from FSSAI
 """
 
-from typing import Optional, Dict, List
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, List, Tuple
+
+from fssai_compact import CompactRegulationTable, load_shared_table
+from fssai_categories import GENERAL, classify_category, compile_rules, rules_version
 
 
 # Status levels
@@ -28,462 +34,25 @@ RESTRICTED = "restricted"     # Allowed only in certain food categories or with
 BANNED = "banned"             # Banned in India by FSSAI
 NOT_LISTED = "not_listed"     # Not in FSSAI approved list (effectively not permitted)
 
-
-FSSAI_DATABASE: Dict[str, dict] = {
-    # ================================================================
-    # BANNED ADDITIVES
-    # ================================================================
-    "E924": {
-        "name": "Potassium Bromate",
-        "fssai_status": BANNED,
-        "category": "flour treatment agent",
-        "max_limit": "0 (banned)",
-        "health_concern": "Classified as possible human carcinogen (IARC Group 2B). Linked to kidney and thyroid cancer. Banned by FSSAI in 2016.",
-        "fssai_note": "Removed from list of permitted additives by FSSAI order dated 20 June 2016. Was previously used in bread and bakery products.",
-        "severity": 5,
-    },
-    "E924B": {
-        "name": "Calcium Bromate",
-        "fssai_status": BANNED,
-        "category": "flour treatment agent",
-        "max_limit": "0 (banned)",
-        "health_concern": "Similar carcinogenic concerns as Potassium Bromate.",
-        "fssai_note": "Banned along with Potassium Bromate in 2016.",
-        "severity": 5,
-    },
-    "E917": {
-        "name": "Potassium Iodate",
-        "fssai_status": BANNED,
-        "category": "flour treatment agent",
-        "max_limit": "0 (banned in bread)",
-        "health_concern": "Excess iodine intake can cause thyroid disorders. CSE study found residues in 84% of tested bread brands.",
-        "fssai_note": "Banned as bread additive by FSSAI in 2016. Still permitted for salt iodization under separate regulations.",
-        "severity": 4,
-    },
-
-    # ================================================================
-    # PERMITTED COLOURS (8 synthetic colours allowed by FSSAI)
-    # ================================================================
-    "E102": {
-        "name": "Tartrazine (Yellow)",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "May cause hyperactivity in children. Can trigger allergic reactions, especially in aspirin-sensitive individuals.",
-        "fssai_note": "Permitted synthetic colour. Must be declared on label. Limited to 100 ppm in most food categories.",
-        "severity": 3,
-    },
-    "E110": {
-        "name": "Sunset Yellow FCF",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "Linked to hyperactivity in children. EU requires warning label. May cause allergic reactions.",
-        "fssai_note": "Permitted synthetic colour in India. Max 100 ppm.",
-        "severity": 3,
-    },
-    "E122": {
-        "name": "Carmoisine (Azorubine)",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "Azo dye linked to hyperactivity in children. May cause allergic reactions.",
-        "fssai_note": "One of 8 FSSAI-permitted synthetic colours.",
-        "severity": 3,
-    },
-    "E124": {
-        "name": "Ponceau 4R",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "Azo dye. Linked to hyperactivity. Banned in USA and Norway.",
-        "fssai_note": "Permitted in India but banned in several countries. Max 100 ppm.",
-        "severity": 3,
-    },
-    "E127": {
-        "name": "Erythrosine",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "Contains iodine. High doses may affect thyroid function.",
-        "fssai_note": "Permitted synthetic colour. Restricted to specific food categories.",
-        "severity": 3,
-    },
-    "E129": {
-        "name": "Allura Red AC",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "Linked to hyperactivity in children. Some studies suggest genotoxicity.",
-        "fssai_note": "Permitted synthetic colour in India. Max 100 ppm.",
-        "severity": 3,
-    },
-    "E132": {
-        "name": "Indigotine (Indigo Carmine)",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "May cause nausea and high blood pressure in sensitive individuals.",
-        "fssai_note": "Permitted synthetic colour. Max 100 ppm.",
-        "severity": 2,
-    },
-    "E133": {
-        "name": "Brilliant Blue FCF",
-        "fssai_status": RESTRICTED,
-        "category": "synthetic colour",
-        "max_limit": "100 ppm",
-        "health_concern": "Generally well tolerated. Rare allergic reactions reported.",
-        "fssai_note": "Permitted synthetic colour. Max 100 ppm.",
-        "severity": 1,
-    },
-
-    # Non-permitted colours (banned)
-    "E142": {
-        "name": "Green S",
-        "fssai_status": BANNED,
-        "category": "synthetic colour",
-        "max_limit": "0 (not permitted)",
-        "health_concern": "Not approved by FSSAI. Banned synthetic colour in India.",
-        "fssai_note": "Not in FSSAI list of 8 permitted synthetic colours.",
-        "severity": 4,
-    },
-
-    # Natural colours (generally permitted)
-    "E100": {
-        "name": "Curcumin (Turmeric)",
-        "fssai_status": PERMITTED,
-        "category": "natural colour",
-        "max_limit": "GMP",
-        "health_concern": "Natural colour from turmeric. Generally safe. Traditional Indian ingredient.",
-        "fssai_note": "Natural colour, permitted at GMP levels.",
-        "severity": 0,
-    },
-    "E160A": {
-        "name": "Beta-Carotene",
-        "fssai_status": PERMITTED,
-        "category": "natural colour",
-        "max_limit": "GMP",
-        "health_concern": "Natural pigment found in carrots. Safe at food levels.",
-        "fssai_note": "Permitted natural colour.",
-        "severity": 0,
-    },
-    "E150D": {
-        "name": "Caramel Colour (Class IV - Sulphite Ammonia)",
-        "fssai_status": RESTRICTED,
-        "category": "colour",
-        "max_limit": "varies by food category",
-        "health_concern": "Contains 4-methylimidazole (4-MEI), classified as possibly carcinogenic. Found in colas and dark beverages.",
-        "fssai_note": "Permitted but classified separately from natural caramel. Used in carbonated beverages.",
-        "severity": 3,
-    },
-
-    # ================================================================
-    # PRESERVATIVES
-    # ================================================================
-    "E200": {
-        "name": "Sorbic Acid",
-        "fssai_status": PERMITTED,
-        "category": "preservative (Class II)",
-        "max_limit": "1000 ppm (varies)",
-        "health_concern": "Generally safe. One of the safest preservatives available.",
-        "fssai_note": "Class II preservative. Permitted in various food categories up to 1000 ppm.",
-        "severity": 0,
-    },
-    "E202": {
-        "name": "Potassium Sorbate",
-        "fssai_status": PERMITTED,
-        "category": "preservative (Class II)",
-        "max_limit": "1000 ppm (varies)",
-        "health_concern": "Salt of sorbic acid. Generally safe.",
-        "fssai_note": "Class II preservative. Widely permitted.",
-        "severity": 0,
-    },
-    "E210": {
-        "name": "Benzoic Acid",
-        "fssai_status": RESTRICTED,
-        "category": "preservative (Class II)",
-        "max_limit": "300 ppm",
-        "health_concern": "Can form benzene (a carcinogen) when combined with Vitamin C (ascorbic acid). FSSAI limits to 300 ppm.",
-        "fssai_note": "Class II preservative. Max 300 ppm. Caution with vitamin C containing products.",
-        "severity": 3,
-    },
-    "E211": {
-        "name": "Sodium Benzoate",
-        "fssai_status": RESTRICTED,
-        "category": "preservative (Class II)",
-        "max_limit": "300 ppm",
-        "health_concern": "Can form benzene with vitamin C. Linked to hyperactivity in children when combined with artificial colours.",
-        "fssai_note": "Class II preservative. Max 300 ppm. Widely used in beverages and sauces.",
-        "severity": 3,
-    },
-    "E220": {
-        "name": "Sulphur Dioxide",
-        "fssai_status": RESTRICTED,
-        "category": "preservative (Class II)",
-        "max_limit": "varies (70-350 ppm)",
-        "health_concern": "Can trigger severe asthma attacks. Must be declared on label. Destroys vitamin B1.",
-        "fssai_note": "Class II preservative. Mandatory labelling if >10 ppm. Used in dried fruits, wine, pickles.",
-        "severity": 3,
-    },
-    "E223": {
-        "name": "Sodium Metabisulphite",
-        "fssai_status": RESTRICTED,
-        "category": "preservative (Class II)",
-        "max_limit": "varies by product",
-        "health_concern": "Sulphite - can trigger asthma and allergic reactions. Must be declared as allergen.",
-        "fssai_note": "Permitted as dough conditioner and preservative. Must be declared on label.",
-        "severity": 3,
-    },
-    "E250": {
-        "name": "Sodium Nitrite",
-        "fssai_status": RESTRICTED,
-        "category": "preservative",
-        "max_limit": "200 ppm (in meat products)",
-        "health_concern": "Can form nitrosamines (carcinogens) during cooking. Used in processed meats. IARC links processed meat to colorectal cancer.",
-        "fssai_note": "Permitted only in certain meat products. Strict limits apply.",
-        "severity": 4,
-    },
-    "E251": {
-        "name": "Sodium Nitrate",
-        "fssai_status": RESTRICTED,
-        "category": "preservative",
-        "max_limit": "500 ppm (in meat)",
-        "health_concern": "Converts to nitrite in the body. Same nitrosamine concerns as sodium nitrite.",
-        "fssai_note": "Permitted in meat products with limits.",
-        "severity": 3,
-    },
-
-    # ================================================================
-    # ANTIOXIDANTS
-    # ================================================================
-    "E320": {
-        "name": "BHA (Butylated Hydroxyanisole)",
-        "fssai_status": RESTRICTED,
-        "category": "antioxidant",
-        "max_limit": "200 ppm",
-        "health_concern": "Classified as possibly carcinogenic (IARC Group 2B). Endocrine disruptor concerns.",
-        "fssai_note": "Permitted antioxidant. Max 200 ppm individually or combined with BHT.",
-        "severity": 4,
-    },
-    "E321": {
-        "name": "BHT (Butylated Hydroxytoluene)",
-        "fssai_status": RESTRICTED,
-        "category": "antioxidant",
-        "max_limit": "200 ppm",
-        "health_concern": "Possible endocrine disruptor. Some animal studies show tumour promotion.",
-        "fssai_note": "Permitted antioxidant. Max 200 ppm combined with BHA.",
-        "severity": 3,
-    },
-    "E319": {
-        "name": "TBHQ (Tert-Butylhydroquinone)",
-        "fssai_status": RESTRICTED,
-        "category": "antioxidant",
-        "max_limit": "200 ppm",
-        "health_concern": "High doses can cause nausea, delirium. Some studies suggest immune system effects.",
-        "fssai_note": "Permitted antioxidant. Max 200 ppm.",
-        "severity": 3,
-    },
-    "E300": {
-        "name": "Ascorbic Acid (Vitamin C)",
-        "fssai_status": PERMITTED,
-        "category": "antioxidant",
-        "max_limit": "GMP",
-        "health_concern": "Safe. Essential nutrient (Vitamin C).",
-        "fssai_note": "Permitted antioxidant at GMP levels.",
-        "severity": 0,
-    },
-    "E306": {
-        "name": "Tocopherol (Vitamin E)",
-        "fssai_status": PERMITTED,
-        "category": "antioxidant",
-        "max_limit": "GMP",
-        "health_concern": "Safe. Essential nutrient (Vitamin E).",
-        "fssai_note": "Permitted antioxidant at GMP levels.",
-        "severity": 0,
-    },
-
-    # ================================================================
-    # EMULSIFIERS & STABILIZERS
-    # ================================================================
-    "E322": {
-        "name": "Lecithin",
-        "fssai_status": PERMITTED,
-        "category": "emulsifier",
-        "max_limit": "GMP",
-        "health_concern": "Generally safe. Natural emulsifier from soy or eggs. Soy allergen risk.",
-        "fssai_note": "Permitted emulsifier at GMP. Must declare soy origin for allergen labelling.",
-        "severity": 1,
-    },
-    "E330": {
-        "name": "Citric Acid",
-        "fssai_status": PERMITTED,
-        "category": "acidity regulator",
-        "max_limit": "GMP",
-        "health_concern": "Safe. Naturally found in citrus fruits.",
-        "fssai_note": "Permitted acidity regulator at GMP.",
-        "severity": 0,
-    },
-    "E412": {
-        "name": "Guar Gum",
-        "fssai_status": PERMITTED,
-        "category": "thickener/stabilizer",
-        "max_limit": "GMP",
-        "health_concern": "Generally safe. May cause digestive discomfort in large amounts.",
-        "fssai_note": "Permitted thickener. India is the world's largest producer of guar gum.",
-        "severity": 0,
-    },
-    "E415": {
-        "name": "Xanthan Gum",
-        "fssai_status": PERMITTED,
-        "category": "thickener/stabilizer",
-        "max_limit": "GMP",
-        "health_concern": "Generally safe. May cause bloating in large amounts.",
-        "fssai_note": "Permitted thickener at GMP.",
-        "severity": 0,
-    },
-    "E407": {
-        "name": "Carrageenan",
-        "fssai_status": PERMITTED,
-        "category": "thickener/stabilizer",
-        "max_limit": "GMP",
-        "health_concern": "Some studies link to gut inflammation. Debated safety, but generally recognized as safe.",
-        "fssai_note": "Permitted stabilizer at GMP. Used in dairy products.",
-        "severity": 2,
-    },
-    "E471": {
-        "name": "Mono- and Diglycerides of Fatty Acids",
-        "fssai_status": PERMITTED,
-        "category": "emulsifier",
-        "max_limit": "GMP",
-        "health_concern": "Generally safe. May be from animal or plant sources — vegetarian status unclear unless specified.",
-        "fssai_note": "Permitted emulsifier. FSSAI requires veg/non-veg declaration.",
-        "severity": 1,
-    },
-
-    # ================================================================
-    # FLAVOUR ENHANCERS
-    # ================================================================
-    "E621": {
-        "name": "Monosodium Glutamate (MSG)",
-        "fssai_status": RESTRICTED,
-        "category": "flavour enhancer",
-        "max_limit": "not specified (GMP in most categories)",
-        "health_concern": "May cause 'Chinese Restaurant Syndrome' (headache, flushing, sweating) in sensitive people. FSSAI restricts in infant food.",
-        "fssai_note": "Permitted in most food categories. Banned in infant food and food for young children. Must be declared on label.",
-        "severity": 2,
-    },
-    "E627": {
-        "name": "Disodium Guanylate",
-        "fssai_status": RESTRICTED,
-        "category": "flavour enhancer",
-        "max_limit": "GMP",
-        "health_concern": "Should be avoided by gout sufferers (purine metabolism). Often used with MSG.",
-        "fssai_note": "Permitted flavour enhancer. Not for infant food.",
-        "severity": 2,
-    },
-    "E631": {
-        "name": "Disodium Inosinate",
-        "fssai_status": RESTRICTED,
-        "category": "flavour enhancer",
-        "max_limit": "GMP",
-        "health_concern": "Avoid if gout-prone. Often combined with MSG and E627.",
-        "fssai_note": "Permitted flavour enhancer. Not for infant food.",
-        "severity": 2,
-    },
-
-    # ================================================================
-    # RAISING AGENTS
-    # ================================================================
-    "E500": {
-        "name": "Sodium Bicarbonate (Baking Soda)",
-        "fssai_status": PERMITTED,
-        "category": "raising agent",
-        "max_limit": "GMP",
-        "health_concern": "Safe. Common household ingredient.",
-        "fssai_note": "Permitted raising agent at GMP.",
-        "severity": 0,
-    },
-    "E501": {
-        "name": "Potassium Carbonate",
-        "fssai_status": PERMITTED,
-        "category": "raising agent",
-        "max_limit": "GMP",
-        "health_concern": "Safe. Used in baking.",
-        "fssai_note": "Permitted raising agent at GMP.",
-        "severity": 0,
-    },
-    "E503": {
-        "name": "Ammonium Carbonate",
-        "fssai_status": PERMITTED,
-        "category": "raising agent",
-        "max_limit": "GMP",
-        "health_concern": "Safe. Evaporates during baking.",
-        "fssai_note": "Permitted raising agent at GMP.",
-        "severity": 0,
-    },
-
-    # ================================================================
-    # SWEETENERS
-    # ================================================================
-    "E951": {
-        "name": "Aspartame",
-        "fssai_status": RESTRICTED,
-        "category": "artificial sweetener",
-        "max_limit": "varies by product",
-        "health_concern": "WHO/IARC classified as possibly carcinogenic (Group 2B) in 2023. Phenylketonuria (PKU) patients must avoid.",
-        "fssai_note": "Permitted in sugar-free products. Must carry PKU warning. FSSAI monitoring post-IARC classification.",
-        "severity": 3,
-    },
-    "E950": {
-        "name": "Acesulfame Potassium (Ace-K)",
-        "fssai_status": RESTRICTED,
-        "category": "artificial sweetener",
-        "max_limit": "varies by product",
-        "health_concern": "Some studies suggest it may affect gut microbiome. Generally considered safe at permitted levels.",
-        "fssai_note": "Permitted artificial sweetener.",
-        "severity": 2,
-    },
-    "E955": {
-        "name": "Sucralose",
-        "fssai_status": PERMITTED,
-        "category": "artificial sweetener",
-        "max_limit": "varies by product",
-        "health_concern": "Generally considered safe. Some concerns about effects when heated.",
-        "fssai_note": "Permitted artificial sweetener.",
-        "severity": 1,
-    },
-
-    # ================================================================
-    # ACIDITY REGULATORS
-    # ================================================================
-    "E338": {
-        "name": "Phosphoric Acid",
-        "fssai_status": RESTRICTED,
-        "category": "acidity regulator",
-        "max_limit": "varies by product",
-        "health_concern": "High intake may reduce calcium absorption and affect bone density. Common in colas.",
-        "fssai_note": "Permitted acidity regulator. Primary use in carbonated beverages.",
-        "severity": 2,
-    },
-    "E451": {
-        "name": "Triphosphate (Pentasodium/Pentapotassium)",
-        "fssai_status": RESTRICTED,
-        "category": "emulsifier/stabilizer",
-        "max_limit": "varies by product",
-        "health_concern": "Excessive phosphate intake linked to cardiovascular and kidney issues.",
-        "fssai_note": "Permitted with limits. Used in processed meat and noodles.",
-        "severity": 2,
-    },
-}
+# Bundled regulation data; hashed rather than imported to version the table
+_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fssai_data.py")
 
 
 # ================================================================
 # Supabase-backed lookup functions
-# Falls back to local FSSAI_DATABASE if Supabase is unavailable
+# Falls back to the bundled table (fssai_data) if Supabase is unavailable
 # ================================================================
 
 _supabase_client = None
 _use_supabase = False
+_local_table: Optional[CompactRegulationTable] = None
+_dictionary: Optional[Tuple[str, bytes]] = None
+_category_rules: Optional[Dict[Tuple[str, str], dict]] = None
+_dictionary_checked_at = 0.0
+_dictionary_lock = threading.Lock()
+
+# How often the dictionary re-reads the regulations to pick up changes
+DICTIONARY_TTL = float(os.getenv("FSSAI_DICTIONARY_TTL_S", "300"))
 
 
 def init_fssai_supabase():
@@ -508,8 +77,8 @@ def init_fssai_supabase():
             return
 
         if url and key:
-            from supabase import create_client
-            _supabase_client = create_client(url, key)
+            from supabase_pool import get_supabase
+            _supabase_client = get_supabase()
             # Quick test: try to read one row
             test = _supabase_client.table("fssai_additives").select("code").limit(1).execute()
             if test.data is not None:
@@ -526,6 +95,39 @@ def init_fssai_supabase():
         _use_supabase = False
 
 
+def local_source_version() -> str:
+    """Short hash of the bundled data module's source; identifies the table built from it."""
+    with open(_DATA_PATH, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()[:12]
+
+
+def _bundled_snapshot() -> Dict[str, dict]:
+    from fssai_data import FSSAI_DATABASE
+    return FSSAI_DATABASE
+
+
+def get_local_table() -> CompactRegulationTable:
+    """
+    Compact, read-only form of the bundled data used for local lookups.
+    With FSSAI_TABLE_PATH set, the table file is mmap'd and shared by all
+    workers on the host; fssai_data is only imported to (re)build it when
+    missing or outdated, so workers mapping a current table never hold
+    the dict form.
+    """
+    global _local_table
+    if _local_table is None:
+        version = local_source_version()
+        path = os.getenv("FSSAI_TABLE_PATH")
+        table = None
+        if path:
+            try:
+                table = load_shared_table(path, version, _bundled_snapshot)
+            except OSError as e:
+                print(f"⚠️  FSSAI: could not map {path} ({e}), using in-process table")
+        _local_table = table or CompactRegulationTable.from_snapshot(_bundled_snapshot(), version)
+    return _local_table
+
+
 def _lookup_from_supabase(code: str) -> Optional[dict]:
     """Fetch a single additive from Supabase by code."""
     try:
@@ -555,6 +157,107 @@ def _batch_lookup_from_supabase(codes: List[str]) -> Dict[str, dict]:
         return {}
 
 
+def current_snapshot(strict: bool = False) -> Dict[str, dict]:
+    """
+    Full regulation table currently in effect, keyed by code.
+    Reads `fssai_additives` when Supabase is active, else the local table.
+    With strict=True a Supabase failure raises instead of falling back.
+    """
+    if _use_supabase:
+        try:
+            result = _supabase_client.table("fssai_additives").select(
+                "code, name, fssai_status, category, max_limit, health_concern, fssai_note, severity"
+            ).execute()
+            return {
+                row["code"]: {k: v for k, v in row.items() if k != "code"}
+                for row in (result.data or [])
+            }
+        except Exception as e:
+            if strict:
+                raise
+            print(f"⚠️  FSSAI Supabase snapshot failed, using local table: {e}")
+    return get_local_table().snapshot()
+
+
+def snapshot_version(snapshot: Dict[str, dict]) -> str:
+    """Stable short content hash identifying a regulation snapshot."""
+    canonical = json.dumps(snapshot, sort_keys=True, separators=(",", ":"), ensure_ascii=False)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:12]
+
+
+def diff_snapshots(old: Dict[str, dict], new: Dict[str, dict]) -> List[str]:
+    """Codes that were added, removed or changed between two snapshots."""
+    return sorted(
+        code for code in old.keys() | new.keys()
+        if old.get(code) != new.get(code)
+    )
+
+
+def additive_dictionary() -> Tuple[str, bytes]:
+    """
+    (version, JSON bytes) of every additive's full regulation text plus
+    the category overrides ({code: {food_category: override}}), so a
+    compact finding with a food_category expands to what the full
+    response would say. Clients fetch this once per version and expand
+    compact /product responses locally. Serialized once per version; the
+    regulations are re-read every FSSAI_DICTIONARY_TTL_S.
+    """
+    if _dictionary is None or time.monotonic() - _dictionary_checked_at >= DICTIONARY_TTL:
+        refresh_dictionary()
+    return _dictionary
+
+
+def refresh_dictionary(force: bool = False):
+    """
+    Re-read the regulations and swap in a new dictionary and compiled
+    category rules if their version changed. Only one thread refreshes;
+    the others keep serving the current dictionary meanwhile. Once a
+    dictionary exists, a failed read keeps it (never the bundled fallback).
+    """
+    global _dictionary, _category_rules, _dictionary_checked_at
+    if not _dictionary_lock.acquire(blocking=_dictionary is None):
+        return
+    try:
+        if not force and _dictionary is not None \
+                and time.monotonic() - _dictionary_checked_at < DICTIONARY_TTL:
+            return  # refreshed by another thread while we waited
+        try:
+            snapshot = current_snapshot(strict=_dictionary is not None)
+        except Exception as e:
+            print(f"⚠️  FSSAI: regulation refresh failed, keeping {_dictionary[0]}: {e}")
+            _dictionary_checked_at = time.monotonic()
+            return
+
+        version = f"{snapshot_version(snapshot)}-{rules_version()}"
+        if _dictionary is None or version != _dictionary[0]:
+            # Category rules expand functional classes against the same snapshot
+            rules = compile_rules(snapshot)
+            overrides: Dict[str, Dict[str, dict]] = {}
+            for (code, food_category), override in rules.items():
+                overrides.setdefault(code, {})[food_category] = override
+            payload = {"version": version, "additives": snapshot, "category_overrides": overrides}
+            body = json.dumps(payload, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+            if _dictionary is not None:
+                print(f"📋 FSSAI: regulations changed {_dictionary[0]} -> {version}")
+            _category_rules = rules
+            _dictionary = (version, body)
+        _dictionary_checked_at = time.monotonic()
+    finally:
+        _dictionary_lock.release()
+
+
+def category_rules() -> Dict[Tuple[str, str], dict]:
+    """{(code, food_category): override} compiled from fssai_categories.CATEGORY_RULES."""
+    if _category_rules is None:
+        additive_dictionary()
+    return _category_rules
+
+
+def regulation_version() -> str:
+    """Version of the regulations in effect: additive snapshot plus category rules."""
+    return additive_dictionary()[0]
+
+
 def check_additive_fssai(code: str) -> Optional[dict]:
     """
     Check an additive code against FSSAI regulations.
@@ -572,59 +275,88 @@ def check_additive_fssai(code: str) -> Optional[dict]:
         return _lookup_from_supabase(normalized)
 
     # Local fallback
-    return FSSAI_DATABASE.get(normalized)
+    return get_local_table().finding(normalized)
+
+
+def _build_finding(normalized: str, info: Optional[dict]) -> dict:
+    """Shape one additive's regulation info into an API finding."""
+    if info:
+        return {
+            "code": normalized,
+            "name": info.get("name", "Unknown"),
+            "fssai_status": info.get("fssai_status", NOT_LISTED),
+            "category": info.get("category", "unknown"),
+            "max_limit": info.get("max_limit", "unknown"),
+            "health_concern": info.get("health_concern", ""),
+            "fssai_note": info.get("fssai_note", ""),
+            "severity": info.get("severity", 0),
+        }
+    # Additive not in our FSSAI database
+    return {
+        "code": normalized,
+        "name": "Unknown",
+        "fssai_status": NOT_LISTED,
+        "category": "unknown",
+        "max_limit": "unknown",
+        "health_concern": "This additive is not in our FSSAI regulation database. It may or may not be permitted.",
+        "fssai_note": "Not found in FSSAI Appendix A. Check fssai.gov.in for the latest approved list.",
+        "severity": 1,
+    }
 
 
-def check_product_fssai(additive_codes: List[str]) -> List[dict]:
+def check_product_fssai(additive_codes: List[str], category: Optional[str] = None) -> List[dict]:
     """
     Check all additives in a product against FSSAI regulations.
-    Uses batch Supabase query for efficiency.
+    Uses batch Supabase query for efficiency. With the product's OFF
+    category string, category-specific rules (fssai_categories) apply.
 
     Returns list of FSSAI findings sorted by severity (most concerning first).
     """
-    findings = []
+    return check_products_fssai([additive_codes], [category])[0]
+
 
+def check_products_fssai(
+    additive_lists: List[List[str]],
+    categories: Optional[List[Optional[str]]] = None,
+) -> List[List[dict]]:
+    """
+    Check many products at once (bulk export / re-enrichment).
+    Issues a single Supabase query for the union of all codes.
+    `categories`, if given, holds each product's OFF category string.
+
+    Returns one findings list per input list, in the same order.
+    """
     # Batch lookup if using Supabase
-    if _use_supabase and additive_codes:
-        supabase_results = _batch_lookup_from_supabase(additive_codes)
+    all_codes = {code for codes in additive_lists for code in codes}
+    if _use_supabase and all_codes:
+        supabase_results = _batch_lookup_from_supabase(sorted(all_codes))
     else:
         supabase_results = {}
+    local_table = None if _use_supabase else get_local_table()
+    rules = category_rules() if categories else {}
+
+    results = []
+    for i, additive_codes in enumerate(additive_lists):
+        food_category = classify_category(categories[i]) if categories else GENERAL
+        findings = []
+        for code in additive_codes:
+            normalized = code.upper().strip()
+
+            if _use_supabase:
+                finding = _build_finding(normalized, supabase_results.get(normalized))
+            else:
+                finding = local_table.finding(normalized) or _build_finding(normalized, None)
 
-    for code in additive_codes:
-        normalized = code.upper().strip()
+            override = rules.get((normalized, food_category)) if food_category != GENERAL else None
+            if override:
+                finding = {**finding, **override, "food_category": food_category}
 
-        if _use_supabase:
-            info = supabase_results.get(normalized)
-        else:
-            info = FSSAI_DATABASE.get(normalized)
-
-        if info:
-            findings.append({
-                "code": normalized,
-                "name": info.get("name", "Unknown"),
-                "fssai_status": info.get("fssai_status", NOT_LISTED),
-                "category": info.get("category", "unknown"),
-                "max_limit": info.get("max_limit", "unknown"),
-                "health_concern": info.get("health_concern", ""),
-                "fssai_note": info.get("fssai_note", ""),
-                "severity": info.get("severity", 0),
-            })
-        else:
-            # Additive not in our FSSAI database
-            findings.append({
-                "code": normalized,
-                "name": "Unknown",
-                "fssai_status": NOT_LISTED,
-                "category": "unknown",
-                "max_limit": "unknown",
-                "health_concern": "This additive is not in our FSSAI regulation database. It may or may not be permitted.",
-                "fssai_note": "Not found in FSSAI Appendix A. Check fssai.gov.in for the latest approved list.",
-                "severity": 1,
-            })
-
-    # Sort by severity (highest first)
-    findings.sort(key=lambda x: x["severity"], reverse=True)
-    return findings
+            findings.append(finding)
+
+        # Sort by severity (highest first)
+        findings.sort(key=lambda x: x["severity"], reverse=True)
+        results.append(findings)
+    return results
 
 
 def get_fssai_summary(findings: List[dict]) -> dict:
@@ -658,3 +390,35 @@ def get_fssai_summary(findings: List[dict]) -> dict:
         "unknown_count": len(unknown),
         "total_additives": len(findings),
     }
+
+
+def build_fssai_report(findings: List[dict], category: Optional[str] = None) -> dict:
+    """Build the `fssai` block attached to product responses."""
+    if not findings:
+        return {
+            "food_category": classify_category(category),
+            "findings": [],
+            "summary": {
+                "overall_status": "No additives detected",
+                "concern_level": "safe",
+                "banned_count": 0,
+                "restricted_count": 0,
+                "permitted_count": 0,
+                "unknown_count": 0,
+                "total_additives": 0,
+            },
+        }
+    return {
+        "food_category": classify_category(category),
+        "findings": findings,
+        "summary": get_fssai_summary(findings),
+    }
+
+
+def enrich_product(product: dict) -> dict:
+    """Attach the `fssai` block to a product response (in place)."""
+    additives = product.get("additives", [])
+    category = product.get("category")
+    findings = check_product_fssai(additives, category) if additives else []
+    product["fssai"] = build_fssai_report(findings, category)
+    return product
@@ -0,0 +1,75 @@
+"""
+GTIN barcode validation and canonicalization
+
+The same product reaches us as UPC-A (12 digits), EAN-13, EAN-13 padded
+to GTIN-14, etc. Everything is normalized to one canonical form before
+it touches a cache, Supabase or Open Food Facts:
+
+- EAN-8                       -> 8 digits
+- UPC-A / EAN-13 / GTIN-14    -> 13 digits (EAN-13) when representable
+- GTIN-14 with an indicator   -> 14 digits (case/packaging level codes)
+
+Check digits are verified with the standard GS1 mod-10 algorithm, so
+malformed scans are rejected without any network I/O.
+"""
+VALID_LENGTHS = (8, 12, 13, 14)
+
+
+class InvalidBarcodeError(ValueError):
+    """Raised when a barcode is not a well-formed GTIN."""
+
+
+def gtin_check_digit(body: str) -> int:
+    """
+    Compute the GS1 check digit for a GTIN body (all digits except the last).
+    Weights alternate 3, 1, 3, ... starting from the rightmost body digit.
+    """
+    total = 0
+    for i, ch in enumerate(reversed(body)):
+        digit = ord(ch) - 48
+        total += digit * 3 if i % 2 == 0 else digit
+    return (10 - total % 10) % 10
+
+
+def is_valid_gtin(code: str) -> bool:
+    """True if code is an 8/12/13/14-digit GTIN with a correct check digit."""
+    if len(code) not in VALID_LENGTHS or not code.isdigit() or not code.isascii():
+        return False
+    return gtin_check_digit(code[:-1]) == ord(code[-1]) - 48
+
+
+def canonicalize_barcode(raw: str) -> str:
+    """
+    Validate a scanned barcode and return its canonical form.
+
+    Args:
+        raw: Barcode as scanned/typed (spaces and hyphens are ignored)
+
+    Returns:
+        Canonical barcode string (8, 13 or 14 digits)
+
+    Raises:
+        InvalidBarcodeError: wrong length, non-digits, or bad check digit
+    """
+    code = raw.strip().replace(" ", "").replace("-", "")
+
+    if not code.isdigit() or not code.isascii():
+        raise InvalidBarcodeError(f"Barcode must contain only digits: {raw!r}")
+    if len(code) not in VALID_LENGTHS:
+        raise InvalidBarcodeError(f"Barcode must be 8, 12, 13 or 14 digits (got {len(code)})")
+    if not is_valid_gtin(code):
+        raise InvalidBarcodeError(f"Invalid check digit for barcode {code}")
+
+    if len(code) == 8:
+        return code
+
+    # Left-pad to GTIN-14; the check digit is unchanged by leading zeros
+    gtin14 = code.zfill(14)
+
+    if gtin14.startswith("000000"):
+        # EAN-8 that was padded out to 13/14 digits
+        return gtin14[6:]
+    if gtin14.startswith("0"):
+        # UPC-A, EAN-13, or GTIN-14 with indicator 0
+        return gtin14[1:]
+    return gtin14
@@ -0,0 +1,207 @@
+"""
+Ingest Outbox - Durable queue for background Supabase ingests
+
+When the background ingest fails (Supabase down, network blip), the OFF
+document is written to a local SQLite outbox instead of being dropped.
+An OutboxWorker replays due entries in batches with exponential backoff.
+
+- Entries are keyed on barcode: re-queuing a barcode replaces its payload
+  and enqueue time. Acks match (barcode, enqueued_at), so a payload queued
+  while an older one was being replayed is not dropped with it
+- Rows survive restarts; the worker drains whatever is left on startup
+- The file lives in the system temp directory unless INGEST_OUTBOX_PATH
+  is set (the source tree may be read-only, e.g. on Vercel)
+- Several uvicorn workers may share one file: claiming a batch pushes its
+  next attempt out by a lease inside one write transaction, so each entry
+  is replayed by one process at a time
+
+Tuned via environment variables (see .env.example).
+"""
+import json
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+from typing import Optional, Dict, Any, List, Callable, Tuple
+
+DEFAULT_PATH = os.path.join(tempfile.gettempdir(), "truth-lens-ingest-outbox.sqlite3")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS outbox (
+    barcode TEXT PRIMARY KEY,
+    payload TEXT NOT NULL,
+    enqueued_at REAL NOT NULL,
+    attempts INTEGER NOT NULL DEFAULT 0,
+    next_attempt_at REAL NOT NULL,
+    last_error TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_outbox_due ON outbox(next_attempt_at);
+"""
+
+
+class IngestOutbox:
+    """SQLite-backed set of pending ingests, one row per barcode."""
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        base_delay: float = 2.0,
+        max_delay: float = 300.0,
+        lease_seconds: float = 60.0,
+    ):
+        self.path = path
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.lease_seconds = lease_seconds
+        self._local = threading.local()
+        self._conn().executescript(_SCHEMA)
+
+    def _conn(self) -> sqlite3.Connection:
+        """One connection per thread; WAL keeps readers off the writer's lock."""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=10, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def enqueue(self, barcode: str, payload: Dict[str, Any], error: Optional[str] = None):
+        """Persist a pending ingest (due immediately)."""
+        now = time.time()
+        self._conn().execute(
+            """
+            INSERT INTO outbox (barcode, payload, enqueued_at, next_attempt_at, last_error)
+            VALUES (?, ?, ?, ?, ?)
+            ON CONFLICT(barcode) DO UPDATE SET
+                payload = excluded.payload,
+                enqueued_at = excluded.enqueued_at,
+                next_attempt_at = excluded.next_attempt_at,
+                last_error = excluded.last_error
+            """,
+            (barcode, json.dumps(payload), now, now, error),
+        )
+
+    def claim(self, limit: int) -> List[Tuple[str, Dict[str, Any], int, float]]:
+        """Lease up to `limit` due entries: [(barcode, payload, attempts, enqueued_at)]."""
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            rows = conn.execute(
+                "SELECT barcode, payload, attempts, enqueued_at FROM outbox "
+                "WHERE next_attempt_at <= ? ORDER BY next_attempt_at LIMIT ?",
+                (now, limit),
+            ).fetchall()
+            conn.executemany(
+                "UPDATE outbox SET next_attempt_at = ? WHERE barcode = ?",
+                [(now + self.lease_seconds, row[0]) for row in rows],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return [(barcode, json.loads(payload), attempts, enqueued_at)
+                for barcode, payload, attempts, enqueued_at in rows]
+
+    def ack(self, entries: List[Tuple[str, float]]):
+        """
+        Remove successfully replayed entries, given as (barcode, enqueued_at).
+        An entry re-queued since it was claimed has a newer enqueued_at and stays.
+        """
+        if entries:
+            self._conn().executemany("DELETE FROM outbox WHERE barcode = ? AND enqueued_at = ?", entries)
+
+    def retry_later(self, barcode: str, attempts: int, error: str):
+        """Reschedule a failed entry with capped exponential backoff and jitter."""
+        delay = min(self.max_delay, self.base_delay * (2 ** attempts))
+        delay *= random.uniform(0.8, 1.2)
+        self._conn().execute(
+            "UPDATE outbox SET attempts = ?, next_attempt_at = ?, last_error = ? WHERE barcode = ?",
+            (attempts + 1, time.time() + delay, error[:500], barcode),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Queue depth and lag, for /health."""
+        pending, oldest, retrying = self._conn().execute(
+            "SELECT count(*), min(enqueued_at), sum(attempts > 0) FROM outbox"
+        ).fetchone()
+        return {
+            "pending": pending,
+            "retrying": retrying or 0,
+            "lag_seconds": round(time.time() - oldest, 1) if oldest else 0.0,
+        }
+
+
+# ============================================================
+# REPLAY WORKER
+# ============================================================
+class OutboxWorker:
+    """Daemon thread replaying due outbox entries through `handler(barcode, payload)`."""
+
+    def __init__(
+        self,
+        outbox: IngestOutbox,
+        handler: Callable[[str, Dict[str, Any]], None],
+        batch_size: int = 20,
+        poll_interval: float = 5.0,
+    ):
+        self.outbox = outbox
+        self.handler = handler
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._run, name="ingest-outbox", daemon=True)
+            self._thread.start()
+
+    def notify(self):
+        """Wake the worker early (called right after an enqueue)."""
+        self._wake.set()
+
+    def drain_once(self) -> int:
+        """Replay one batch; returns the number of entries ingested."""
+        batch = self.outbox.claim(self.batch_size)
+        done = []
+        for i, (barcode, payload, attempts, enqueued_at) in enumerate(batch):
+            try:
+                self.handler(barcode, payload)
+                done.append((barcode, enqueued_at))
+            except Exception as e:
+                self.outbox.retry_later(barcode, attempts, str(e))
+                # Upstream is most likely still down: back the rest of the
+                # batch off too instead of hammering it entry by entry
+                for rest_barcode, _, rest_attempts, _ in batch[i + 1:]:
+                    self.outbox.retry_later(rest_barcode, rest_attempts, str(e))
+                break
+        self.outbox.ack(done)
+        return len(done)
+
+    def _run(self):
+        while True:
+            try:
+                if self.drain_once() >= self.batch_size:
+                    continue
+            except Exception as e:
+                print(f"⚠️ [Outbox] Replay pass failed: {e}")
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+
+def outbox_from_env() -> Optional[IngestOutbox]:
+    """Outbox from the environment, or None if its file can't be opened (ingests then aren't replayed)."""
+    path = os.getenv("INGEST_OUTBOX_PATH", DEFAULT_PATH)
+    try:
+        return IngestOutbox(
+            path=path,
+            base_delay=float(os.getenv("INGEST_OUTBOX_BASE_DELAY", "2")),
+            max_delay=float(os.getenv("INGEST_OUTBOX_MAX_DELAY", "300")),
+        )
+    except (sqlite3.Error, OSError) as e:
+        print(f"⚠️ [Outbox] Could not open {path} ({e}); failed ingests will not be replayed")
+        return None
@@ -6,16 +6,20 @@ Supports two modes:
 - Live mode: Uses Supabase + Open Food Facts (default)
 - Demo mode: Uses mock data for testing (set DEMO_MODE=true)
 """
+import hmac
 import sys
 import os
+import time
 
 # Ensure sibling modules (fssai_regulations, database, etc.) are importable
 # Required for Vercel serverless which runs main.py in isolation
 sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
 
-from fastapi import FastAPI, Query, HTTPException
+from typing import Optional
+
+from fastapi import FastAPI, Query, HTTPException, Header, Request, WebSocket
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, StreamingResponse, JSONResponse, Response, FileResponse, PlainTextResponse
 from dotenv import load_dotenv
 
 # Load environment variables
@@ -24,19 +28,47 @@ load_dotenv()
 # Check if demo mode is enabled
 DEMO_MODE = os.getenv("DEMO_MODE", "false").lower() == "true"
 
-from fssai_regulations import check_product_fssai, get_fssai_summary, init_fssai_supabase
+# Shared secret for admin/ops endpoints (disabled when unset)
+ADMIN_TOKEN = os.getenv("ADMIN_TOKEN")
+
+from fssai_regulations import init_fssai_supabase, additive_dictionary, enrich_product
+from gtin import canonicalize_barcode, InvalidBarcodeError
+from catalog_export import iter_catalog_records, iter_ndjson
+from product_search import search_products
+from additive_index import get_additive_index
+from alternatives import get_alternatives
+from admission import rate_limiter, client_key, cold_path_gate, RateLimited, Overloaded, retry_after_header
+from providers import get_product_chain, ProviderTimeout
+from profiling import profile_request, list_profiles, profile_path, profile_summary
+from traffic_capture import recorder_from_env, outcome_for_status, FOUND, NOT_FOUND, RATE_LIMITED, SHED, TIMEOUT
+from scan_session import ScanSession, session_stats
+from supabase_pool import get_supabase, pool_stats
+from regional_rules import apply_regional_flags, start_refresh as start_regional_rules, stats as regional_rules_stats
 
 if DEMO_MODE:
-    from demo_data import get_demo_product, get_all_demo_barcodes, DEMO_PRODUCTS
+    from demo_data import get_all_demo_barcodes, DEMO_PRODUCTS
     print("🎮 Running in DEMO MODE (no database required)")
 else:
-    from product_service import fetch_and_respond
+    from product_service import (
+        start_outbox_worker, ingest_outbox, start_barcode_filter, barcode_filter,
+        freshness_policy, product_refresher,
+    )
+    from user_scans_service import (
+        get_scan_history, get_purchase_history, get_scan_stats, VALID_INTENTS,
+    )
     print("🔴 Running in LIVE MODE (Supabase + Open Food Facts)")
     print("⚡ Fast mode: First scans return immediately, DB saves in background")
+    start_outbox_worker()
+    start_barcode_filter()
+    start_regional_rules(get_supabase())
 
 # Initialize FSSAI Supabase connection (falls back to local if unavailable)
 init_fssai_supabase()
 
+# Product sources for /product (PRODUCT_PROVIDERS, see providers.py)
+product_chain = get_product_chain(demo=DEMO_MODE)
+print(f"📋 Product providers: {product_chain.describe()}")
+
 # Create FastAPI app
 app = FastAPI(
     title="Truth Lens API",
@@ -53,6 +85,60 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+# Endpoints that are never rate limited (health checks, docs, test console)
+RATE_LIMIT_EXEMPT = {"/", "/health", "/test", "/docs", "/openapi.json"}
+
+
+@app.middleware("http")
+async def admission_control(request: Request, call_next):
+    """Per-client token bucket, checked before any work is done."""
+    if request.url.path not in RATE_LIMIT_EXEMPT:
+        try:
+            rate_limiter.check(client_key(request.headers, request.client.host if request.client else None))
+        except RateLimited as e:
+            return JSONResponse(
+                status_code=429,
+                content={"error": "Rate limit exceeded", "retry_after": round(e.retry_after, 2)},
+                headers={"Retry-After": retry_after_header(e.retry_after)},
+            )
+    return await call_next(request)
+
+
+# Optional sampled capture of /product traffic (TRAFFIC_CAPTURE_PATH, see
+# traffic_capture.py). Registered last so it also sees rate-limited requests;
+# not registered at all when capture is off.
+traffic_recorder = recorder_from_env()
+
+
+async def capture_traffic(request: Request, call_next):
+    """Record barcode, outcome class and latency for a sample of /product requests."""
+    if request.url.path != "/product" or not traffic_recorder.sampled():
+        return await call_next(request)
+    started = time.perf_counter()
+    response = await call_next(request)
+    traffic_recorder.record(
+        request.query_params.get("barcode", ""),
+        outcome_for_status(response.status_code, getattr(request.state, "product_found", None)),
+        (time.perf_counter() - started) * 1000,
+    )
+    return response
+
+
+if traffic_recorder:
+    app.middleware("http")(capture_traffic)
+    print(f"📋 Capturing {traffic_recorder.sample_rate:.1%} of /product traffic to {traffic_recorder.path}")
+
+
+@app.exception_handler(Overloaded)
+def overloaded_handler(request: Request, exc: Overloaded):
+    """Cold-path work is saturated: shed quickly so cache hits keep flowing."""
+    print(f"🚦 Shedding {request.url.path}: cold path saturated")
+    return JSONResponse(
+        status_code=503,
+        content={"error": "Server busy, please retry", "retry_after": exc.retry_after},
+        headers={"Retry-After": retry_after_header(exc.retry_after)},
+    )
+
 
 @app.get("/")
 def root():
@@ -66,10 +152,25 @@ def root():
 
 
 @app.get("/product")
-def get_product(barcode: str = Query(..., min_length=5, description="Product barcode")):
+def get_product(
+    request: Request,
+    response: Response,
+    barcode: str = Query(..., min_length=8, max_length=20, description="Product barcode (EAN-8, UPC-A, EAN-13 or GTIN-14)"),
+    compact: bool = Query(False, description="Return additive codes/statuses only; expand via /additives/dictionary"),
+    fields: Optional[str] = Query(None, description="Comma-separated top-level fields to return"),
+    profile: bool = Query(False, description="Admin only: profile this request (see /admin/profiles)"),
+    x_debug_profile: Optional[str] = Header(None),
+    x_admin_token: Optional[str] = Header(None),
+):
     """
     Get product information by barcode
 
+    With compact=true, FSSAI findings carry only code/status/severity and
+    the response names the dictionary version to expand them with.
+
+    With profile=true or X-Debug-Profile: 1 (and X-Admin-Token), the request
+    runs under cProfile; the X-Profile response header names the saved file.
+
     Example barcodes to try:
     - 8901063010116 (Parle-G Biscuits)
     - 8901058858242 (Maggi Noodles)
@@ -80,56 +181,185 @@ def get_product(barcode: str = Query(..., min_length=5, description="Product bar
     """
     print(f"\n📱 API Request: /product?barcode={barcode}")
 
-    if DEMO_MODE:
-        result = get_demo_product(barcode)
-        if not result:
-            return {"error": "Product not found", "barcode": barcode}
-        # Enrich with FSSAI data
-        result = _enrich_with_fssai(result)
-        print(f"✅ [DEMO] Returning product: {result.get('product_name')}")
-        return result
-
-    # Live mode — fast path: returns immediately, saves to DB in background
+    # Validate + canonicalize before any cache/DB/OFF lookup
     try:
-        result = fetch_and_respond(barcode)
+        barcode = canonicalize_barcode(barcode)
+    except InvalidBarcodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    profiling = profile or x_debug_profile == "1"
+    if profiling:
+        _require_admin(x_admin_token)
 
+    # Resolve through the provider chain (demo fixtures, or Supabase then
+    # OFF by default; first OFF scans return immediately and save in background)
+    try:
+        with profile_request(profiling, f"product-{barcode}") as profiled:
+            result = _lookup_enriched(barcode)
+            if result:
+                result = _shape_response(result, compact, fields)
+
+        if profiling:
+            response.headers["X-Profile"] = profiled.header()
+        request.state.product_found = bool(result)
         if not result:
             return {"error": "Product not found", "barcode": barcode}
-
-        # Enrich with FSSAI data
-        result = _enrich_with_fssai(result)
-        print(f"✅ Returning product: {result.get('product_name')}")
         return result
 
+    except ProviderTimeout as e:
+        raise HTTPException(status_code=504, detail=str(e))
+    except Overloaded:
+        raise
     except Exception as e:
         print(f"❌ Error processing request: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
 
+def _lookup_enriched(barcode: str) -> Optional[dict]:
+    """Resolve a canonical barcode through the provider chain and enrich it."""
+    result = product_chain.lookup(barcode)
+    if result:
+        # Enrich with FSSAI data
+        result = _enrich_with_fssai(result)
+        print(f"✅ Returning product: {result.get('product_name')}")
+    return result
+
+
 def _enrich_with_fssai(product: dict) -> dict:
-    """Add FSSAI regulation data to a product response."""
-    additives = product.get("additives", [])
-    if additives:
-        fssai_findings = check_product_fssai(additives)
-        fssai_summary = get_fssai_summary(fssai_findings)
-        product["fssai"] = {
-            "findings": fssai_findings,
-            "summary": fssai_summary,
-        }
+    """
+    Add FSSAI regulation data to a product response. Stored snapshots
+    (product_snapshots.py) arrive already enriched for the current
+    regulation version. Regional flags are always recomputed from the
+    in-memory rule table (regional_rules.py).
+    """
+    if "fssai" not in product:
+        enrich_product(product)
+    return apply_regional_flags(product)
+
+
+# Top-level fields kept in compact mode (flags/ingredients text are dropped)
+COMPACT_FIELDS = ("barcode", "product_name", "brand", "category", "additives", "fssai", "nutrition")
+
+
+def _compact_finding(finding: dict) -> dict:
+    """Code and verdict only; food_category marks a dictionary category override."""
+    compact = {"code": finding["code"], "fssai_status": finding["fssai_status"], "severity": finding["severity"]}
+    if "food_category" in finding:
+        compact["food_category"] = finding["food_category"]
+    return compact
+
+
+def _shape_response(product: dict, compact: bool, fields: Optional[str]) -> dict:
+    """Apply compact=/fields= to an enriched product without mutating it."""
+    if fields:
+        wanted = [f.strip() for f in fields.split(",") if f.strip()]
+    elif compact:
+        wanted = list(COMPACT_FIELDS)
     else:
-        product["fssai"] = {
-            "findings": [],
-            "summary": {
-                "overall_status": "No additives detected",
-                "concern_level": "safe",
-                "banned_count": 0,
-                "restricted_count": 0,
-                "permitted_count": 0,
-                "unknown_count": 0,
-                "total_additives": 0,
-            },
+        return product
+
+    shaped = {k: product[k] for k in wanted if k in product}
+    if compact and "fssai" in shaped:
+        fssai = shaped["fssai"]
+        shaped["fssai"] = {
+            "food_category": fssai.get("food_category"),
+            "findings": [_compact_finding(f) for f in fssai["findings"]],
+            "summary": fssai["summary"],
         }
-    return product
+        shaped["dictionary_version"] = additive_dictionary()[0]
+    return shaped
+
+
+@app.websocket("/scan-session")
+async def scan_session(websocket: WebSocket, compact: bool = False):
+    """
+    Streaming scan session: the client pushes barcodes as they are scanned
+    and gets each enriched product back as soon as it resolves (out of
+    order, deduplicated per session). Protocol in scan_session.py.
+    """
+    key = client_key(websocket.headers, websocket.client.host if websocket.client else None)
+
+    def resolve(barcode: str) -> dict:
+        # Same budget as /product: one token per barcode
+        try:
+            rate_limiter.check(key)
+        except RateLimited as e:
+            return {"status": RATE_LIMITED, "retry_after": round(e.retry_after, 2)}
+        try:
+            result = _lookup_enriched(barcode)
+        except ProviderTimeout as e:
+            return {"status": TIMEOUT, "error": str(e)}
+        except Overloaded as e:
+            return {"status": SHED, "retry_after": e.retry_after}
+        if not result:
+            return {"status": NOT_FOUND}
+        return {"status": FOUND, "product": _shape_response(result, compact, None)}
+
+    print(f"\n📡 Scan session opened ({key})")
+    session = ScanSession(websocket, key, canonicalize_barcode, resolve)
+    if await session.run():
+        print(f"📡 Scan session closed ({key}, {session.accepted} barcodes)")
+    else:
+        print(f"📡 Scan session refused ({key}: too many open sessions)")
+
+
+@app.get("/additives/dictionary")
+def additives_dictionary(request: Request, v: Optional[str] = Query(None, description="Expected version")):
+    """
+    Full additive text (names, concerns, FSSAI notes) keyed by code.
+    Versioned by content hash: fetch once, revalidate with If-None-Match.
+    """
+    version, body = additive_dictionary()
+    etag = f'"{version}"'
+    # A request pinned to the current version can be cached forever
+    cache_control = "public, max-age=31536000, immutable" if v == version else "public, max-age=3600"
+    headers = {"ETag": etag, "Cache-Control": cache_control}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+
+@app.get("/search")
+def search(
+    q: str = Query(..., min_length=3, max_length=100, description="Product or brand name, e.g. 'maggi masala'"),
+    limit: int = Query(20, ge=1, le=50),
+):
+    """Ranked product search by name and brand (prefix + typo tolerant)"""
+    try:
+        results = search_products(q, limit=limit, demo=DEMO_MODE)
+    except Exception as e:
+        print(f"❌ Search failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
+    return {"query": q, "count": len(results), "results": results}
+
+
+@app.get("/additives")
+def search_additives(
+    q: str = Query(..., min_length=1, max_length=60, description="Code or name fragment, e.g. 'E3', 'INS 211', 'sodium benz'"),
+    limit: int = Query(10, ge=1, le=50),
+):
+    """Additive autocomplete over FSSAI codes, names and synonyms"""
+    index = get_additive_index()
+    results = index.search(q, limit=limit)
+    return {"query": q, "version": index.version, "count": len(results), "results": results}
+
+
+@app.get("/alternatives")
+def alternatives(
+    barcode: str = Query(..., min_length=8, max_length=20, description="Scanned product barcode"),
+    category: Optional[str] = Query(None, description="OFF category string, if the product is not ranked yet"),
+    limit: int = Query(5, ge=1, le=20),
+):
+    """Lowest-concern products in the same category as the scanned product"""
+    try:
+        barcode = canonicalize_barcode(barcode)
+    except InvalidBarcodeError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    try:
+        return get_alternatives(barcode, category=category, limit=limit, demo=DEMO_MODE)
+    except Exception as e:
+        print(f"❌ Alternatives lookup failed: {e}")
+        raise HTTPException(status_code=500, detail=str(e))
 
 
 @app.get("/barcodes")
@@ -143,6 +373,107 @@ def list_barcodes():
     return {"mode": "live", "message": "Scan any barcode to look it up"}
 
 
+def _require_user_token(authorization: Optional[str]) -> str:
+    """Extract the Supabase access token from an `Authorization: Bearer` header."""
+    if DEMO_MODE:
+        raise HTTPException(status_code=503, detail="User history requires live mode")
+    if not authorization or not authorization.lower().startswith("bearer "):
+        raise HTTPException(status_code=401, detail="Missing bearer token")
+    return authorization[7:].strip()
+
+
+@app.get("/me/scans")
+def my_scans(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    intent: Optional[str] = Query(None, description="checked | consumed | avoided | purchased"),
+    authorization: Optional[str] = Header(None),
+):
+    """Current user's scan history, newest first (keyset-paginated)"""
+    token = _require_user_token(authorization)
+    if intent in (None, "all"):
+        intent = None
+    elif intent not in VALID_INTENTS:
+        raise HTTPException(status_code=400, detail=f"Unknown intent: {intent}")
+    try:
+        return get_scan_history(token, limit=limit, cursor=cursor, intent=intent)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/me/purchases")
+def my_purchases(
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = Query(None, description="next_cursor from the previous page"),
+    authorization: Optional[str] = Header(None),
+):
+    """Current user's purchases, most recent first (keyset-paginated)"""
+    token = _require_user_token(authorization)
+    try:
+        return get_purchase_history(token, limit=limit, cursor=cursor)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.get("/me/stats")
+def my_stats(
+    weeks: int = Query(4, ge=1, le=52),
+    authorization: Optional[str] = Header(None),
+):
+    """Weekly activity, verdict mix, intents and purchases aggregated in SQL"""
+    token = _require_user_token(authorization)
+    return get_scan_stats(token, weeks=weeks)
+
+
+def _require_admin(x_admin_token: Optional[str]):
+    """Reject the request unless it carries the configured X-Admin-Token."""
+    if not ADMIN_TOKEN:
+        raise HTTPException(status_code=403, detail="Admin endpoints are disabled (ADMIN_TOKEN not set)")
+    if not x_admin_token or not hmac.compare_digest(x_admin_token.encode(), ADMIN_TOKEN.encode()):
+        raise HTTPException(status_code=401, detail="Invalid admin token")
+
+
+@app.get("/export/catalog.ndjson")
+def export_catalog(
+    gzip: bool = Query(False, description="Gzip-compress the stream"),
+    page_size: int = Query(200, ge=10, le=1000),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Stream the whole enriched catalog as NDJSON (admin only)"""
+    _require_admin(x_admin_token)
+    records = iter_catalog_records(page_size=page_size, demo=DEMO_MODE)
+    headers = {"Content-Disposition": 'attachment; filename="catalog.ndjson' + ('.gz"' if gzip else '"')}
+    return StreamingResponse(
+        iter_ndjson(records, gzip=gzip),
+        media_type="application/gzip" if gzip else "application/x-ndjson",
+        headers=headers,
+    )
+
+
+@app.get("/admin/profiles")
+def admin_profiles(x_admin_token: Optional[str] = Header(None)):
+    """Request profiles captured with /product?profile=true, newest first."""
+    _require_admin(x_admin_token)
+    return {"profiles": list_profiles()}
+
+
+@app.get("/admin/profiles/{name}")
+def admin_profile(
+    name: str,
+    format: str = Query("pstats", pattern="^(pstats|text)$", description="Raw pstats file or a text summary"),
+    sort: str = Query("cumulative", pattern="^(cumulative|tottime|ncalls)$"),
+    x_admin_token: Optional[str] = Header(None),
+):
+    """Download a profile, or read its top functions as text."""
+    _require_admin(x_admin_token)
+    path = profile_path(name)
+    if not path:
+        raise HTTPException(status_code=404, detail="Profile not found")
+    if format == "text":
+        return PlainTextResponse(profile_summary(path, sort=sort))
+    return FileResponse(path, media_type="application/octet-stream", filename=name)
+
+
 @app.get("/health")
 def health_check():
     """Detailed health check"""
@@ -150,7 +481,18 @@ def health_check():
         "status": "healthy",
         "mode": "demo" if DEMO_MODE else "live",
         "database": "mock" if DEMO_MODE else "connected",
-        "api": "operational"
+        "api": "operational",
+        "cold_path": cold_path_gate.stats(),
+        "providers": product_chain.describe(),
+        "traffic_capture": traffic_recorder.stats() if traffic_recorder else None,
+        "scan_sessions": session_stats(),
+        "supabase_pool": pool_stats(),
+        "ingest_outbox": None if DEMO_MODE or not ingest_outbox else ingest_outbox.stats(),
+        "barcode_filter": None if DEMO_MODE or not barcode_filter else barcode_filter.stats(),
+        "regional_rules": None if DEMO_MODE else regional_rules_stats(),
+        "product_refresh": None if DEMO_MODE or not product_refresher else {
+            **freshness_policy.describe(), **product_refresher.stats(),
+        },
     }
 
 
@@ -344,6 +686,8 @@ if __name__ == "__main__":
     ║  • Product:  http://localhost:{port}/product?barcode=8901063010116
     ║  • Test UI:  http://localhost:{port}/test
     ║  • Barcodes: http://localhost:{port}/barcodes
+    ║  • Search:   http://localhost:{port}/search?q=maggi
+    ║  • History:  http://localhost:{port}/me/scans (Bearer token)
     ║                                                      ║
     ║  Press CTRL+C to stop                                ║
     ╚══════════════════════════════════════════════════════╝
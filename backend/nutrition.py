@@ -0,0 +1,267 @@
+"""
+Nutrition - Per-100 g/ml nutrition facts and HFSS scoring
+
+Extracts the nutrition panel from an Open Food Facts document and flags
+products High in Fat (saturated), Sugar or Salt using FSSAI's HFSS
+definition. Scored once at ingest and stored with the product
+(`products.nutrition`, supabase_migration_v9_nutrition.sql), so cached
+reads never recompute it.
+
+score_batch() scores many products at once and backs the catalog jobs:
+
+    python nutrition.py --backfill --rate 5   # fetch panels for products without one
+    python nutrition.py --rescore             # re-score stored panels after a threshold change
+"""
+import re
+import sys
+import time
+from typing import Optional, Dict, Any, List
+
+SOLID = "100g"
+LIQUID = "100ml"
+
+# Stored field -> OFF nutriments key (all per 100 g / 100 ml)
+NUTRIENT_KEYS = {
+    "energy_kcal": "energy-kcal_100g",
+    "fat_g": "fat_100g",
+    "saturated_fat_g": "saturated-fat_100g",
+    "sugars_g": "sugars_100g",
+    "salt_g": "salt_100g",
+    "fiber_g": "fiber_100g",
+    "proteins_g": "proteins_100g",
+}
+
+NUTRISCORE_GRADES = ("a", "b", "c", "d", "e")
+
+# HFSS cut-offs from FSSAI's definition of "High Fat, Sugar, Salt" food in
+# the draft Food Safety and Standards (Labelling and Display) Regulations,
+# 2019 (front-of-pack labelling), aligned with the WHO South-East Asia
+# Region Nutrient Profile Model (2016). They are relative to the product's
+# energy, so the same limits apply per 100 g and per 100 ml:
+#   sugar          energy from total sugars    >= 10% of total energy
+#   saturated fat  energy from saturated fat   >= 10% of total energy
+#   salt           sodium                      >= 1 mg per kcal
+HFSS_NUTRIENTS = ("sugars_g", "saturated_fat_g", "salt_g")
+HFSS_THRESHOLDS = {
+    "sugars_energy_pct": 10.0,
+    "saturated_fat_energy_pct": 10.0,
+    "sodium_mg_per_kcal": 1.0,
+}
+_HFSS_LABELS = {"sugars_g": "sugar", "saturated_fat_g": "saturated_fat", "salt_g": "salt"}
+
+# Atwater factors and the salt/sodium ratio
+_KCAL_PER_G = {"sugars_g": 4.0, "saturated_fat_g": 9.0}
+_SODIUM_MG_PER_G_SALT = 1000 / 2.5
+
+_LIQUID_QUANTITY_RE = re.compile(r"\d\s*(ml|cl|dl|l|litre|liter)\b", re.IGNORECASE)
+_LIQUID_CATEGORY_RE = re.compile(r"\b(beverages?|drinks?|juices?|sodas?)\b", re.IGNORECASE)
+
+
+def _number(value) -> Optional[float]:
+    try:
+        return round(float(value), 3)
+    except (TypeError, ValueError):
+        return None
+
+
+def nutrition_basis(off_product: Dict[str, Any]) -> str:
+    """100ml for drinks (by pack quantity or category), else 100g."""
+    if _LIQUID_QUANTITY_RE.search(off_product.get("quantity") or ""):
+        return LIQUID
+    if _LIQUID_CATEGORY_RE.search(off_product.get("categories") or ""):
+        return LIQUID
+    return SOLID
+
+
+def extract_nutrition(off_product: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Nutrition facts from an OFF document, or None if it has no nutrition panel."""
+    nutriments = off_product.get("nutriments") or {}
+    values = {field: _number(nutriments.get(key)) for field, key in NUTRIENT_KEYS.items()}
+    if values["salt_g"] is None and _number(nutriments.get("sodium_100g")) is not None:
+        values["salt_g"] = round(_number(nutriments["sodium_100g"]) * 2.5, 3)
+    if all(v is None for v in values.values()):
+        return None
+
+    grade = off_product.get("nutriscore_grade") or off_product.get("nutrition_grade_fr")
+    return {
+        "basis": nutrition_basis(off_product),
+        **values,
+        "nutriscore_grade": grade.lower() if isinstance(grade, str) and grade.lower() in NUTRISCORE_GRADES else None,
+    }
+
+
+# ============================================================
+# HFSS SCORING
+# ============================================================
+def _hfss_block(high: List[str]) -> Dict[str, Any]:
+    return {"high_in": high, "is_hfss": bool(high)}
+
+
+def _is_high(field: str, value: float, energy_kcal: float) -> bool:
+    if field == "salt_g":
+        return value * _SODIUM_MG_PER_G_SALT / energy_kcal >= HFSS_THRESHOLDS["sodium_mg_per_kcal"]
+    limit = HFSS_THRESHOLDS["sugars_energy_pct" if field == "sugars_g" else "saturated_fat_energy_pct"]
+    return value * _KCAL_PER_G[field] * 100 / energy_kcal >= limit
+
+
+def score_nutrition(nutrition: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    HFSS verdict for one product: which nutrients exceed their cut-off.
+    The cut-offs are shares of energy, so products without a positive
+    energy value (or a nutrient) are never high in it.
+    """
+    energy = nutrition.get("energy_kcal")
+    if not energy or energy <= 0:
+        return _hfss_block([])
+    high = [
+        _HFSS_LABELS[field] for field in HFSS_NUTRIENTS
+        if nutrition.get(field) is not None and _is_high(field, nutrition[field], energy)
+    ]
+    return _hfss_block(high)
+
+
+def score_batch(nutritions: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """score_nutrition over many products (the backfill and rescore jobs)."""
+    return [score_nutrition(n) for n in nutritions]
+
+
+def nutrition_from_off(off_product: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Extracted nutrition with its HFSS verdict attached (what gets stored)."""
+    nutrition = extract_nutrition(off_product)
+    if nutrition:
+        nutrition["hfss"] = score_nutrition(nutrition)
+    return nutrition
+
+
+# ============================================================
+# BACKFILL (existing catalog)
+# ============================================================
+def backfill_nutrition(page_size: int = 200, rate: float = 5.0) -> Dict[str, int]:
+    """
+    Fill `products.nutrition` for products ingested before it existed:
+    refetch each page's OFF documents (throttled), score the page in one
+    score_batch call and write it back with one RPC. Snapshots of updated
+    products are dropped so the next read serves the new panel.
+    """
+    from database import supabase
+    from open_food_facts import fetch_product_from_off
+    from rate_limit import RateLimiter
+
+    limiter = RateLimiter(rate)
+    totals = {"scanned": 0, "updated": 0}
+    last_id = None
+    while True:
+        query = supabase.table("products") \
+            .select("id, barcodes(barcode_number)") \
+            .is_("nutrition", "null") \
+            .order("id") \
+            .limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        ids, nutritions = [], []
+        for row in rows:
+            if not row.get("barcodes"):
+                continue
+            limiter.acquire()
+            off_product = fetch_product_from_off(row["barcodes"][0]["barcode_number"])
+            nutrition = extract_nutrition(off_product) if off_product else None
+            if nutrition:
+                ids.append(row["id"])
+                nutritions.append(nutrition)
+
+        for nutrition, hfss in zip(nutritions, score_batch(nutritions)):
+            nutrition["hfss"] = hfss
+        if ids:
+            supabase.rpc("set_product_nutrition", {
+                "p_rows": [{"id": pid, "nutrition": n} for pid, n in zip(ids, nutritions)],
+            }).execute()
+            supabase.table("product_snapshots") \
+                .delete() \
+                .in_("product_id", ids) \
+                .execute()
+
+        totals["scanned"] += len(rows)
+        totals["updated"] += len(ids)
+        print(f"⏳ Nutrition backfill: {totals['updated']}/{totals['scanned']} products updated")
+        if len(rows) < page_size:
+            break
+
+    print(f"✅ Nutrition backfill finished: {totals}")
+    return totals
+
+
+def rescore_nutrition(page_size: int = 500) -> Dict[str, int]:
+    """
+    Re-score the HFSS verdict of every stored nutrition panel in place (no
+    OFF fetches), e.g. after HFSS_THRESHOLDS change. Snapshots of changed
+    products are dropped so the next read rebuilds them.
+    """
+    from database import supabase
+
+    totals = {"scanned": 0, "updated": 0}
+    last_id = None
+    while True:
+        query = supabase.table("products") \
+            .select("id, nutrition") \
+            .not_.is_("nutrition", "null") \
+            .order("id") \
+            .limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        if not rows:
+            break
+        last_id = rows[-1]["id"]
+
+        changed = []
+        for row, hfss in zip(rows, score_batch([row["nutrition"] for row in rows])):
+            if row["nutrition"].get("hfss") != hfss:
+                changed.append({"id": row["id"], "nutrition": {**row["nutrition"], "hfss": hfss}})
+        if changed:
+            supabase.rpc("set_product_nutrition", {"p_rows": changed}).execute()
+            supabase.table("product_snapshots") \
+                .delete() \
+                .in_("product_id", [row["id"] for row in changed]) \
+                .execute()
+
+        totals["scanned"] += len(rows)
+        totals["updated"] += len(changed)
+        print(f"⏳ HFSS rescore: {totals['updated']}/{totals['scanned']} products changed")
+        if len(rows) < page_size:
+            break
+
+    print(f"✅ HFSS rescore finished: {totals}")
+    return totals
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Nutrition facts and HFSS scoring")
+    parser.add_argument("--backfill", action="store_true", help="Score stored products missing nutrition")
+    parser.add_argument("--rescore", action="store_true", help="Re-score stored nutrition with the current thresholds")
+    parser.add_argument("--page-size", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=5.0, help="Max Open Food Facts fetches per second")
+    args = parser.parse_args(argv)
+
+    if not (args.backfill or args.rescore):
+        parser.print_help()
+        return 2
+    started = time.monotonic()
+    if args.backfill:
+        backfill_nutrition(page_size=args.page_size, rate=args.rate)
+    if args.rescore:
+        rescore_nutrition(page_size=args.page_size)
+    print(f"⏱️ Took {time.monotonic() - started:.1f}s")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -8,6 +8,48 @@ from typing import Optional, Dict, Any
 OFF_API_URL = "https://world.openfoodfacts.org/api/v2/product"
 
 
+class OFFUnavailable(Exception):
+    """Open Food Facts could not answer (timeout, connection error, 429/5xx)."""
+
+
+def lookup_product_on_off(barcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch product data from Open Food Facts, telling "not found" apart
+    from "couldn't ask"
+
+    Returns:
+        Product data dict, or None only when OFF confirms the barcode is unknown
+
+    Raises:
+        OFFUnavailable: on transport errors, rate limiting and server errors
+    """
+    url = f"{OFF_API_URL}/{barcode}.json"
+    print(f"📡 Fetching from Open Food Facts: {url}")
+
+    try:
+        response = requests.get(url, timeout=10)
+    except requests.RequestException as e:
+        raise OFFUnavailable(f"Error fetching from OFF: {e}") from e
+
+    # API v2 answers unknown barcodes with 404 and {"status": 0}
+    if response.status_code not in (200, 404):
+        raise OFFUnavailable(f"OFF API returned status {response.status_code}")
+
+    try:
+        data = response.json()
+    except ValueError as e:
+        raise OFFUnavailable(f"OFF API returned invalid JSON (status {response.status_code})") from e
+
+    if data.get("status") != 1:
+        print(f"❌ Product not found in Open Food Facts")
+        return None
+
+    product = data.get("product", {})
+    print(f"✅ Found product: {product.get('product_name', 'Unknown')}")
+
+    return product
+
+
 def fetch_product_from_off(barcode: str) -> Optional[Dict[str, Any]]:
     """
     Fetch product data from Open Food Facts API
@@ -16,31 +58,12 @@ def fetch_product_from_off(barcode: str) -> Optional[Dict[str, Any]]:
         barcode: Product barcode (EAN-13, UPC, etc.)
     
     Returns:
-        Product data dict or None if not found
+        Product data dict or None if not found (or OFF is unavailable)
     """
     try:
-        url = f"{OFF_API_URL}/{barcode}.json"
-        print(f"📡 Fetching from Open Food Facts: {url}")
-        
-        response = requests.get(url, timeout=10)
-        
-        if response.status_code != 200:
-            print(f"❌ OFF API returned status {response.status_code}")
-            return None
-        
-        data = response.json()
-        
-        if data.get("status") != 1:
-            print(f"❌ Product not found in Open Food Facts")
-            return None
-        
-        product = data.get("product", {})
-        print(f"✅ Found product: {product.get('product_name', 'Unknown')}")
-        
-        return product
-        
-    except requests.RequestException as e:
-        print(f"❌ Error fetching from OFF: {e}")
+        return lookup_product_on_off(barcode)
+    except OFFUnavailable as e:
+        print(f"❌ {e}")
         return None
 
 
@@ -0,0 +1,182 @@
+"""
+Product Refresh - Stale-while-revalidate for stored products
+
+A stored product is served from Supabase as long as it exists, so OFF
+reformulations (new additives, changed ingredients) used to stay
+invisible forever. Now each product carries `off_fetched_at` and
+`off_content_hash` (supabase_migration_v11_product_freshness.sql):
+
+- FreshnessPolicy: a product is stale once older than
+  PRODUCT_MAX_AGE_HOURS, spread by up to +PRODUCT_MAX_AGE_SPREAD per
+  barcode so products ingested together don't expire together
+- Stale products are still served immediately; the read queues a
+  background refresh
+- ProductRefresher re-fetches from OFF at most PRODUCT_REFRESH_RATE per
+  second and re-ingests only when the content hash changed; otherwise
+  it just bumps off_fetched_at (also when OFF confirms the product is
+  gone, but not when OFF is unreachable, rate limiting or erroring)
+
+Refreshes are best effort: queue overflow and failures are dropped, and
+a barcode is not retried for PRODUCT_REFRESH_RETRY_S after an attempt.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+import zlib
+from collections import OrderedDict
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any, Callable
+
+from nutrition import NUTRIENT_KEYS
+from rate_limit import RateLimiter
+
+# OFF fields that make up a product's content (what we store or derive from)
+_CONTENT_FIELDS = ("product_name", "brands", "categories", "quantity", "ingredients_text", "ingredients_text_en",
+                   "nutriscore_grade")
+
+
+def content_hash(off_product: Dict[str, Any]) -> str:
+    """Short hash of the OFF fields we ingest; equal hashes mean nothing to re-ingest."""
+    nutriments = off_product.get("nutriments") or {}
+    content = {
+        **{field: off_product.get(field) for field in _CONTENT_FIELDS},
+        "additives_tags": sorted(off_product.get("additives_tags") or []),
+        "nutriments": {key: nutriments.get(key) for key in sorted(NUTRIENT_KEYS.values())},
+    }
+    canonical = json.dumps(content, sort_keys=True, separators=(",", ":"), ensure_ascii=False, default=str)
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:16]
+
+
+class FreshnessPolicy:
+    """When a stored product is due for a refresh."""
+
+    def __init__(self, max_age_hours: float = 720, spread: float = 0.2):
+        self.max_age_seconds = max_age_hours * 3600
+        self.spread = spread
+
+    def max_age_for(self, barcode: str) -> float:
+        # Deterministic per-barcode stretch in [0, spread)
+        return self.max_age_seconds * (1 + self.spread * (zlib.crc32(barcode.encode()) % 1000) / 1000)
+
+    def is_stale(self, barcode: str, fetched_at: Optional[str], now: Optional[float] = None) -> bool:
+        """True if never fetched (pre-freshness rows) or older than the barcode's max age."""
+        if not fetched_at:
+            return True
+        try:
+            fetched = datetime.fromisoformat(fetched_at).timestamp()
+        except ValueError:
+            return True
+        now = now if now is not None else time.time()
+        return now - fetched > self.max_age_for(barcode)
+
+    def describe(self) -> Dict[str, Any]:
+        return {"max_age_hours": self.max_age_seconds / 3600, "spread": self.spread}
+
+
+def utc_now_iso() -> str:
+    return datetime.now(timezone.utc).isoformat()
+
+
+class ProductRefresher:
+    """
+    Bounded, deduplicated queue of barcodes to refresh, drained by one
+    daemon thread at a fixed rate. `refresh(barcode, product_id, known_hash)`
+    does the work and returns "changed", "unchanged" or "missing".
+    """
+
+    def __init__(
+        self,
+        refresh: Callable[[str, str, Optional[str]], str],
+        rate: float = 1.0,
+        max_pending: int = 1000,
+        retry_seconds: float = 3600,
+    ):
+        self._refresh = refresh
+        self._limiter = RateLimiter(rate)
+        self.max_pending = max_pending
+        self.retry_seconds = retry_seconds
+        self._pending: "OrderedDict[str, tuple]" = OrderedDict()
+        self._attempted: Dict[str, float] = {}
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self.counts = {"queued": 0, "dropped": 0, "changed": 0, "unchanged": 0, "missing": 0, "failed": 0}
+
+    def request(self, barcode: str, product_id: str, known_hash: Optional[str]) -> bool:
+        """Queue a refresh unless one is pending, recently attempted or the queue is full."""
+        now = time.monotonic()
+        with self._lock:
+            if barcode in self._pending:
+                return False
+            if now - self._attempted.get(barcode, float("-inf")) < self.retry_seconds:
+                return False
+            if len(self._pending) >= self.max_pending:
+                self.counts["dropped"] += 1
+                return False
+            self._pending[barcode] = (product_id, known_hash)
+            self.counts["queued"] += 1
+        self._start()
+        self._wake.set()
+        return True
+
+    def _start(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(target=self._run, name="product-refresh", daemon=True)
+                    self._thread.start()
+
+    def _next(self) -> Optional[tuple]:
+        with self._lock:
+            if not self._pending:
+                return None
+            barcode, (product_id, known_hash) = self._pending.popitem(last=False)
+            now = time.monotonic()
+            self._attempted[barcode] = now
+            if len(self._attempted) > 10 * self.max_pending:
+                self._attempted = {b: t for b, t in self._attempted.items() if now - t < self.retry_seconds}
+            return barcode, product_id, known_hash
+
+    def _run(self):
+        while True:
+            item = self._next()
+            if item is None:
+                self._wake.wait()
+                self._wake.clear()
+                continue
+            self._limiter.acquire()
+            barcode = item[0]
+            try:
+                outcome = self._refresh(*item)
+                self.counts[outcome] = self.counts.get(outcome, 0) + 1
+                if outcome == "changed":
+                    print(f"🔄 [Refresh] {barcode} changed on Open Food Facts, re-ingested")
+            except Exception as e:
+                self.counts["failed"] += 1
+                print(f"⚠️ [Refresh] {barcode} failed (retried after {self.retry_seconds:.0f}s): {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            pending = len(self._pending)
+        return {"pending": pending, **self.counts}
+
+
+def policy_from_env() -> FreshnessPolicy:
+    return FreshnessPolicy(
+        max_age_hours=float(os.getenv("PRODUCT_MAX_AGE_HOURS", "720")),
+        spread=float(os.getenv("PRODUCT_MAX_AGE_SPREAD", "0.2")),
+    )
+
+
+def refresher_from_env(refresh: Callable[[str, str, Optional[str]], str]) -> Optional[ProductRefresher]:
+    """Refresher configured from the environment, or None if PRODUCT_REFRESH=false."""
+    if os.getenv("PRODUCT_REFRESH", "true").lower() != "true":
+        return None
+    return ProductRefresher(
+        refresh,
+        rate=float(os.getenv("PRODUCT_REFRESH_RATE", "1")),
+        max_pending=int(os.getenv("PRODUCT_REFRESH_MAX_PENDING", "1000")),
+        retry_seconds=float(os.getenv("PRODUCT_REFRESH_RETRY_S", "3600")),
+    )
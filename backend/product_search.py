@@ -0,0 +1,200 @@
+"""
+Product Search - Ranked name/brand search
+
+Two backends with the same result shape:
+
+- Supabase: `search_products` RPC over a pg_trgm GIN index
+  (supabase_migration_v6_product_search.sql; word matching in v14)
+- Demo/offline: ProductSearchIndex, an in-process inverted index with a
+  sorted vocabulary for prefix matching and a trigram index for typos
+
+Query tokens are ANDed. Each token matches a product token exactly,
+as a prefix ("mas" -> "masala"), or fuzzily by trigram similarity
+("magi" -> "maggi"); better match kinds score higher.
+"""
+import bisect
+import heapq
+import re
+import threading
+from array import array
+from typing import Optional, Dict, Any, List, Iterable, Set
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+MIN_PREFIX_LEN = 2          # shorter prefixes match too much to be useful
+MIN_INDEXED_WORD_LEN = 3    # pg_trgm can't serve ILIKE on shorter words
+MAX_PREFIX_EXPANSIONS = 64  # vocabulary terms considered per prefix
+MIN_TRIGRAM_SIMILARITY = 0.4
+MAX_QUERY_TOKENS = 6
+
+EXACT_SCORE = 3.0
+PREFIX_SCORE = 2.0
+
+
+def tokenize(text: Optional[str]) -> List[str]:
+    return _TOKEN_RE.findall((text or "").lower())
+
+
+def _trigrams(token: str) -> Set[str]:
+    padded = f"  {token} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+# ============================================================
+# IN-PROCESS INDEX (demo / offline mode)
+# ============================================================
+class ProductSearchIndex:
+    """Inverted index over product_name + brand, safe for concurrent reads."""
+
+    def __init__(self):
+        self._docs: List[Dict[str, Any]] = []
+        self._postings: Dict[str, array] = {}
+        self._vocab: List[str] = []
+        self._trigram_terms: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+
+    def __len__(self) -> int:
+        return len(self._docs)
+
+    def add(self, product: Dict[str, Any]):
+        """Index one product (dict with barcode, product_name, brand, category)."""
+        with self._lock:
+            doc_id = len(self._docs)
+            self._docs.append({
+                "barcode": product.get("barcode"),
+                "product_name": product.get("product_name"),
+                "brand": product.get("brand"),
+                "category": product.get("category"),
+            })
+            for token in set(tokenize(product.get("product_name")) + tokenize(product.get("brand"))):
+                postings = self._postings.get(token)
+                if postings is None:
+                    postings = self._postings[token] = array("I")
+                    bisect.insort(self._vocab, token)
+                    for gram in _trigrams(token):
+                        self._trigram_terms.setdefault(gram, []).append(token)
+                postings.append(doc_id)
+
+    def add_many(self, products: Iterable[Dict[str, Any]]):
+        for product in products:
+            self.add(product)
+
+    def _expand(self, token: str) -> Dict[str, float]:
+        """Vocabulary terms matching a query token, with their match score."""
+        matches: Dict[str, float] = {}
+        if token in self._postings:
+            matches[token] = EXACT_SCORE
+
+        if len(token) >= MIN_PREFIX_LEN:
+            i = bisect.bisect_left(self._vocab, token)
+            for term in self._vocab[i:i + MAX_PREFIX_EXPANSIONS]:
+                if not term.startswith(token):
+                    break
+                matches.setdefault(term, PREFIX_SCORE)
+
+        if not matches and len(token) >= 3:
+            grams = _trigrams(token)
+            overlap: Dict[str, int] = {}
+            for gram in grams:
+                for term in self._trigram_terms.get(gram, ()):
+                    overlap[term] = overlap.get(term, 0) + 1
+            for term, shared in overlap.items():
+                similarity = shared / (len(grams) + len(_trigrams(term)) - shared)
+                if similarity >= MIN_TRIGRAM_SIMILARITY:
+                    matches[term] = similarity
+        return matches
+
+    def _contains(self, term: str, doc_id: int) -> bool:
+        postings = self._postings[term]
+        i = bisect.bisect_left(postings, doc_id)
+        return i < len(postings) and postings[i] == doc_id
+
+    def search(self, query: str, limit: int = 20) -> List[Dict[str, Any]]:
+        tokens = tokenize(query)[:MAX_QUERY_TOKENS]
+        if not tokens:
+            return []
+
+        expansions = [self._expand(token) for token in tokens]
+        if not all(expansions):
+            return []
+
+        # AND semantics: materialize only the most selective token's postings,
+        # then probe the other tokens' (sorted) postings per candidate.
+        expansions.sort(key=lambda terms: sum(len(self._postings[t]) for t in terms))
+        candidates: Dict[int, float] = {}
+        for term, score in expansions[0].items():
+            for doc_id in self._postings[term]:
+                if candidates.get(doc_id, 0.0) < score:
+                    candidates[doc_id] = score
+
+        for terms in expansions[1:]:
+            if sum(len(self._postings[t]) for t in terms) < 4 * len(candidates):
+                # Postings are short relative to the candidates: scan them
+                best: Dict[int, float] = {}
+                for term, score in terms.items():
+                    for doc_id in self._postings[term]:
+                        if doc_id in candidates and best.get(doc_id, 0.0) < score:
+                            best[doc_id] = score
+                candidates = {d: candidates[d] + score for d, score in best.items()}
+            else:
+                # Few candidates: binary-search each one in the sorted postings
+                narrowed: Dict[int, float] = {}
+                for doc_id, total in candidates.items():
+                    score = max((s for t, s in terms.items() if self._contains(t, doc_id)), default=0.0)
+                    if score:
+                        narrowed[doc_id] = total + score
+                candidates = narrowed
+            if not candidates:
+                return []
+
+        ranked = heapq.nsmallest(
+            limit,
+            candidates.items(),
+            key=lambda item: (-item[1], len(self._docs[item[0]]["product_name"] or "")),
+        )
+        return [dict(self._docs[doc_id], score=round(score, 3)) for doc_id, score in ranked]
+
+
+_local_index: Optional[ProductSearchIndex] = None
+
+
+def get_local_index() -> ProductSearchIndex:
+    """Lazily build the in-process index from the demo catalog."""
+    global _local_index
+    if _local_index is None:
+        from demo_data import DEMO_PRODUCTS
+
+        index = ProductSearchIndex()
+        index.add_many(DEMO_PRODUCTS.values())
+        _local_index = index
+    return _local_index
+
+
+# ============================================================
+# SUPABASE (pg_trgm)
+# ============================================================
+def search_supabase(query: str, limit: int = 20) -> List[Dict[str, Any]]:
+    from database import supabase
+
+    # The RPC ANDs one trigram-indexed ILIKE per word; without a word long
+    # enough to index there is nothing it can match cheaply
+    if not any(len(token) >= MIN_INDEXED_WORD_LEN for token in tokenize(query)):
+        return []
+    result = supabase.rpc("search_products", {"p_query": query, "p_limit": limit}).execute()
+    return [
+        {
+            "barcode": row["barcode"],
+            "product_name": row["product_name"],
+            "brand": row.get("brand_name"),
+            "category": row.get("category"),
+            "score": row.get("score"),
+        }
+        for row in (result.data or [])
+    ]
+
+
+def search_products(query: str, limit: int = 20, demo: bool = False) -> List[Dict[str, Any]]:
+    """Ranked products whose name/brand match the query."""
+    if demo:
+        return get_local_index().search(query, limit)
+    return search_supabase(query, limit)
@@ -4,10 +4,20 @@ Product Service - Core business logic for product ingestion and retrieval
 Optimized: First-scan products return immediately from OFF data.
 Supabase ingestion runs in a background thread so the user doesn't wait.
 """
+import os
 import threading
-from typing import Optional, Dict, Any, List
+from typing import Optional, Dict, Any, Tuple
 from database import supabase
-from open_food_facts import fetch_product_from_off, extract_additives
+from open_food_facts import fetch_product_from_off, lookup_product_on_off, extract_additives
+from fssai_regulations import check_product_fssai, enrich_product
+from alternatives import record_product_ranking
+from admission import cold_path_gate
+from ingest_outbox import OutboxWorker, outbox_from_env
+from nutrition import nutrition_from_off
+from product_snapshots import fetch_snapshot, is_current, store_snapshot
+from barcode_filter import barcode_filter_from_env
+from regional_rules import ensure_loaded as ensure_rules_loaded
+from product_refresh import content_hash, policy_from_env, refresher_from_env, utc_now_iso
 
 
 # ============================================================
@@ -65,66 +75,89 @@ def build_response_from_off(barcode: str, off_product: Dict[str, Any]) -> Dict[s
         "ingredients": ingredients_text,
         "additives": additive_codes,
         "flags": flags,
+        "nutrition": nutrition_from_off(off_product),
     }
 
 
 # ============================================================
 # BACKGROUND SUPABASE INGESTION
 # ============================================================
-def _background_ingest(barcode: str, off_product: Dict[str, Any]):
+def ingest_product(barcode: str, off_product: Dict[str, Any], log_scan: bool = True):
     """
-    Save product data to Supabase in a background thread.
-    This runs AFTER the response is already sent to the user.
+    Save one OFF product to Supabase. Raises if the core write fails, so
+    callers can queue it for replay (see ingest_outbox). Background
+    refreshes pass log_scan=False: they are not user scans.
     """
+    print(f"🔄 [Background] Saving {barcode} to Supabase...")
+
+    response = build_response_from_off(barcode, off_product)
+    additive_codes = response["additives"]
+
+    # One transactional RPC: product, barcode, ingredients and additive
+    # links are upserted keyed on the barcode, so concurrent or repeated
+    # ingests of the same barcode converge on a single product row
+    # (supabase_migration_v8_idempotent_ingest.sql)
+    result = supabase.rpc("ingest_product", {
+        "p_barcode": barcode,
+        "p_product_name": off_product.get("product_name") or "Unknown Product",
+        "p_brand_name": off_product.get("brands"),
+        "p_category": off_product.get("categories"),
+        "p_off_product_id": off_product.get("id"),
+        "p_off_url": off_product.get("url"),
+        "p_raw_text": off_product.get("ingredients_text") or off_product.get("ingredients_text_en"),
+        "p_additive_codes": additive_codes,
+        "p_nutrition": response["nutrition"],
+        "p_content_hash": content_hash(off_product),
+    }).execute()
+    product_id = result.data
+    if barcode_filter:
+        barcode_filter.add(barcode)
+
+    # Always: a reformulation that dropped every additive clears its flags
+    _apply_regulatory_flags(product_id)
+
+    # Update the category ranking used by /alternatives
     try:
-        print(f"🔄 [Background] Saving {barcode} to Supabase...")
-
-        # Insert product
-        product = {
-            "product_name": off_product.get("product_name") or "Unknown Product",
-            "brand_name": off_product.get("brands"),
-            "category": off_product.get("categories"),
-            "off_product_id": off_product.get("id"),
-        }
-        result = supabase.table("products").insert(product).execute()
-        product_id = result.data[0]["id"]
-
-        # Insert barcode link
-        supabase.table("barcodes").insert({
-            "barcode_number": barcode,
-            "barcode_type": "EAN",
-            "product_id": product_id,
-            "source": "openfoodfacts",
-            "confidence_score": 0.8,
-            "off_url": off_product.get("url"),
-        }).execute()
+        findings = check_product_fssai(additive_codes, response["category"])
+        record_product_ranking(supabase, barcode, response, findings)
+    except Exception as e:
+        print(f"⚠️ [Background] Category ranking update failed (non-fatal): {e}")
 
-        # Insert ingredients
-        raw_text = off_product.get("ingredients_text") or off_product.get("ingredients_text_en")
-        if raw_text:
-            supabase.table("ingredient_raw").insert({
-                "product_id": product_id,
-                "raw_text": raw_text,
-                "source": "openfoodfacts",
-            }).execute()
-
-        # Insert additives (batched — fewer round-trips)
-        additive_codes = extract_additives(off_product)
-        if additive_codes:
-            _insert_additives_batched(product_id, additive_codes)
-            _apply_regulatory_flags(product_id)
-
-        # Log scan
+    # Enriched snapshot, so the next read is a single keyed fetch
+    try:
+        rebuild_snapshot(barcode)
+    except Exception as e:
+        print(f"⚠️ [Background] Snapshot build failed (non-fatal, rebuilt on read): {e}")
+
+    # Log scan
+    if log_scan:
         supabase.table("scans").insert({
             "product_id": product_id,
             "barcode_number": barcode,
             "intent": "checked",
         }).execute()
 
-        print(f"✅ [Background] Saved {off_product.get('product_name')} to Supabase")
+    print(f"✅ [Background] Saved {off_product.get('product_name')} to Supabase")
+
 
+def _background_ingest(barcode: str, off_product: Dict[str, Any]):
+    """
+    Save product data to Supabase in a background thread.
+    This runs AFTER the response is already sent to the user.
+    Failed saves go to the durable outbox and are replayed later.
+    """
+    try:
+        ingest_product(barcode, off_product)
     except Exception as e:
-        print(f"⚠️ [Background] Supabase save failed (non-fatal): {e}")
+        if ingest_outbox is None:
+            print(f"⚠️ [Background] Supabase save failed (no outbox, not replayed): {e}")
+            return
+        print(f"⚠️ [Background] Supabase save failed, queued for replay: {e}")
+        try:
+            ingest_outbox.enqueue(barcode, off_product, error=str(e))
+            _outbox_worker.notify()
+        except Exception as outbox_error:
+            print(f"❌ [Background] Could not queue {barcode} for replay: {outbox_error}")
 
 
 def start_background_ingest(barcode: str, off_product: Dict[str, Any]):
@@ -138,130 +171,216 @@ def start_background_ingest(barcode: str, off_product: Dict[str, Any]):
 
 
 # ============================================================
-# INSERT ADDITIVES (BATCHED)
+# DURABLE OUTBOX (replays failed background ingests)
 # ============================================================
-def _insert_additives_batched(product_id: str, additive_codes: List[str]):
-    """Insert additives with fewer DB round-trips."""
-    for code in additive_codes:
-        try:
-            # Upsert additive (insert if not exists)
-            existing = supabase.table("additives") \
-                .select("id") \
-                .eq("code", code) \
-                .execute()
-
-            if existing.data:
-                additive_id = existing.data[0]["id"]
-            else:
-                result = supabase.table("additives").insert({
-                    "code": code,
-                    "name": code,
-                    "category": "unknown",
-                }).execute()
-                additive_id = result.data[0]["id"]
-
-            # Link to product (skip if already linked)
-            existing_link = supabase.table("product_additives") \
-                .select("id") \
-                .eq("product_id", product_id) \
-                .eq("additive_id", additive_id) \
-                .execute()
-
-            if not existing_link.data:
-                supabase.table("product_additives").insert({
-                    "product_id": product_id,
-                    "additive_id": additive_id,
-                }).execute()
-        except Exception as e:
-            print(f"⚠️ Could not link additive {code}: {e}")
-
-    print(f"✅ Linked {len(additive_codes)} additives to product {product_id}")
+def _replay_ingest(barcode: str, off_product: Dict[str, Any]):
+    # The scan was the original request's; replays must not log it again
+    ingest_product(barcode, off_product, log_scan=False)
+
+
+ingest_outbox = outbox_from_env()
+_outbox_worker = OutboxWorker(
+    ingest_outbox,
+    _replay_ingest,
+    batch_size=int(os.getenv("INGEST_OUTBOX_BATCH", "20")),
+) if ingest_outbox else None
+
+
+def start_outbox_worker():
+    """Start replaying queued ingests (including any left from a previous run)."""
+    if _outbox_worker is None:
+        return
+    _outbox_worker.start()
+    pending = ingest_outbox.stats()["pending"]
+    if pending:
+        print(f"📋 [Outbox] {pending} pending ingests queued for replay")
+
+
+# ============================================================
+# KNOWN-BARCODE FILTER (skips Supabase for definite misses)
+# ============================================================
+barcode_filter = barcode_filter_from_env()
+
+
+def start_barcode_filter():
+    """Build this worker's barcode filter in the background and keep it refreshed."""
+    if barcode_filter:
+        barcode_filter.start(supabase)
+
+
+# ============================================================
+# STALE-WHILE-REVALIDATE (refresh stored products from OFF)
+# ============================================================
+def refresh_product(barcode: str, product_id: str, known_hash: Optional[str]) -> str:
+    """
+    Re-fetch a stored product from OFF. Re-ingests it (rebuilding its
+    snapshot) only if the content hash changed; otherwise just records
+    the fetch time. Raises OFFUnavailable if OFF couldn't answer, so the
+    refresher retries later instead of marking the product fresh.
+    """
+    off_product = lookup_product_on_off(barcode)
+    if off_product and content_hash(off_product) != known_hash:
+        ingest_product(barcode, off_product, log_scan=False)
+        return "changed"
+    supabase.table("products") \
+        .update({"off_fetched_at": utc_now_iso()}) \
+        .eq("id", product_id) \
+        .execute()
+    return "unchanged" if off_product else "missing"
+
+
+freshness_policy = policy_from_env()
+product_refresher = refresher_from_env(refresh_product)
+
+
+def _refresh_if_stale(barcode: str, snapshot: Dict[str, Any]):
+    freshness = snapshot.get("products") or {}
+    if product_refresher and freshness_policy.is_stale(barcode, freshness.get("off_fetched_at")):
+        product_refresher.request(barcode, snapshot["product_id"], freshness.get("off_content_hash"))
 
 
 # ============================================================
 # APPLY REGULATORY FLAGS
 # ============================================================
-def _apply_regulatory_flags(product_id: str):
-    """Apply regulatory flags based on additives."""
+def _apply_regulatory_flags(product_id: str) -> bool:
+    """
+    Rewrite a product's stored `product_flags` from the in-memory regional
+    rule table (regional_rules). Responses compute flags at request time;
+    the stored copy serves exports and the normalized-table read path.
+
+    Returns:
+        True on success, False if Supabase failed (logged, non-fatal)
+    """
     try:
+        table = ensure_rules_loaded(supabase)
+        if table is None:
+            return False
+
         additives = supabase.table("product_additives") \
-            .select("additive_id, additives(code)") \
+            .select("additives(code)") \
             .eq("product_id", product_id) \
             .execute()
+        flags = table.flags_for([row["additives"]["code"] for row in additives.data])
 
-        for row in additives.data:
-            additive_id = row["additive_id"]
-            code = row["additives"]["code"]
-
-            rules = supabase.table("regulatory_rules") \
-                .select("status, region, restriction_notes") \
-                .eq("additive_id", additive_id) \
-                .execute()
-
-            for rule in rules.data:
-                supabase.table("product_flags") \
-                    .delete() \
-                    .eq("product_id", product_id) \
-                    .eq("region", rule["region"]) \
-                    .eq("flag_type", rule["status"]) \
-                    .execute()
-
-                supabase.table("product_flags").insert({
-                    "product_id": product_id,
-                    "region": rule["region"],
-                    "flag_type": rule["status"],
-                    "explanation": f"Contains {code}: {rule['restriction_notes']}",
-                }).execute()
+        # Flags derive entirely from additives + rules: replace them all,
+        # in one transaction (supabase_migration_v12_replace_product_flags.sql)
+        supabase.rpc("replace_product_flags", {
+            "p_product_id": product_id,
+            "p_flags": flags,
+        }).execute()
 
         print(f"✅ Applied regulatory flags for product {product_id}")
+        return True
     except Exception as e:
         print(f"⚠️ Regulatory flags failed (non-fatal): {e}")
+        return False
 
 
 # ============================================================
-# MAIN FAST-PATH FUNCTION
+# STORED PRODUCTS (SUPABASE)
 # ============================================================
-def fetch_and_respond(barcode: str) -> Optional[Dict[str, Any]]:
-    """
-    Fast path: Fetch product and return response immediately.
+def _log_scan_async(product_id: str, barcode: str):
+    threading.Thread(
+        target=lambda: supabase.table("scans").insert({
+            "product_id": product_id,
+            "barcode_number": barcode,
+            "intent": "checked",
+        }).execute(),
+        daemon=True,
+    ).start()
+
+
+def rebuild_snapshot(barcode: str) -> Optional[Dict[str, Any]]:
+    """Rebuild a product's enriched payload from the normalized tables and store it."""
+    loaded = _load_product(barcode)
+    if not loaded:
+        return None
+    product_id, response = loaded
+    enrich_product(response)
+    store_snapshot(supabase, barcode, product_id, response)
+    return {"product_id": product_id, "payload": response}
 
-    1. Check Supabase cache first (instant for repeat scans)
-    2. If not cached, fetch from OFF and return directly
-    3. Background-save to Supabase for next time
+
+def reenrich_product(product_id: str) -> bool:
+    """
+    Recompute everything a stored product derives from the regulations:
+    its flags, and for each of its barcodes the enriched snapshot and the
+    category ranking (concern scores come from the FSSAI findings).
 
     Returns:
-        Product data dict or None if not found anywhere
+        True on success, False if any step failed (logged)
     """
-    print(f"\n{'='*50}")
-    print(f"🔍 Processing barcode: {barcode}")
-    print(f"{'='*50}")
+    if not _apply_regulatory_flags(product_id):
+        return False
+    try:
+        barcodes = supabase.table("barcodes") \
+            .select("barcode_number") \
+            .eq("product_id", product_id) \
+            .execute().data or []
+        for row in barcodes:
+            rebuilt = rebuild_snapshot(row["barcode_number"])
+            if rebuilt:
+                payload = rebuilt["payload"]
+                record_product_ranking(supabase, row["barcode_number"], payload, payload["fssai"]["findings"])
+        return True
+    except Exception as e:
+        print(f"⚠️ Re-enrichment failed for product {product_id}: {e}")
+        return False
 
-    # Fast path: already in database
-    if barcode_exists(barcode):
-        print(f"⚡ Cache hit — returning from Supabase")
-        response = get_product_response(barcode)
-        # Log scan in background
-        try:
-            product_id = get_product_id_by_barcode(barcode)
-            if product_id:
-                threading.Thread(
-                    target=lambda: supabase.table("scans").insert({
-                        "product_id": product_id,
-                        "barcode_number": barcode,
-                        "intent": "checked",
-                    }).execute(),
-                    daemon=True,
-                ).start()
-        except Exception:
-            pass
-        return response
-
-    # Slow path: fetch from Open Food Facts (~2-5s)
-    print(f"🌐 Cache miss — fetching from Open Food Facts...")
-    off_product = fetch_product_from_off(barcode)
+
+def lookup_stored(barcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Enriched response for a product already in Supabase (logging the scan),
+    or None. Served from its snapshot when that matches the regulation
+    version in effect; otherwise rebuilt once and stored. Stale products
+    are still returned, with a background refresh queued.
+    """
+    exists = None
+    if barcode_filter and not barcode_filter.might_contain(barcode):
+        # Not stored as of the filter's last sync; only confirmed when
+        # BARCODE_FILTER_CONFIRM_MISSES is set
+        if not barcode_filter.confirm_misses:
+            return None
+        exists = barcode_exists(barcode)
+        if not exists:
+            return None
+        barcode_filter.add_stale(barcode)
+
+    snapshot = fetch_snapshot(supabase, barcode)
+    if is_current(snapshot):
+        print("⚡ Cache hit — returning stored snapshot")
+        _log_scan_async(snapshot["product_id"], barcode)
+        _refresh_if_stale(barcode, snapshot)
+        return snapshot["payload"]
+
+    if snapshot is None and not (exists or barcode_exists(barcode)):
+        return None
+
+    print(f"⚡ Cache hit — rebuilding {'stale' if snapshot else 'missing'} snapshot")
+    rebuilt = rebuild_snapshot(barcode)
+    if not rebuilt:
+        return None
+    _log_scan_async(rebuilt["product_id"], barcode)
+    if snapshot:
+        _refresh_if_stale(barcode, snapshot)
+    return rebuilt["payload"]
+
+
+# ============================================================
+# COLD PATH (OPEN FOOD FACTS)
+# ============================================================
+def fetch_from_off(barcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Fetch from Open Food Facts (~2-5s), return the response built from the
+    OFF document and background-save it to Supabase for next time.
+    Bounded globally; raises admission.Overloaded when saturated.
+    """
+    print(f"🌐 Fetching {barcode} from Open Food Facts...")
+    with cold_path_gate.slot():
+        off_product = fetch_product_from_off(barcode)
 
     if not off_product:
-        print(f"❌ Product not found for barcode: {barcode}")
+        print(f"❌ Product not found on Open Food Facts: {barcode}")
         return None
 
     # Build response directly from OFF data (instant)
@@ -274,6 +393,34 @@ def fetch_and_respond(barcode: str) -> Optional[Dict[str, Any]]:
     return response
 
 
+# ============================================================
+# MAIN FAST-PATH FUNCTION
+# ============================================================
+def fetch_and_respond(barcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Fast path: Fetch product and return response immediately.
+
+    1. Check Supabase cache first (instant for repeat scans)
+    2. If not cached, fetch from OFF and return directly
+    3. Background-save to Supabase for next time
+
+    The API resolves products through providers.ProductChain, which runs
+    these same steps as configurable providers; this is the fixed
+    default order, kept for scripts.
+
+    Args:
+        barcode: Canonical barcode (see gtin.canonicalize_barcode)
+
+    Returns:
+        Product data dict or None if not found anywhere
+    """
+    print(f"\n{'='*50}")
+    print(f"🔍 Processing barcode: {barcode}")
+    print(f"{'='*50}")
+
+    return lookup_stored(barcode) or fetch_from_off(barcode)
+
+
 # ============================================================
 # LEGACY: GET PRODUCT RESPONSE FROM DB
 # ============================================================
@@ -281,8 +428,14 @@ def get_product_response(barcode: str) -> Optional[Dict[str, Any]]:
     """
     Get complete product data from Supabase (for cached products).
     """
+    loaded = _load_product(barcode)
+    return loaded[1] if loaded else None
+
+
+def _load_product(barcode: str) -> Optional[Tuple[str, Dict[str, Any]]]:
+    """(product_id, response) built from the normalized tables, or None."""
     barcode_row = supabase.table("barcodes") \
-        .select("product_id, products(product_name, brand_name, category)") \
+        .select("product_id, products(product_name, brand_name, category, nutrition)") \
         .eq("barcode_number", barcode) \
         .single() \
         .execute()
@@ -317,7 +470,7 @@ def get_product_response(barcode: str) -> Optional[Dict[str, Any]]:
         .eq("product_id", product_id) \
         .execute()
 
-    return {
+    return product_id, {
         "barcode": barcode,
         "product_name": product["product_name"],
         "brand": product.get("brand_name"),
@@ -325,4 +478,5 @@ def get_product_response(barcode: str) -> Optional[Dict[str, Any]]:
         "ingredients": ingredients_text,
         "additives": additive_codes,
         "flags": flags.data,
+        "nutrition": product.get("nutrition"),
     }
@@ -0,0 +1,45 @@
+"""
+Product Snapshots - Stored, regulation-versioned /product payloads
+
+Each stored product has one `product_snapshots` row
+(supabase_migration_v10_product_snapshots.sql) holding the final enriched
+payload, `fssai` block included, tagged with the regulation version it was
+built against (fssai_regulations.regulation_version).
+
+- Read: one keyed fetch. A snapshot for the current version is served as-is.
+- Stale (regulation changed) or missing: the caller rebuilds it from the
+  normalized tables and stores it again, so each product is re-enriched
+  at most once per regulation version, on its next read.
+"""
+from datetime import datetime, timezone
+from typing import Optional, Dict, Any
+
+from fssai_regulations import regulation_version
+
+
+def fetch_snapshot(supabase, barcode: str) -> Optional[Dict[str, Any]]:
+    """
+    Snapshot row {product_id, regulation_version, payload, products}, or
+    None. `products` carries the freshness columns (product_refresh.py).
+    """
+    rows = supabase.table("product_snapshots") \
+        .select("product_id, regulation_version, payload, products(off_fetched_at, off_content_hash)") \
+        .eq("barcode", barcode) \
+        .limit(1) \
+        .execute().data
+    return rows[0] if rows else None
+
+
+def is_current(row: Optional[Dict[str, Any]]) -> bool:
+    return bool(row) and row["regulation_version"] == regulation_version()
+
+
+def store_snapshot(supabase, barcode: str, product_id: str, payload: Dict[str, Any]):
+    """Upsert the enriched payload for the regulation version in effect."""
+    supabase.table("product_snapshots").upsert({
+        "barcode": barcode,
+        "product_id": product_id,
+        "regulation_version": regulation_version(),
+        "payload": payload,
+        "built_at": datetime.now(timezone.utc).isoformat(),
+    }, on_conflict="barcode").execute()
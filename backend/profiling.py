@@ -0,0 +1,140 @@
+"""
+Request Profiling - Opt-in cProfile capture for single requests
+
+An admin can ask for one /product request to be profiled with
+`?profile=true` or `X-Debug-Profile: 1` (plus X-Admin-Token). The request
+runs under cProfile and the stats are written as a .pstats file to
+PROFILE_DIR, listed and downloaded through /admin/profiles.
+
+- Sampled: only PROFILE_SAMPLE_RATE of flagged requests are profiled
+- One at a time: the interpreter supports a single active profiler, so a
+  flagged request arriving while another is being profiled runs normally
+- Work the request hands to other threads (raced providers, background
+  ingest) is not captured
+- Unflagged requests pay one boolean check
+
+Inspect a profile with `python -m pstats <file>` or snakeviz.
+"""
+import cProfile
+import io
+import os
+import pstats
+import random
+import re
+import threading
+import time
+from contextlib import contextmanager
+from typing import Optional, Dict, Any, List
+
+PROFILE_DIR = os.getenv(
+    "PROFILE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), ".profiles"),
+)
+PROFILE_SAMPLE_RATE = float(os.getenv("PROFILE_SAMPLE_RATE", "1.0"))
+PROFILE_MAX_FILES = int(os.getenv("PROFILE_MAX_FILES", "200"))
+
+_PROFILE_NAME_RE = re.compile(r"^[\w.\-]+\.pstats$")
+_UNSAFE_RE = re.compile(r"[^\w\-]+")
+_profiler_lock = threading.Lock()
+
+
+class ProfileResult:
+    """Outcome of a profiling request, for the X-Profile response header."""
+    __slots__ = ("status", "name")
+
+    def __init__(self):
+        self.status = "off"
+        self.name: Optional[str] = None
+
+    def header(self) -> str:
+        return self.name or self.status
+
+
+@contextmanager
+def profile_request(enabled: bool, label: str):
+    """
+    Profile the enclosed block when enabled (and sampled, and no other
+    profile is running). Yields a ProfileResult naming the written file.
+    """
+    result = ProfileResult()
+    if not enabled:
+        yield result
+        return
+    if random.random() >= PROFILE_SAMPLE_RATE:
+        result.status = "skipped"
+        yield result
+        return
+    if not _profiler_lock.acquire(blocking=False):
+        result.status = "busy"
+        yield result
+        return
+
+    profiler = cProfile.Profile()
+    try:
+        profiler.enable()
+        try:
+            yield result
+        finally:
+            # Saved even when the request fails: those are often the slow ones
+            profiler.disable()
+            result.name = _save(profiler, label)
+            result.status = "saved"
+    finally:
+        _profiler_lock.release()
+
+
+def _save(profiler: cProfile.Profile, label: str) -> str:
+    os.makedirs(PROFILE_DIR, exist_ok=True)
+    name = f"{time.strftime('%Y%m%dT%H%M%S')}-{os.urandom(3).hex()}-{_UNSAFE_RE.sub('_', label)[:60]}.pstats"
+    profiler.dump_stats(os.path.join(PROFILE_DIR, name))
+    print(f"📋 Profile written: {name}")
+    _prune()
+    return name
+
+
+def _prune():
+    """Keep only the newest PROFILE_MAX_FILES profiles."""
+    profiles = list_profiles()
+    for stale in profiles[PROFILE_MAX_FILES:]:
+        try:
+            os.remove(os.path.join(PROFILE_DIR, stale["name"]))
+        except OSError:
+            pass
+
+
+# ============================================================
+# ADMIN ACCESS
+# ============================================================
+def list_profiles() -> List[Dict[str, Any]]:
+    """Saved profiles, newest first."""
+    if not os.path.isdir(PROFILE_DIR):
+        return []
+    profiles = []
+    for entry in os.scandir(PROFILE_DIR):
+        if entry.is_file() and _PROFILE_NAME_RE.match(entry.name):
+            stat = entry.stat()
+            profiles.append({
+                "name": entry.name,
+                "size_bytes": stat.st_size,
+                "created_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(stat.st_mtime)),
+                "mtime": stat.st_mtime,
+            })
+    profiles.sort(key=lambda p: p["mtime"], reverse=True)
+    for p in profiles:
+        del p["mtime"]
+    return profiles
+
+
+def profile_path(name: str) -> Optional[str]:
+    """Filesystem path for a listed profile name, or None (never escapes PROFILE_DIR)."""
+    if not _PROFILE_NAME_RE.match(name):
+        return None
+    path = os.path.join(PROFILE_DIR, name)
+    return path if os.path.isfile(path) else None
+
+
+def profile_summary(path: str, limit: int = 40, sort: str = "cumulative") -> str:
+    """Top functions of a saved profile as pstats text."""
+    out = io.StringIO()
+    stats = pstats.Stats(path, stream=out)
+    stats.strip_dirs().sort_stats(sort).print_stats(limit)
+    return out.getvalue()
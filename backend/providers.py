@@ -0,0 +1,252 @@
+"""
+Product Providers - Pluggable sources for /product lookups
+
+A ProductChain resolves a canonical barcode through an ordered list of
+providers, each returning a product in the API response shape (or None):
+
+- local:    a catalog file produced by catalog_export.py (NDJSON, .gz ok)
+- supabase: products already ingested (logs the scan)
+- off:      Open Food Facts, cold-path gated, background-ingested
+- demo:     demo_data fixtures
+
+Modes:
+- sequential: try providers in order until one returns a product
+- race:       start the local/stored providers at once; the first product
+              wins and the rest are cancelled (queued calls never start,
+              running ones have their result discarded). Upstream
+              providers (OFF) only start once the others all came back
+              empty, or after PRODUCT_PROVIDER_HEDGE_MS if they are slow.
+              A product the stored sources return within the hedge costs
+              no OFF fetch; a slower one may also start an OFF fetch
+              (its cold-path slot and background ingest included)
+
+Both modes give up at the chain deadline (sequential mode checks it
+between providers; it cannot interrupt one mid-call). New sources (a retailer feed, ...)
+plug in with register_provider(name, factory) and PRODUCT_PROVIDERS.
+
+Configured via environment variables (see .env.example).
+"""
+import gzip
+import json
+import os
+import threading
+import time
+from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+from typing import Optional, Dict, Any, List, Callable
+
+from admission import Overloaded
+
+SEQUENTIAL = "sequential"
+RACE = "race"
+
+
+class ProviderTimeout(Exception):
+    """No provider produced a product before the chain deadline (HTTP 504)."""
+
+
+class ProductProvider(ABC):
+    """Base class: one data source for canonical barcodes."""
+    name = "provider"
+    # Remote source with side effects (rate limits, ingest): raced last
+    upstream = False
+
+    @abstractmethod
+    def lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """Product in the API response shape, or None if this source doesn't have it."""
+
+
+# ============================================================
+# BUILT-IN PROVIDERS
+# ============================================================
+class DemoProvider(ProductProvider):
+    name = "demo"
+
+    def lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        from demo_data import get_demo_product
+
+        product = get_demo_product(barcode)
+        return dict(product) if product else None
+
+
+class LocalCatalogProvider(ProductProvider):
+    """In-memory catalog loaded once from a catalog_export NDJSON file."""
+    name = "local"
+
+    def __init__(self, path: str):
+        self.path = path
+        self._products: Dict[str, Dict[str, Any]] = {}
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    record.pop("fssai", None)  # re-enriched per request
+                    self._products[record["barcode"]] = record
+        print(f"✅ Local catalog: {len(self._products)} products from {path}")
+
+    def lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        product = self._products.get(barcode)
+        return dict(product) if product else None
+
+
+class SupabaseProvider(ProductProvider):
+    name = "supabase"
+
+    def lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        from product_service import lookup_stored
+
+        return lookup_stored(barcode)
+
+
+class OpenFoodFactsProvider(ProductProvider):
+    name = "off"
+    upstream = True
+
+    def lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        from product_service import fetch_from_off
+
+        return fetch_from_off(barcode)
+
+
+_REGISTRY: Dict[str, Callable[[], ProductProvider]] = {
+    "demo": DemoProvider,
+    "local": lambda: LocalCatalogProvider(os.environ["LOCAL_CATALOG_PATH"]),
+    "supabase": SupabaseProvider,
+    "off": OpenFoodFactsProvider,
+}
+
+
+def register_provider(name: str, factory: Callable[[], ProductProvider]):
+    """Make a provider available to PRODUCT_PROVIDERS under `name`."""
+    _REGISTRY[name] = factory
+
+
+# ============================================================
+# CHAIN
+# ============================================================
+class ProductChain:
+    """Resolve barcodes through providers, in sequence or raced, under a deadline."""
+
+    def __init__(self, providers: List[ProductProvider], mode: str = SEQUENTIAL, deadline: float = 15.0,
+                 hedge: float = 0.3):
+        if mode not in (SEQUENTIAL, RACE):
+            raise ValueError(f"Unknown provider mode: {mode}")
+        self.providers = providers
+        self.mode = mode
+        self.deadline = deadline
+        self.hedge = hedge
+        self._executor = ThreadPoolExecutor(
+            max_workers=max(4, 4 * len(providers)), thread_name_prefix="provider",
+        ) if mode == RACE else None
+
+    def describe(self) -> Dict[str, Any]:
+        described = {"providers": [p.name for p in self.providers], "mode": self.mode, "deadline_s": self.deadline}
+        if self.mode == RACE:
+            described["hedge_s"] = self.hedge
+        return described
+
+    def lookup(self, barcode: str) -> Optional[Dict[str, Any]]:
+        """
+        First product found, or None if every provider came back empty.
+
+        Raises:
+            ProviderTimeout: deadline hit before any provider answered
+            Overloaded: nothing found and a provider was shedding load
+            Exception: nothing found and every provider failed (last error)
+        """
+        if self.mode == RACE:
+            return self._race(barcode)
+        return self._sequential(barcode)
+
+    def _sequential(self, barcode: str) -> Optional[Dict[str, Any]]:
+        deadline = time.monotonic() + self.deadline
+        errors: List[Exception] = []
+        for provider in self.providers:
+            if time.monotonic() >= deadline:
+                raise ProviderTimeout(f"No provider answered within {self.deadline}s")
+            try:
+                product = provider.lookup(barcode)
+            except Exception as e:
+                print(f"⚠️ Provider {provider.name} failed: {e}")
+                errors.append(e)
+                continue
+            if product:
+                print(f"⚡ Resolved by provider: {provider.name}")
+                return product
+        return self._nothing_found(errors)
+
+    def _race(self, barcode: str) -> Optional[Dict[str, Any]]:
+        started = time.monotonic()
+        deadline = started + self.deadline
+        upstream = [p for p in self.providers if p.upstream]
+        futures = {self._executor.submit(p.lookup, barcode): p for p in self.providers if not p.upstream}
+        pending = set(futures)
+        errors: List[Exception] = []
+        try:
+            while pending or upstream:
+                now = time.monotonic()
+                if upstream and (not pending or now - started >= self.hedge):
+                    # Stored sources came back empty (or are slow): now ask upstream
+                    for provider in upstream:
+                        future = self._executor.submit(provider.lookup, barcode)
+                        futures[future] = provider
+                        pending.add(future)
+                    upstream = []
+                remaining = deadline - now
+                if remaining <= 0:
+                    raise ProviderTimeout(f"No provider answered within {self.deadline}s")
+                if upstream:
+                    remaining = min(remaining, max(0.0, started + self.hedge - now))
+                done, pending = wait(pending, timeout=remaining, return_when=FIRST_COMPLETED)
+                for future in done:
+                    try:
+                        product = future.result()
+                    except Exception as e:
+                        print(f"⚠️ Provider {futures[future].name} failed: {e}")
+                        errors.append(e)
+                        continue
+                    if product:
+                        print(f"⚡ Resolved by provider: {futures[future].name} (race)")
+                        return product
+        finally:
+            for future in pending:
+                future.cancel()
+        return self._nothing_found(errors)
+
+    def _nothing_found(self, errors: List[Exception]) -> Optional[Dict[str, Any]]:
+        for e in errors:
+            if isinstance(e, Overloaded):
+                raise e
+        if errors and len(errors) == len(self.providers):
+            raise errors[-1]
+        return None
+
+
+_chain: Optional[ProductChain] = None
+_chain_lock = threading.Lock()
+
+
+def get_product_chain(demo: bool = False) -> ProductChain:
+    """
+    Chain configured from PRODUCT_PROVIDERS (comma-separated names),
+    PRODUCT_PROVIDER_MODE, PRODUCT_PROVIDER_DEADLINE_MS and
+    PRODUCT_PROVIDER_HEDGE_MS. Defaults to
+    demo fixtures in demo mode, else Supabase then OFF.
+    """
+    global _chain
+    if _chain is None:
+        with _chain_lock:
+            if _chain is None:
+                default = "demo" if demo else "supabase,off"
+                names = [n.strip() for n in os.getenv("PRODUCT_PROVIDERS", default).split(",") if n.strip()]
+                unknown = [n for n in names if n not in _REGISTRY]
+                if unknown:
+                    raise ValueError(f"Unknown product providers: {', '.join(unknown)}")
+                _chain = ProductChain(
+                    [_REGISTRY[n]() for n in names],
+                    mode=os.getenv("PRODUCT_PROVIDER_MODE", SEQUENTIAL).lower(),
+                    deadline=int(os.getenv("PRODUCT_PROVIDER_DEADLINE_MS", "15000")) / 1000,
+                    hedge=int(os.getenv("PRODUCT_PROVIDER_HEDGE_MS", "300")) / 1000,
+                )
+    return _chain
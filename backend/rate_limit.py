@@ -0,0 +1,27 @@
+"""
+Rate Limit - Even spacing for background calls to Supabase and OFF
+
+Shared by the batch jobs (reenrich_job, nutrition backfill) and the
+in-process product refresher.
+"""
+import threading
+import time
+
+
+class RateLimiter:
+    """Spaces calls evenly so callers never exceed `rate` operations per second."""
+
+    def __init__(self, rate: float):
+        self.interval = 1.0 / rate if rate > 0 else 0.0
+        self._next = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        if not self.interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            wait = self._next - now
+            self._next = max(now, self._next) + self.interval
+        if wait > 0:
+            time.sleep(wait)
@@ -0,0 +1,300 @@
+"""
+Re-enrichment Job - Recompute stored products after a regulation change
+
+When the regulations change, what was derived from them at ingest goes
+stale: stored flags, enriched snapshots and category rankings (concern
+scores). A regulation snapshot covers every input of those:
+
+- fssai_additives: base FSSAI status, limits and severity per additive
+- regulatory_rules: the India/EU/FDA statuses behind product_flags
+- category_rules: fssai_categories.CATEGORY_RULES compiled against the
+  additives ({"CODE|food_category": override})
+
+This job:
+
+1. Diffs the old and new regulation snapshots, section by section
+2. Finds only the products linked to a changed additive
+3. Recomputes their flags, snapshots and rankings in parallel batches,
+   throttled to --rate products/s
+4. Checkpoints after every batch so an interrupted run resumes where it stopped
+
+A change to the food category taxonomy (which products fall in which
+category) can't be traced to additives; the job warns and --all
+re-enriches every product instead. Snapshot files saved before
+regulatory_rules and category_rules were included only diff the
+additives.
+
+Usage:
+    # Before deploying a regulation change, save the snapshot in effect
+    python reenrich_job.py --save-snapshot snapshots/fssai_before.json
+
+    # After the change is live, re-flag affected products
+    python reenrich_job.py --old snapshots/fssai_before.json --workers 8 --rate 20
+
+    # Or re-enrich the whole catalog
+    python reenrich_job.py --all --workers 8 --rate 20
+"""
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, List, Set
+
+from fssai_categories import compile_rules, rules_version
+from fssai_regulations import current_snapshot, snapshot_version, diff_snapshots, init_fssai_supabase
+from rate_limit import RateLimiter
+
+DEFAULT_CHECKPOINT = ".reenrich_checkpoint.json"
+
+
+# ============================================================
+# REGULATION SNAPSHOTS
+# ============================================================
+def regulation_snapshot() -> Dict[str, dict]:
+    """Every regulation input of flags, snapshots and rankings, as currently in effect."""
+    from database import supabase
+    from regional_rules import load_table
+
+    additives = current_snapshot()
+    return {
+        "fssai_additives": additives,
+        "regulatory_rules": load_table(supabase).to_dict(),
+        "category_rules": {
+            f"{code}|{food_category}": override
+            for (code, food_category), override in compile_rules(additives).items()
+        },
+        "category_rules_version": rules_version(),
+    }
+
+
+def changed_codes(old: Dict[str, dict], new: Dict[str, dict]) -> List[str]:
+    """Additive codes whose regulation changed in any section."""
+    codes = set()
+    for section in ("fssai_additives", "regulatory_rules", "category_rules"):
+        if section not in old or section not in new:
+            print(f"⚠️ Snapshot without {section}, changes to it are not detected")
+            continue
+        codes.update(key.split("|")[0] for key in diff_snapshots(old[section], new[section]))
+    if None not in (old.get("category_rules_version"), new.get("category_rules_version")) \
+            and old["category_rules_version"] != new["category_rules_version"]:
+        print("⚠️ Food category rules changed: products whose category mapping moved are "
+              "only re-ranked by a full run (--all)")
+    return sorted(codes)
+
+
+def load_snapshot(path: str) -> Dict[str, dict]:
+    """Saved regulation snapshot; older files hold only the additive table."""
+    with open(path, encoding="utf-8") as f:
+        snapshot = json.load(f)
+    if "fssai_additives" not in snapshot:
+        snapshot = {"fssai_additives": snapshot}
+    return snapshot
+
+
+def save_snapshot(path: str, snapshot: Dict[str, dict]):
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(snapshot, f, indent=2, sort_keys=True, ensure_ascii=False)
+
+
+# ============================================================
+# CHECKPOINT
+# ============================================================
+def _load_checkpoint(path: str, job_id: str) -> dict:
+    """Return the saved progress for this job, or a fresh checkpoint."""
+    fresh = {"job_id": job_id, "completed_through": None, "processed": 0, "failed": []}
+    if not os.path.exists(path):
+        return fresh
+    with open(path, encoding="utf-8") as f:
+        saved = json.load(f)
+    if saved.get("job_id") != job_id:
+        print(f"⚠️ Checkpoint {path} belongs to job {saved.get('job_id')}, starting fresh")
+        return fresh
+    return saved
+
+
+def _save_checkpoint(path: str, checkpoint: dict):
+    """Write atomically so a crash mid-write never corrupts progress."""
+    tmp = f"{path}.tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(checkpoint, f)
+    os.replace(tmp, path)
+
+
+# ============================================================
+# AFFECTED PRODUCTS
+# ============================================================
+def find_all_products(page_size: int = 1000) -> List[str]:
+    """Sorted ids of every stored product (--all)."""
+    from database import supabase
+
+    product_ids: List[str] = []
+    last_id = None
+    while True:
+        query = supabase.table("products") \
+            .select("id") \
+            .order("id") \
+            .limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        product_ids.extend(row["id"] for row in rows)
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1]["id"]
+    return product_ids
+
+
+def find_affected_products(codes: List[str], page_size: int = 1000) -> List[str]:
+    """Sorted ids of every product linked to one of the given additive codes."""
+    from database import supabase
+
+    if not codes:
+        return []
+
+    additive_rows = supabase.table("additives") \
+        .select("id") \
+        .in_("code", codes) \
+        .execute().data or []
+    additive_ids = [row["id"] for row in additive_rows]
+    if not additive_ids:
+        return []
+
+    product_ids: Set[str] = set()
+    last_id = None
+    while True:
+        query = supabase.table("product_additives") \
+            .select("id, product_id") \
+            .in_("additive_id", additive_ids) \
+            .order("id") \
+            .limit(page_size)
+        if last_id is not None:
+            query = query.gt("id", last_id)
+        rows = query.execute().data or []
+        product_ids.update(row["product_id"] for row in rows)
+        if len(rows) < page_size:
+            break
+        last_id = rows[-1]["id"]
+
+    return sorted(product_ids)
+
+
+# ============================================================
+# JOB
+# ============================================================
+def run_reenrichment(
+    old_snapshot: Optional[Dict[str, dict]],
+    new_snapshot: Dict[str, dict],
+    workers: int = 4,
+    batch_size: int = 50,
+    rate: float = 20.0,
+    checkpoint_path: str = DEFAULT_CHECKPOINT,
+) -> dict:
+    """
+    Re-enrich the products affected by the snapshot diff, or every
+    product when old_snapshot is None.
+
+    Returns:
+        Final checkpoint dict (processed count, failed product ids)
+    """
+    from product_service import reenrich_product
+
+    if old_snapshot is None:
+        job_id = f"all@{snapshot_version(new_snapshot)}"
+        print(f"📋 Full re-enrichment {job_id}")
+    else:
+        changed = changed_codes(old_snapshot, new_snapshot)
+        job_id = f"{snapshot_version(old_snapshot)}->{snapshot_version(new_snapshot)}"
+        print(f"📋 Regulation diff {job_id}: {len(changed)} changed additives {changed}")
+        if not changed:
+            return {"job_id": job_id, "processed": 0, "failed": []}
+
+    checkpoint = _load_checkpoint(checkpoint_path, job_id)
+    product_ids = find_all_products() if old_snapshot is None else find_affected_products(changed)
+    done_through = checkpoint["completed_through"]
+    # Retries stay in checkpoint["failed"] until their batch is saved
+    retry = list(checkpoint["failed"])
+    owed = set(retry)
+    failed: List[str] = []
+    pending = retry + [pid for pid in product_ids
+                       if pid not in owed and (done_through is None or pid > done_through)]
+    print(f"🔄 {len(product_ids)} affected products, {len(pending)} pending ({len(retry)} retries)")
+
+    limiter = RateLimiter(rate)
+
+    def recompute(product_id: str) -> bool:
+        limiter.acquire()
+        return reenrich_product(product_id)
+
+    started = time.monotonic()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for start in range(0, len(pending), batch_size):
+            batch = pending[start:start + batch_size]
+            results = list(pool.map(recompute, batch))
+
+            failed.extend(pid for pid, ok in zip(batch, results) if not ok)
+            owed.difference_update(batch)
+            checkpoint["failed"] = [pid for pid in retry if pid in owed] + failed
+            checkpoint["processed"] += len(batch)
+            fresh = [pid for pid in batch if pid not in retry]
+            if fresh:
+                checkpoint["completed_through"] = max(fresh)
+            _save_checkpoint(checkpoint_path, checkpoint)
+
+            done = start + len(batch)
+            elapsed = time.monotonic() - started
+            print(f"⏳ [{done}/{len(pending)}] {done / elapsed:.1f} products/s, "
+                  f"{len(checkpoint['failed'])} failed")
+
+    print(f"✅ Re-enrichment {job_id} finished: {checkpoint['processed']} processed, "
+          f"{len(checkpoint['failed'])} failed")
+    return checkpoint
+
+
+# ============================================================
+# CLI
+# ============================================================
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from dotenv import load_dotenv
+
+    load_dotenv()
+    parser = argparse.ArgumentParser(description="Re-enrich products affected by a regulation change")
+    parser.add_argument("--save-snapshot", metavar="PATH", help="Write the current regulation snapshot and exit")
+    parser.add_argument("--old", metavar="PATH", help="Snapshot in effect when products were flagged")
+    parser.add_argument("--new", metavar="PATH", help="New snapshot (default: current tables)")
+    parser.add_argument("--all", action="store_true", help="Re-enrich every product instead of diffing")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--rate", type=float, default=20.0, help="Max products per second (0 = unlimited)")
+    parser.add_argument("--checkpoint", default=DEFAULT_CHECKPOINT)
+    args = parser.parse_args(argv)
+
+    init_fssai_supabase()
+
+    if args.save_snapshot:
+        snapshot = regulation_snapshot()
+        save_snapshot(args.save_snapshot, snapshot)
+        print(f"✅ Saved snapshot {snapshot_version(snapshot)} ({len(snapshot['fssai_additives'])} additives, "
+              f"{len(snapshot['regulatory_rules'])} with regional rules) to {args.save_snapshot}")
+        return 0
+
+    if not args.old and not args.all:
+        parser.error("--old is required unless --save-snapshot or --all is given")
+
+    old_snapshot = None if args.all else load_snapshot(args.old)
+    new_snapshot = load_snapshot(args.new) if args.new else regulation_snapshot()
+    result = run_reenrichment(
+        old_snapshot,
+        new_snapshot,
+        workers=args.workers,
+        batch_size=args.batch_size,
+        rate=args.rate,
+        checkpoint_path=args.checkpoint,
+    )
+    return 1 if result["failed"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
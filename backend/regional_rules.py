@@ -0,0 +1,173 @@
+"""
+Regional Rules - In-memory India/EU/FDA additive decision table
+
+`regulatory_rules` holds one status per (additive, region). Instead of
+querying it per additive at ingest and serving whatever was frozen into
+`product_flags`, each worker loads the whole table once into
+RegionalRuleTable, keyed by additive code with the flag dicts prebuilt,
+and computes a product's flags at request time: one dict probe per
+additive, so the OFF fast path gets the same flags as stored products.
+
+The table reloads every REGULATORY_RULES_REFRESH_S and is swapped in
+whole. Until the first load succeeds (or in demo mode) responses keep the
+flags they were built with.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from typing import Optional, Dict, Any, List, Tuple
+
+# Most severe first when ordering a product's flags
+_FLAG_ORDER = {"banned": 0, "restricted": 1, "warning": 2}
+
+
+class RegionalRuleTable:
+    """Immutable {additive code: [flag, ...]} built from regulatory_rules rows."""
+
+    def __init__(self, rows: List[Dict[str, Any]]):
+        by_key: Dict[Tuple[str, str], Dict[str, Any]] = {}
+        for row in rows:
+            code = (row.get("code") or "").upper().strip()
+            region = row.get("region")
+            if not code or not region or not row.get("status"):
+                continue
+            notes = row.get("restriction_notes")
+            by_key[(code, region)] = {
+                "flag_type": row["status"],
+                "explanation": f"Contains {code}: {notes}" if notes else f"Contains {code}",
+                "region": region,
+            }
+
+        self._by_code: Dict[str, List[Dict[str, Any]]] = {}
+        for (code, _), flag in sorted(by_key.items()):
+            self._by_code.setdefault(code, []).append(flag)
+        self.rules = len(by_key)
+        self.regions = sorted({region for _, region in by_key})
+        self.version = hashlib.sha256(
+            json.dumps(sorted(by_key.items()), sort_keys=True).encode("utf-8")
+        ).hexdigest()[:12]
+
+    def status(self, code: str, region: str) -> Optional[str]:
+        for flag in self._by_code.get(code.upper(), ()):
+            if flag["region"] == region:
+                return flag["flag_type"]
+        return None
+
+    def flags_for(self, additive_codes: List[str]) -> List[Dict[str, Any]]:
+        """One flag per (additive, region) with a rule, most severe first."""
+        flags = []
+        seen = set()
+        for code in additive_codes:
+            code = code.upper().strip()
+            if code in seen:
+                continue
+            seen.add(code)
+            flags.extend(dict(flag) for flag in self._by_code.get(code, ()))
+        flags.sort(key=lambda f: _FLAG_ORDER.get(f["flag_type"], len(_FLAG_ORDER)))
+        return flags
+
+    def to_dict(self) -> Dict[str, List[Dict[str, Any]]]:
+        """{code: [flag, ...]} copy of the table (reenrich_job snapshots it)."""
+        return {code: [dict(flag) for flag in flags] for code, flags in self._by_code.items()}
+
+
+def load_table(supabase, page_size: int = 1000) -> RegionalRuleTable:
+    """Read every regulatory_rules row (with its additive code) into a table."""
+    rows = []
+    offset = 0
+    while True:
+        page = supabase.table("regulatory_rules") \
+            .select("status, region, restriction_notes, additives(code)") \
+            .order("additive_id,region") \
+            .range(offset, offset + page_size) \
+            .execute().data or []
+        if not page:
+            break
+        for row in page:
+            additive = row.get("additives") or {}
+            rows.append({**row, "code": additive.get("code")})
+        # Advance by what came back: postgrest-py's range() end bound is
+        # exclusive in the pinned 0.11 and inclusive in later releases
+        offset += len(page)
+    return RegionalRuleTable(rows)
+
+
+# ============================================================
+# PROCESS-WIDE TABLE
+# ============================================================
+_table: Optional[RegionalRuleTable] = None
+_loaded_at: Optional[float] = None
+_load_errors = 0
+_refresh_thread: Optional[threading.Thread] = None
+
+
+def regional_table() -> Optional[RegionalRuleTable]:
+    """The loaded table, or None before the first successful load."""
+    return _table
+
+
+def reload(supabase) -> RegionalRuleTable:
+    global _table, _loaded_at
+    table = load_table(supabase)
+    if _table is None or table.version != _table.version:
+        print(f"📋 Regional rules loaded: {table.rules} rules, regions {table.regions} (v{table.version})")
+    _table = table
+    _loaded_at = time.time()
+    return table
+
+
+def ensure_loaded(supabase) -> Optional[RegionalRuleTable]:
+    """The table, loading it now if this process has none (scripts, jobs)."""
+    global _load_errors
+    if _table is None:
+        try:
+            reload(supabase)
+        except Exception as e:
+            _load_errors += 1
+            print(f"⚠️ Regional rules load failed: {e}")
+    return _table
+
+
+def start_refresh(supabase, interval: Optional[float] = None):
+    """Load now, then reload every REGULATORY_RULES_REFRESH_S in the background."""
+    global _refresh_thread
+    if _refresh_thread is not None:
+        return
+    interval = interval or float(os.getenv("REGULATORY_RULES_REFRESH_S", "600"))
+    ensure_loaded(supabase)
+
+    def run():
+        global _load_errors
+        while True:
+            # Retry a failed first load sooner than the regular refresh
+            time.sleep(interval if _table is not None else min(interval, 60))
+            try:
+                reload(supabase)
+            except Exception as e:
+                _load_errors += 1
+                print(f"⚠️ Regional rules refresh failed (keeping previous table): {e}")
+
+    _refresh_thread = threading.Thread(target=run, name="regional-rules", daemon=True)
+    _refresh_thread.start()
+
+
+def apply_regional_flags(product: Dict[str, Any]) -> Dict[str, Any]:
+    """Replace a product response's flags with ones computed from the table (in place)."""
+    table = _table
+    if table is not None:
+        product["flags"] = table.flags_for(product.get("additives") or [])
+    return product
+
+
+def stats() -> Dict[str, Any]:
+    table = _table
+    return {
+        "loaded": table is not None,
+        "rules": table.rules if table else 0,
+        "regions": table.regions if table else [],
+        "version": table.version if table else None,
+        "loaded_at": time.strftime("%Y-%m-%dT%H:%M:%S", time.localtime(_loaded_at)) if _loaded_at else None,
+        "load_errors": _load_errors,
+    }
@@ -0,0 +1,190 @@
+"""
+Scan Sessions - One WebSocket per shelf-scanning session
+
+In store audits the app scans continuously. Instead of one HTTPS request
+per barcode, it opens /scan-session and pushes barcodes as they are
+scanned; each is resolved through the normal /product pipeline in a
+worker thread and its result is pushed back as soon as it is ready, out
+of order.
+
+Protocol (JSON text frames):
+
+    client -> {"barcode": "8901063010116"}      (or {"barcodes": [...]}, or a bare barcode string)
+    server -> {"type": "ready", "concurrency": 8, "max_barcodes": 500}
+    server -> {"type": "result", "barcode": ..., "status": "found", "product": {...}}
+    server -> {"type": "duplicate", "barcode": ...}
+    server -> {"type": "error", "error": ...}            (malformed frame)
+
+`status` uses the traffic_capture outcome classes: found, not_found,
+invalid, rate_limited, shed, timeout, error. Barcodes are deduplicated
+per session on their canonical form; a barcode whose lookup failed
+transiently (rate_limited, shed, timeout, error) may be sent again and
+doesn't count toward max_barcodes. Binary frames are read as UTF-8 text.
+
+Lookups run on a dedicated pool of SCAN_SESSION_THREADS threads shared by
+all sessions, so scanning can't starve the threadpool that serves
+/product. Each client (admission.client_key) may hold at most
+SCAN_SESSION_MAX_PER_CLIENT open sessions; further ones are refused
+(close code 1008).
+"""
+import asyncio
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Callable, Set
+
+from starlette.websockets import WebSocket, WebSocketDisconnect
+
+from traffic_capture import INVALID, RATE_LIMITED, SHED, TIMEOUT, ERROR
+
+# Outcomes that don't count as "seen": a re-scan retries them
+_TRANSIENT = {RATE_LIMITED, SHED, TIMEOUT, ERROR}
+
+SESSION_CONCURRENCY = int(os.getenv("SCAN_SESSION_CONCURRENCY", "8"))
+SESSION_MAX_BARCODES = int(os.getenv("SCAN_SESSION_MAX_BARCODES", "500"))
+SESSION_THREADS = int(os.getenv("SCAN_SESSION_THREADS", "16"))
+SESSION_MAX_PER_CLIENT = int(os.getenv("SCAN_SESSION_MAX_PER_CLIENT", "2"))
+
+# Shared by every session in the process, separate from Starlette's default pool
+_executor = ThreadPoolExecutor(max_workers=SESSION_THREADS, thread_name_prefix="scan-session")
+
+# Open sessions per client key; only touched from the event loop
+_open_sessions: Dict[str, int] = {}
+_refused = 0
+
+
+def parse_frame(text: str) -> List[str]:
+    """Barcodes in one client frame. Raises ValueError if malformed."""
+    text = text.strip()
+    if not text.startswith(("{", "[")):
+        return [text] if text else []
+    message = json.loads(text)
+    if isinstance(message, list):
+        barcodes = message
+    elif "barcodes" in message:
+        barcodes = message["barcodes"]
+    elif "barcode" in message:
+        barcodes = [message["barcode"]]
+    else:
+        raise ValueError("Expected {\"barcode\": ...} or {\"barcodes\": [...]}")
+    if not isinstance(barcodes, list) or not all(isinstance(b, str) for b in barcodes):
+        raise ValueError("Barcodes must be strings")
+    return barcodes
+
+
+def session_stats() -> Dict[str, Any]:
+    return {
+        "open": sum(_open_sessions.values()),
+        "clients": len(_open_sessions),
+        "refused": _refused,
+        "threads": SESSION_THREADS,
+        "max_per_client": SESSION_MAX_PER_CLIENT,
+    }
+
+
+class ScanSession:
+    """
+    Drives one connected session for `client`. `canonicalize(raw)` raises
+    ValueError for invalid barcodes; `resolve(barcode)` runs on the shared
+    session pool and returns the result fields ({"status", "product", ...}).
+    """
+
+    def __init__(
+        self,
+        websocket: WebSocket,
+        client: str,
+        canonicalize: Callable[[str], str],
+        resolve: Callable[[str], Dict[str, Any]],
+        concurrency: int = SESSION_CONCURRENCY,
+        max_barcodes: int = SESSION_MAX_BARCODES,
+    ):
+        self.websocket = websocket
+        self.client = client
+        self.canonicalize = canonicalize
+        self.resolve = resolve
+        self.concurrency = concurrency
+        self.max_barcodes = max_barcodes
+        self._slots = asyncio.Semaphore(concurrency)
+        self._send_lock = asyncio.Lock()
+        self._seen: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.accepted = 0
+
+    async def send(self, message: Dict[str, Any]):
+        async with self._send_lock:
+            await self.websocket.send_json(message)
+
+    async def run(self) -> bool:
+        """Serve the session until the client disconnects. False if it was refused."""
+        global _refused
+        if _open_sessions.get(self.client, 0) >= SESSION_MAX_PER_CLIENT:
+            _refused += 1
+            await self.websocket.close(code=1008, reason="Too many open scan sessions")
+            return False
+        _open_sessions[self.client] = _open_sessions.get(self.client, 0) + 1
+        try:
+            await self.websocket.accept()
+            await self.send({"type": "ready", "concurrency": self.concurrency, "max_barcodes": self.max_barcodes})
+            while True:
+                try:
+                    barcodes = parse_frame(await self._receive())
+                except ValueError as e:
+                    await self.send({"type": "error", "error": str(e)})
+                    continue
+                for raw in barcodes:
+                    await self._submit(raw)
+        except WebSocketDisconnect:
+            pass
+        finally:
+            for task in self._tasks:
+                task.cancel()
+            remaining = _open_sessions.pop(self.client, 1) - 1
+            if remaining > 0:
+                _open_sessions[self.client] = remaining
+        return True
+
+    async def _receive(self) -> str:
+        """Next frame as text. Raises ValueError for binary frames that aren't UTF-8."""
+        message = await self.websocket.receive()
+        if message["type"] == "websocket.disconnect":
+            raise WebSocketDisconnect(message.get("code", 1000))
+        if message.get("text") is not None:
+            return message["text"]
+        try:
+            return (message.get("bytes") or b"").decode("utf-8")
+        except UnicodeDecodeError:
+            raise ValueError("Binary frames must be UTF-8 text")
+
+    async def _submit(self, raw: str):
+        try:
+            barcode = self.canonicalize(raw)
+        except ValueError as e:
+            await self.send({"type": "result", "barcode": raw, "status": INVALID, "error": str(e)})
+            return
+        if barcode in self._seen:
+            await self.send({"type": "duplicate", "barcode": barcode})
+            return
+        if self.accepted >= self.max_barcodes:
+            await self.send({"type": "result", "barcode": barcode, "status": ERROR,
+                             "error": f"Session limit of {self.max_barcodes} barcodes reached"})
+            return
+        self._seen.add(barcode)
+        self.accepted += 1
+        task = asyncio.create_task(self._resolve(barcode))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _resolve(self, barcode: str):
+        async with self._slots:
+            try:
+                fields = await asyncio.get_running_loop().run_in_executor(_executor, self.resolve, barcode)
+            except Exception as e:
+                fields = {"status": ERROR, "error": str(e)}
+        if fields.get("status") in _TRANSIENT:
+            # A retry is a fresh attempt, not another barcode
+            self._seen.discard(barcode)
+            self.accepted -= 1
+        try:
+            await self.send({"type": "result", "barcode": barcode, **fields})
+        except (WebSocketDisconnect, RuntimeError):
+            pass  # client went away; remaining results are dropped
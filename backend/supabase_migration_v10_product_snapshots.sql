@@ -0,0 +1,19 @@
+-- Migration v10: Enriched product snapshots, tagged with the regulation version
+-- Run this in Supabase SQL Editor
+--
+-- One row per barcode holding the final /product payload (including the
+-- fssai findings/summary). The API returns it with a single keyed fetch
+-- when regulation_version matches the snapshot in effect, and rebuilds it
+-- lazily when it doesn't (backend/product_snapshots.py).
+
+CREATE TABLE IF NOT EXISTS product_snapshots (
+  barcode text PRIMARY KEY,
+  product_id uuid NOT NULL REFERENCES products(id) ON DELETE CASCADE,
+  regulation_version text NOT NULL,
+  payload jsonb NOT NULL,
+  built_at timestamptz NOT NULL DEFAULT now()
+);
+
+-- Finding stale rows after a regulation change (optional eager rebuilds)
+CREATE INDEX IF NOT EXISTS idx_product_snapshots_version
+  ON product_snapshots(regulation_version);
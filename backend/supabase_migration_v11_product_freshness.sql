@@ -0,0 +1,96 @@
+-- Migration v11: Freshness tracking for stored products
+-- Run this in Supabase SQL Editor
+--
+-- Stored products are re-fetched from Open Food Facts in the background
+-- once older than PRODUCT_MAX_AGE_HOURS (backend/product_refresh.py).
+-- off_content_hash identifies the OFF content last ingested, so a refresh
+-- that finds nothing changed only bumps off_fetched_at. Rows ingested
+-- before this migration have NULL columns and count as stale.
+
+BEGIN;
+
+-- 1. Columns
+ALTER TABLE products ADD COLUMN IF NOT EXISTS off_fetched_at timestamptz;
+ALTER TABLE products ADD COLUMN IF NOT EXISTS off_content_hash text;
+
+-- 2. ingest_product records fetch time and content hash, and replaces the
+--    additive list (drop the v9 signature so named calls stay unambiguous)
+DROP FUNCTION IF EXISTS ingest_product(text, text, text, text, text, text, text, text[], text, jsonb);
+
+CREATE OR REPLACE FUNCTION ingest_product(
+  p_barcode text,
+  p_product_name text,
+  p_brand_name text DEFAULT NULL,
+  p_category text DEFAULT NULL,
+  p_off_product_id text DEFAULT NULL,
+  p_off_url text DEFAULT NULL,
+  p_raw_text text DEFAULT NULL,
+  p_additive_codes text[] DEFAULT '{}',
+  p_source text DEFAULT 'openfoodfacts',
+  p_nutrition jsonb DEFAULT NULL,
+  p_content_hash text DEFAULT NULL
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_product_id uuid;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtextextended('ingest:' || p_barcode, 0));
+
+  SELECT product_id INTO v_product_id
+  FROM barcodes
+  WHERE barcode_number = p_barcode;
+
+  IF v_product_id IS NULL THEN
+    INSERT INTO products (product_name, brand_name, category, off_product_id, nutrition,
+                          off_fetched_at, off_content_hash)
+    VALUES (p_product_name, p_brand_name, p_category, p_off_product_id, p_nutrition,
+            now(), p_content_hash)
+    RETURNING id INTO v_product_id;
+
+    INSERT INTO barcodes (barcode_number, barcode_type, product_id, source, confidence_score, off_url)
+    VALUES (p_barcode, 'EAN', v_product_id, p_source, 0.8, p_off_url);
+  ELSE
+    UPDATE products
+    SET product_name = p_product_name,
+        brand_name = p_brand_name,
+        category = p_category,
+        off_product_id = coalesce(p_off_product_id, off_product_id),
+        nutrition = coalesce(p_nutrition, nutrition),
+        off_fetched_at = now(),
+        off_content_hash = p_content_hash
+    WHERE id = v_product_id;
+  END IF;
+
+  IF p_raw_text IS NOT NULL THEN
+    INSERT INTO ingredient_raw (product_id, raw_text, source)
+    VALUES (v_product_id, p_raw_text, p_source)
+    ON CONFLICT (product_id, source) DO UPDATE SET raw_text = EXCLUDED.raw_text;
+  END IF;
+
+  -- The product's additives become exactly this ingest's list, so a
+  -- reformulation that drops an additive also drops its link
+  DELETE FROM product_additives pa
+  USING additives a
+  WHERE pa.product_id = v_product_id
+    AND a.id = pa.additive_id
+    AND NOT (a.code = ANY (p_additive_codes));
+
+  IF cardinality(p_additive_codes) > 0 THEN
+    INSERT INTO additives (code, name, category)
+    SELECT DISTINCT c, c, 'unknown' FROM unnest(p_additive_codes) AS c
+    ON CONFLICT (code) DO NOTHING;
+
+    INSERT INTO product_additives (product_id, additive_id)
+    SELECT v_product_id, a.id
+    FROM additives a
+    WHERE a.code = ANY (p_additive_codes)
+    ON CONFLICT (product_id, additive_id) DO NOTHING;
+  END IF;
+
+  RETURN v_product_id;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,33 @@
+-- Migration v12: Atomic product flag replacement
+-- Run this in Supabase SQL Editor
+--
+-- Stored flags are rewritten wholesale from the regional rule table
+-- (backend/regional_rules.py) at ingest and by reenrich_job.py. Doing the
+-- delete and the insert as two requests left a window where a product had
+-- no flags, and a failed insert left it that way. replace_product_flags
+-- does both in one transaction, serialized per product.
+
+BEGIN;
+
+-- p_flags: [{"flag_type": ..., "explanation": ..., "region": ...}, ...]
+CREATE OR REPLACE FUNCTION replace_product_flags(p_product_id uuid, p_flags jsonb DEFAULT '[]')
+RETURNS int
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_count int;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtextextended('flags:' || p_product_id::text, 0));
+
+  DELETE FROM product_flags WHERE product_id = p_product_id;
+
+  INSERT INTO product_flags (product_id, flag_type, explanation, region)
+  SELECT p_product_id, f.flag_type, f.explanation, f.region
+  FROM jsonb_to_recordset(COALESCE(p_flags, '[]')) AS f(flag_type text, explanation text, region text);
+
+  GET DIAGNOSTICS v_count = ROW_COUNT;
+  RETURN v_count;
+END;
+$$;
+
+COMMIT;
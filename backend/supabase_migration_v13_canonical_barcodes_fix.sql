@@ -0,0 +1,84 @@
+-- Migration v13: Canonicalize barcodes exactly like backend/gtin.py
+-- Run this in Supabase SQL Editor
+--
+-- v5 rewrote stored barcodes with regexes that disagree with
+-- gtin.canonicalize_barcode for short codes padded with zeros: a 12-digit
+-- UPC-A such as 000001234565 became 0000001234565, while the API looks it
+-- up as the EAN-8 01234565. It also never touched user_scans.barcode;
+-- rows there that collide once canonical are merged into the latest scan.
+-- canonical_barcode() is the SQL twin of canonicalize_barcode (minus the
+-- check-digit validation, which stored rows already passed):
+--   8 digits                                   -> unchanged
+--   12/13/14 digits, left-padded to GTIN-14:
+--     starting 000000                          -> last 8 digits (EAN-8)
+--     starting 0                               -> last 13 digits (EAN-13)
+--     otherwise                                -> GTIN-14
+-- Anything else is left as is. Safe to re-run.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION canonical_barcode(p_barcode text)
+RETURNS text
+LANGUAGE sql
+IMMUTABLE
+AS $$
+  SELECT CASE
+    WHEN p_barcode !~ '^([0-9]{8}|[0-9]{12,14})$' THEN p_barcode
+    WHEN length(p_barcode) = 8 THEN p_barcode
+    WHEN lpad(p_barcode, 14, '0') LIKE '000000%' THEN right(p_barcode, 8)
+    WHEN lpad(p_barcode, 14, '0') LIKE '0%' THEN right(lpad(p_barcode, 14, '0'), 13)
+    ELSE p_barcode
+  END
+$$;
+
+-- 1. barcodes: rewrite rows whose canonical form is free; rows that would
+--    collide with another product's barcode are reported below instead
+WITH candidates AS (
+  SELECT id, canonical_barcode(barcode_number) AS canonical,
+         count(*) OVER (PARTITION BY canonical_barcode(barcode_number)) AS claimants
+  FROM barcodes
+  WHERE canonical_barcode(barcode_number) <> barcode_number
+)
+UPDATE barcodes b
+SET barcode_number = c.canonical
+FROM candidates c
+WHERE b.id = c.id
+  AND c.claimants = 1
+  AND NOT EXISTS (SELECT 1 FROM barcodes o WHERE o.barcode_number = c.canonical);
+
+-- 2. Scan log (no uniqueness to worry about)
+UPDATE scans SET barcode_number = canonical_barcode(barcode_number)
+WHERE canonical_barcode(barcode_number) <> barcode_number;
+
+-- 3. user_scans is unique on (user_id, barcode): a user who scanned both
+--    the UPC-A and EAN-13 form of a product would collide. Keep each
+--    user's latest scan per canonical barcode (user_scans has no scan
+--    count to add up), then rewrite the survivors
+DELETE FROM user_scans u
+USING (
+  SELECT id,
+         row_number() OVER (
+           PARTITION BY user_id, canonical_barcode(barcode)
+           ORDER BY scanned_at DESC NULLS LAST, id DESC
+         ) AS rn
+  FROM user_scans
+) ranked
+WHERE u.id = ranked.id
+  AND ranked.rn > 1;
+
+UPDATE user_scans u SET barcode = canonical_barcode(u.barcode)
+WHERE canonical_barcode(u.barcode) <> u.barcode
+  AND NOT EXISTS (
+    SELECT 1 FROM user_scans o
+    WHERE o.user_id = u.user_id AND o.barcode = canonical_barcode(u.barcode)
+  );
+
+COMMIT;
+
+-- 4. Barcodes still not canonical because another row holds the canonical
+--    form (former UPC/EAN duplicates; merge these by hand)
+SELECT b.barcode_number, canonical_barcode(b.barcode_number) AS canonical, b.product_id,
+       o.product_id AS canonical_product_id
+FROM barcodes b
+LEFT JOIN barcodes o ON o.barcode_number = canonical_barcode(b.barcode_number)
+WHERE canonical_barcode(b.barcode_number) <> b.barcode_number;
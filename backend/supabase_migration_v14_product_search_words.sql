@@ -0,0 +1,59 @@
+-- Migration v14: Product search matches words in any order
+-- Run this in Supabase SQL Editor
+--
+-- v6 matched the query words in order ('%maggi%masala%'), so "masala
+-- maggi" found nothing, and words shorter than 3 characters produced
+-- patterns idx_products_search_trgm cannot serve. Now every query word of
+-- 3+ characters must appear somewhere in the name/brand (one ILIKE per
+-- word, ANDed, each answered by the trigram index); shorter words only
+-- count towards ranking. A query with no 3+ character word returns nothing.
+
+CREATE OR REPLACE FUNCTION search_products(p_query text, p_limit int DEFAULT 20)
+RETURNS TABLE (barcode text, product_name text, brand_name text, category text, score real)
+LANGUAGE plpgsql STABLE
+AS $$
+DECLARE
+  v_query text := lower(trim(p_query));
+  v_words text[];
+  v_match text;
+BEGIN
+  SELECT array_agg(DISTINCT w) INTO v_words
+  FROM unnest(regexp_split_to_array(v_query, '[^a-z0-9]+')) AS w
+  WHERE length(w) >= 3;
+
+  IF v_words IS NULL THEN
+    RETURN;
+  END IF;
+
+  -- Literal patterns (words are [a-z0-9]+) so each ILIKE can use the index
+  SELECT string_agg(format('p.search_text ILIKE %L', '%' || w || '%'), ' AND ') INTO v_match
+  FROM unnest(v_words) AS w;
+
+  RETURN QUERY EXECUTE format($q$
+    WITH candidates AS (
+      SELECT p.id, p.product_name, p.brand_name, p.category, p.search_text,
+             word_similarity($1, p.search_text) AS sim
+      FROM products p
+      WHERE (%s) OR $1 <%% p.search_text
+      ORDER BY sim DESC
+      LIMIT 200
+    ),
+    ranked AS (
+      SELECT c.*,
+             (SELECT count(*)
+                FROM unnest(regexp_split_to_array($1, '[^a-z0-9]+')) AS w
+               WHERE w <> '' AND c.search_text ~ ('(^|[^a-z0-9])' || w)) AS prefix_hits
+      FROM candidates c
+    )
+    SELECT b.barcode_number, r.product_name, r.brand_name, r.category,
+           (r.prefix_hits + r.sim)::real AS score
+    FROM ranked r
+    JOIN LATERAL (
+      SELECT barcode_number FROM barcodes WHERE product_id = r.id LIMIT 1
+    ) b ON true
+    ORDER BY score DESC, length(r.product_name)
+    LIMIT LEAST(GREATEST($2, 1), 50)
+  $q$, v_match)
+  USING v_query, p_limit;
+END;
+$$;
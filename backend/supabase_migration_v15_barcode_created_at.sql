@@ -0,0 +1,16 @@
+-- Migration v15: barcodes.created_at for the barcode filter sync
+-- Run this in Supabase SQL Editor
+--
+-- Each API worker keeps a Bloom filter of stored barcodes
+-- (backend/barcode_filter.py) and trusts its misses. To pick up barcodes
+-- other workers stored since its last rebuild, it reads the rows created
+-- after its watermark every BARCODE_FILTER_SYNC_S. Existing rows get the
+-- migration time, which is before any filter built afterwards. Safe to re-run.
+
+BEGIN;
+
+ALTER TABLE barcodes ADD COLUMN IF NOT EXISTS created_at timestamptz NOT NULL DEFAULT now();
+
+CREATE INDEX IF NOT EXISTS idx_barcodes_created_at ON barcodes(created_at);
+
+COMMIT;
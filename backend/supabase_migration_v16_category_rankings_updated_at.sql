@@ -0,0 +1,26 @@
+-- Migration v16: Keep category_rankings.updated_at current
+-- Run this in Supabase SQL Editor
+--
+-- updated_at only got its DEFAULT when a ranking row was first inserted;
+-- the upserts from the background ingest, reenrich_job and
+-- `alternatives.py --backfill` never changed it, so it couldn't tell how
+-- stale a ranking is. A trigger now stamps every update. Safe to re-run.
+
+BEGIN;
+
+CREATE OR REPLACE FUNCTION category_rankings_touch()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+  NEW.updated_at := now();
+  RETURN NEW;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS category_rankings_touch ON category_rankings;
+CREATE TRIGGER category_rankings_touch
+  BEFORE UPDATE ON category_rankings
+  FOR EACH ROW EXECUTE FUNCTION category_rankings_touch();
+
+COMMIT;
@@ -0,0 +1,124 @@
+-- Migration v3: Server-side scan history + analytics
+-- Run this in Supabase SQL Editor (after supabase_migration_v2.sql)
+--
+-- All functions run as SECURITY INVOKER and filter on auth.uid(), so the
+-- existing Row Level Security policies on user_scans still apply. The API
+-- forwards the caller's access token with every RPC.
+
+-- 1. Keyset-paginated scan history
+--    Walks idx_user_scans_user_date (user_id, scanned_at DESC); the
+--    (scanned_at, id) cursor breaks ties without OFFSET scans.
+CREATE OR REPLACE FUNCTION user_scan_history(
+  p_limit int DEFAULT 20,
+  p_before_scanned_at timestamptz DEFAULT NULL,
+  p_before_id uuid DEFAULT NULL,
+  p_intent text DEFAULT NULL
+)
+RETURNS SETOF user_scans
+LANGUAGE sql STABLE
+AS $$
+  SELECT *
+  FROM user_scans
+  WHERE user_id = auth.uid()
+    AND (p_intent IS NULL OR intent = p_intent)
+    AND (
+      p_before_scanned_at IS NULL
+      OR (scanned_at <= p_before_scanned_at
+          AND (scanned_at < p_before_scanned_at OR id < p_before_id))
+    )
+  ORDER BY scanned_at DESC, id DESC
+  LIMIT LEAST(GREATEST(p_limit, 1), 101);
+$$;
+
+-- 2. Keyset-paginated purchase history
+--    Walks idx_user_scans_purchase (user_id, purchase_date DESC).
+CREATE OR REPLACE FUNCTION user_purchase_history(
+  p_limit int DEFAULT 20,
+  p_before_purchase_date date DEFAULT NULL,
+  p_before_id uuid DEFAULT NULL
+)
+RETURNS SETOF user_scans
+LANGUAGE sql STABLE
+AS $$
+  SELECT *
+  FROM user_scans
+  WHERE user_id = auth.uid()
+    AND intent = 'purchased'
+    AND purchase_date IS NOT NULL
+    AND (
+      p_before_purchase_date IS NULL
+      OR (purchase_date <= p_before_purchase_date
+          AND (purchase_date < p_before_purchase_date OR id < p_before_id))
+    )
+  ORDER BY purchase_date DESC, id DESC
+  LIMIT LEAST(GREATEST(p_limit, 1), 101);
+$$;
+
+-- 3. Aggregated stats for the last p_weeks weeks (weeks start on Monday)
+--    Range scan on idx_user_scans_user_date; only aggregates leave the DB.
+CREATE OR REPLACE FUNCTION user_scan_stats(p_weeks int DEFAULT 4)
+RETURNS jsonb
+LANGUAGE sql STABLE
+AS $$
+  WITH bounds AS (
+    SELECT date_trunc('week', now()) - make_interval(weeks => LEAST(GREATEST(p_weeks, 1), 52) - 1) AS since
+  ),
+  recent AS (
+    SELECT s.intent, s.verdict, s.health_score, s.purchase_date,
+           date_trunc('week', s.scanned_at)::date AS week_start
+    FROM user_scans s, bounds b
+    WHERE s.user_id = auth.uid()
+      AND s.scanned_at >= b.since
+  ),
+  weeks AS (
+    SELECT w::date AS week_start
+    FROM bounds b, generate_series(b.since, date_trunc('week', now()), interval '1 week') AS w
+  ),
+  per_week AS (
+    SELECT week_start, count(*) AS scans
+    FROM recent
+    GROUP BY week_start
+  ),
+  totals AS (
+    SELECT count(*) AS total_scans,
+           round(avg(health_score))::int AS average_health_score,
+           count(*) FILTER (WHERE verdict = 'Good') AS good,
+           count(*) FILTER (WHERE verdict = 'Moderate') AS moderate,
+           count(*) FILTER (WHERE verdict = 'Poor') AS poor,
+           count(*) FILTER (WHERE intent = 'checked') AS checked,
+           count(*) FILTER (WHERE intent = 'consumed') AS consumed,
+           count(*) FILTER (WHERE intent = 'avoided') AS avoided,
+           count(*) FILTER (WHERE intent = 'purchased') AS purchased,
+           max(purchase_date) FILTER (WHERE intent = 'purchased') AS last_purchase_date
+    FROM recent
+  )
+  SELECT jsonb_build_object(
+    'since', (SELECT since::date FROM bounds),
+    'total_scans', t.total_scans,
+    'average_health_score', t.average_health_score,
+    'weekly', (
+      SELECT coalesce(jsonb_agg(jsonb_build_object(
+               'week_start', w.week_start,
+               'scans', coalesce(pw.scans, 0)
+             ) ORDER BY w.week_start), '[]'::jsonb)
+      FROM weeks w
+      LEFT JOIN per_week pw USING (week_start)
+    ),
+    'verdicts', jsonb_build_object('Good', t.good, 'Moderate', t.moderate, 'Poor', t.poor),
+    'intents', jsonb_build_object(
+      'checked', t.checked,
+      'consumed', t.consumed,
+      'avoided', t.avoided,
+      'purchased', t.purchased
+    ),
+    'purchases', jsonb_build_object(
+      'total', t.purchased,
+      'last_purchase_date', t.last_purchase_date
+    )
+  )
+  FROM totals t;
+$$;
+
+GRANT EXECUTE ON FUNCTION user_scan_history(int, timestamptz, uuid, text) TO authenticated;
+GRANT EXECUTE ON FUNCTION user_purchase_history(int, date, uuid) TO authenticated;
+GRANT EXECUTE ON FUNCTION user_scan_stats(int) TO authenticated;
@@ -0,0 +1,218 @@
+-- Migration v4: Per-user weekly rollups of user_scans
+-- Run this in Supabase SQL Editor (after supabase_migration_v3_user_analytics.sql)
+--
+-- user_scan_weekly holds one row per (user, week). A trigger on user_scans
+-- keeps it in sync on INSERT, UPDATE (intent change, re-scan, purchase) and
+-- DELETE, so stats read O(weeks) rows instead of O(scans).
+
+BEGIN;
+
+-- 1. Rollup table
+CREATE TABLE IF NOT EXISTS user_scan_weekly (
+  user_id uuid REFERENCES auth.users(id) ON DELETE CASCADE NOT NULL,
+  week_start date NOT NULL,
+  scans int NOT NULL DEFAULT 0,
+  checked int NOT NULL DEFAULT 0,
+  consumed int NOT NULL DEFAULT 0,
+  avoided int NOT NULL DEFAULT 0,
+  purchased int NOT NULL DEFAULT 0,
+  good int NOT NULL DEFAULT 0,
+  moderate int NOT NULL DEFAULT 0,
+  poor int NOT NULL DEFAULT 0,
+  health_score_sum bigint NOT NULL DEFAULT 0,
+  health_score_count int NOT NULL DEFAULT 0,
+  -- Bucketed by purchase_date rather than scanned_at
+  purchases int NOT NULL DEFAULT 0,
+  PRIMARY KEY (user_id, week_start)
+);
+
+ALTER TABLE user_scan_weekly ENABLE ROW LEVEL SECURITY;
+
+DROP POLICY IF EXISTS "Users can read own weekly rollups" ON user_scan_weekly;
+CREATE POLICY "Users can read own weekly rollups"
+  ON user_scan_weekly FOR SELECT
+  USING (auth.uid() = user_id);
+
+-- 2. Apply one row's contribution (sign = 1 to add, -1 to remove)
+CREATE OR REPLACE FUNCTION user_scan_weekly_apply(r user_scans, sign int)
+RETURNS void
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  scan_week date := date_trunc('week', r.scanned_at)::date;
+  purchase_week date := date_trunc('week', r.purchase_date::timestamp)::date;
+BEGIN
+  INSERT INTO user_scan_weekly AS w (
+    user_id, week_start, scans, checked, consumed, avoided, purchased,
+    good, moderate, poor, health_score_sum, health_score_count
+  )
+  VALUES (
+    r.user_id, scan_week, sign,
+    sign * (r.intent = 'checked')::int,
+    sign * (r.intent = 'consumed')::int,
+    sign * (r.intent = 'avoided')::int,
+    sign * (r.intent = 'purchased')::int,
+    sign * (r.verdict = 'Good')::int,
+    sign * (r.verdict = 'Moderate')::int,
+    sign * (r.verdict = 'Poor')::int,
+    sign * coalesce(r.health_score, 0),
+    sign * (r.health_score IS NOT NULL)::int
+  )
+  ON CONFLICT (user_id, week_start) DO UPDATE SET
+    scans = w.scans + EXCLUDED.scans,
+    checked = w.checked + EXCLUDED.checked,
+    consumed = w.consumed + EXCLUDED.consumed,
+    avoided = w.avoided + EXCLUDED.avoided,
+    purchased = w.purchased + EXCLUDED.purchased,
+    good = w.good + EXCLUDED.good,
+    moderate = w.moderate + EXCLUDED.moderate,
+    poor = w.poor + EXCLUDED.poor,
+    health_score_sum = w.health_score_sum + EXCLUDED.health_score_sum,
+    health_score_count = w.health_score_count + EXCLUDED.health_score_count;
+
+  IF r.intent = 'purchased' AND r.purchase_date IS NOT NULL THEN
+    INSERT INTO user_scan_weekly AS w (user_id, week_start, purchases)
+    VALUES (r.user_id, purchase_week, sign)
+    ON CONFLICT (user_id, week_start) DO UPDATE SET
+      purchases = w.purchases + EXCLUDED.purchases;
+  END IF;
+
+  -- Drop buckets that no longer hold anything
+  IF sign < 0 THEN
+    DELETE FROM user_scan_weekly
+    WHERE user_id = r.user_id
+      AND week_start IN (scan_week, purchase_week)
+      AND scans = 0
+      AND purchases = 0;
+  END IF;
+END;
+$$;
+
+-- 3. Trigger: keep the rollup in step with every write to user_scans
+CREATE OR REPLACE FUNCTION user_scans_rollup_trigger()
+RETURNS trigger
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path = public
+AS $$
+BEGIN
+  IF TG_OP = 'INSERT' THEN
+    PERFORM user_scan_weekly_apply(NEW, 1);
+  ELSIF TG_OP = 'DELETE' THEN
+    PERFORM user_scan_weekly_apply(OLD, -1);
+  ELSIF (OLD.user_id, OLD.scanned_at, OLD.intent, OLD.verdict, OLD.health_score, OLD.purchase_date)
+        IS DISTINCT FROM
+        (NEW.user_id, NEW.scanned_at, NEW.intent, NEW.verdict, NEW.health_score, NEW.purchase_date) THEN
+    PERFORM user_scan_weekly_apply(OLD, -1);
+    PERFORM user_scan_weekly_apply(NEW, 1);
+  END IF;
+  RETURN NULL;
+END;
+$$;
+
+-- Block concurrent writes while the trigger is installed and the rollup is
+-- backfilled, so no row is counted twice or missed.
+LOCK TABLE user_scans IN SHARE ROW EXCLUSIVE MODE;
+
+DROP TRIGGER IF EXISTS user_scans_rollup ON user_scans;
+CREATE TRIGGER user_scans_rollup
+  AFTER INSERT OR UPDATE OR DELETE ON user_scans
+  FOR EACH ROW EXECUTE FUNCTION user_scans_rollup_trigger();
+
+-- 4. Backfill from existing rows
+TRUNCATE user_scan_weekly;
+
+INSERT INTO user_scan_weekly (
+  user_id, week_start, scans, checked, consumed, avoided, purchased,
+  good, moderate, poor, health_score_sum, health_score_count
+)
+SELECT user_id,
+       date_trunc('week', scanned_at)::date,
+       count(*),
+       count(*) FILTER (WHERE intent = 'checked'),
+       count(*) FILTER (WHERE intent = 'consumed'),
+       count(*) FILTER (WHERE intent = 'avoided'),
+       count(*) FILTER (WHERE intent = 'purchased'),
+       count(*) FILTER (WHERE verdict = 'Good'),
+       count(*) FILTER (WHERE verdict = 'Moderate'),
+       count(*) FILTER (WHERE verdict = 'Poor'),
+       coalesce(sum(health_score), 0),
+       count(health_score)
+FROM user_scans
+GROUP BY 1, 2;
+
+INSERT INTO user_scan_weekly AS w (user_id, week_start, purchases)
+SELECT user_id, date_trunc('week', purchase_date::timestamp)::date, count(*)
+FROM user_scans
+WHERE intent = 'purchased' AND purchase_date IS NOT NULL
+GROUP BY 1, 2
+ON CONFLICT (user_id, week_start) DO UPDATE SET purchases = EXCLUDED.purchases;
+
+-- 5. Stats now read the rollup: O(weeks) rows per call
+CREATE OR REPLACE FUNCTION user_scan_stats(p_weeks int DEFAULT 4)
+RETURNS jsonb
+LANGUAGE sql STABLE
+AS $$
+  WITH bounds AS (
+    SELECT (date_trunc('week', now()) - make_interval(weeks => LEAST(GREATEST(p_weeks, 1), 52) - 1))::date AS since
+  ),
+  rollup AS (
+    SELECT w.*
+    FROM user_scan_weekly w, bounds b
+    WHERE w.user_id = auth.uid()
+      AND w.week_start >= b.since
+  ),
+  weeks AS (
+    SELECT w::date AS week_start
+    FROM bounds b, generate_series(b.since, date_trunc('week', now()), interval '1 week') AS w
+  ),
+  totals AS (
+    SELECT coalesce(sum(scans), 0) AS total_scans,
+           round(sum(health_score_sum)::numeric / nullif(sum(health_score_count), 0))::int AS average_health_score,
+           coalesce(sum(good), 0) AS good,
+           coalesce(sum(moderate), 0) AS moderate,
+           coalesce(sum(poor), 0) AS poor,
+           coalesce(sum(checked), 0) AS checked,
+           coalesce(sum(consumed), 0) AS consumed,
+           coalesce(sum(avoided), 0) AS avoided,
+           coalesce(sum(purchased), 0) AS purchased,
+           coalesce(sum(purchases), 0) AS purchases
+    FROM rollup
+  )
+  SELECT jsonb_build_object(
+    'since', (SELECT since FROM bounds),
+    'total_scans', t.total_scans,
+    'average_health_score', t.average_health_score,
+    'weekly', (
+      SELECT coalesce(jsonb_agg(jsonb_build_object(
+               'week_start', w.week_start,
+               'scans', coalesce(r.scans, 0),
+               'purchases', coalesce(r.purchases, 0)
+             ) ORDER BY w.week_start), '[]'::jsonb)
+      FROM weeks w
+      LEFT JOIN rollup r USING (week_start)
+    ),
+    'verdicts', jsonb_build_object('Good', t.good, 'Moderate', t.moderate, 'Poor', t.poor),
+    'intents', jsonb_build_object(
+      'checked', t.checked,
+      'consumed', t.consumed,
+      'avoided', t.avoided,
+      'purchased', t.purchased
+    ),
+    'purchases', jsonb_build_object(
+      'total', t.purchases,
+      -- Walks idx_user_scans_purchase from the newest date; like v3, only
+      -- rows still marked purchased count
+      'last_purchase_date', (
+        SELECT purchase_date
+        FROM user_scans
+        WHERE user_id = auth.uid() AND intent = 'purchased' AND purchase_date IS NOT NULL
+        ORDER BY purchase_date DESC
+        LIMIT 1
+      )
+    )
+  )
+  FROM totals t;
+$$;
+
+COMMIT;
@@ -0,0 +1,35 @@
+-- Migration v5: Canonicalize stored barcodes (see backend/gtin.py)
+-- Run this in Supabase SQL Editor
+--
+-- The API now normalizes every barcode before lookup:
+--   UPC-A (12 digits) and GTIN-14 with a leading 0 -> EAN-13
+--   EAN-8 padded to 13/14 digits                   -> EAN-8
+-- Rewrite existing rows to the same form so they keep matching.
+
+-- 1. EAN-8 padded with zeros to 13 or 14 digits
+UPDATE barcodes SET barcode_number = right(barcode_number, 8)
+WHERE barcode_number ~ '^(00000|000000)[0-9]{8}$';
+
+UPDATE scans SET barcode_number = right(barcode_number, 8)
+WHERE barcode_number ~ '^(00000|000000)[0-9]{8}$';
+
+-- 2. UPC-A -> EAN-13
+UPDATE barcodes SET barcode_number = '0' || barcode_number
+WHERE barcode_number ~ '^[0-9]{12}$';
+
+UPDATE scans SET barcode_number = '0' || barcode_number
+WHERE barcode_number ~ '^[0-9]{12}$';
+
+-- 3. GTIN-14 with indicator digit 0 -> EAN-13
+UPDATE barcodes SET barcode_number = substr(barcode_number, 2)
+WHERE barcode_number ~ '^0[0-9]{13}$';
+
+UPDATE scans SET barcode_number = substr(barcode_number, 2)
+WHERE barcode_number ~ '^0[0-9]{13}$';
+
+-- 4. Report barcodes that now map to more than one product
+--    (former UPC/EAN duplicates; merge these by hand)
+SELECT barcode_number, count(*) AS rows, array_agg(product_id) AS product_ids
+FROM barcodes
+GROUP BY barcode_number
+HAVING count(*) > 1;
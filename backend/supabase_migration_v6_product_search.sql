@@ -0,0 +1,54 @@
+-- Migration v6: Indexed product search by name and brand
+-- Run this in Supabase SQL Editor
+--
+-- Backs GET /search in live mode. A trigram GIN index over the lower-cased
+-- name + brand serves both substring/prefix (ILIKE) and fuzzy (word
+-- similarity) matching without scanning the products table.
+
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+-- 1. Normalized search text, maintained by Postgres
+ALTER TABLE products ADD COLUMN IF NOT EXISTS search_text text
+  GENERATED ALWAYS AS (lower(coalesce(product_name, '') || ' ' || coalesce(brand_name, ''))) STORED;
+
+CREATE INDEX IF NOT EXISTS idx_products_search_trgm
+  ON products USING gin (search_text gin_trgm_ops);
+
+-- Needed to resolve a product's barcode in the result set
+CREATE INDEX IF NOT EXISTS idx_barcodes_product_id ON barcodes(product_id);
+
+-- 2. Ranked search
+--    Candidates: the query words appear in order as substrings/prefixes
+--    (ILIKE '%maggi%mas%'), or the query is a close fuzzy match (<%).
+--    Both predicates are answered by idx_products_search_trgm. Ranking
+--    favours word-prefix hits, then trigram word similarity, then shorter names.
+CREATE OR REPLACE FUNCTION search_products(p_query text, p_limit int DEFAULT 20)
+RETURNS TABLE (barcode text, product_name text, brand_name text, category text, score real)
+LANGUAGE sql STABLE
+AS $$
+  WITH candidates AS (
+    SELECT p.id, p.product_name, p.brand_name, p.category, p.search_text,
+           word_similarity(lower(trim(p_query)), p.search_text) AS sim
+    FROM products p
+    WHERE p.search_text ILIKE
+            '%' || array_to_string(regexp_split_to_array(lower(trim(p_query)), '[^a-z0-9]+'), '%') || '%'
+       OR lower(trim(p_query)) <% p.search_text
+    ORDER BY sim DESC
+    LIMIT 200
+  ),
+  ranked AS (
+    SELECT c.*,
+           (SELECT count(*)
+              FROM unnest(regexp_split_to_array(lower(trim(p_query)), '[^a-z0-9]+')) AS w
+             WHERE w <> '' AND c.search_text ~ ('(^|[^a-z0-9])' || w)) AS prefix_hits
+    FROM candidates c
+  )
+  SELECT b.barcode_number, r.product_name, r.brand_name, r.category,
+         (r.prefix_hits + r.sim)::real AS score
+  FROM ranked r
+  JOIN LATERAL (
+    SELECT barcode_number FROM barcodes WHERE product_id = r.id LIMIT 1
+  ) b ON true
+  ORDER BY score DESC, length(r.product_name)
+  LIMIT LEAST(GREATEST(p_limit, 1), 50);
+$$;
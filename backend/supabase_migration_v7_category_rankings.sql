@@ -0,0 +1,19 @@
+-- Migration v7: Precomputed per-category rankings for healthier alternatives
+-- Run this in Supabase SQL Editor
+--
+-- One row per barcode, written by the API's background ingest. GET
+-- /alternatives reads the first N rows of a category straight off
+-- idx_category_rankings_rank. updated_at is kept current by a trigger
+-- (supabase_migration_v16_category_rankings_updated_at.sql).
+
+CREATE TABLE IF NOT EXISTS category_rankings (
+  barcode text PRIMARY KEY,
+  category_key text NOT NULL,
+  concern_score int NOT NULL,
+  product_name text,
+  brand text,
+  updated_at timestamptz DEFAULT now()
+);
+
+CREATE INDEX IF NOT EXISTS idx_category_rankings_rank
+  ON category_rankings(category_key, concern_score, barcode);
@@ -0,0 +1,125 @@
+-- Migration v8: Idempotent, conflict-safe product ingestion
+-- Run this in Supabase SQL Editor
+--
+-- The API used to insert products, barcodes and additive links with
+-- separate requests, so two workers missing on the same barcode could
+-- create duplicate products. Ingestion is now one transactional RPC keyed
+-- on the barcode, backed by unique constraints.
+
+BEGIN;
+
+-- 1. Collapse existing duplicates (keep the lowest id)
+--    Barcodes reported by migration v5 as mapping to several products
+--    should be merged by hand before running this; otherwise the
+--    lowest-id mapping wins.
+DELETE FROM barcodes a
+USING barcodes b
+WHERE a.barcode_number = b.barcode_number
+  AND a.id > b.id;
+
+-- Re-point links and rules at the surviving additive row
+CREATE TEMP TABLE additive_merge ON COMMIT DROP AS
+SELECT a.id AS dup_id, keep.id AS keep_id
+FROM additives a
+JOIN LATERAL (
+  SELECT id FROM additives k WHERE k.code = a.code ORDER BY k.id LIMIT 1
+) keep ON keep.id <> a.id;
+
+UPDATE product_additives pa SET additive_id = m.keep_id
+FROM additive_merge m WHERE pa.additive_id = m.dup_id;
+
+UPDATE regulatory_rules r SET additive_id = m.keep_id
+FROM additive_merge m WHERE r.additive_id = m.dup_id;
+
+DELETE FROM additives a USING additive_merge m WHERE a.id = m.dup_id;
+
+DELETE FROM product_additives a
+USING product_additives b
+WHERE a.product_id = b.product_id
+  AND a.additive_id = b.additive_id
+  AND a.id > b.id;
+
+DELETE FROM ingredient_raw a
+USING ingredient_raw b
+WHERE a.product_id = b.product_id
+  AND a.source = b.source
+  AND a.id > b.id;
+
+-- 2. Unique constraints the RPC relies on
+ALTER TABLE barcodes DROP CONSTRAINT IF EXISTS unique_barcode_number;
+ALTER TABLE barcodes ADD CONSTRAINT unique_barcode_number UNIQUE (barcode_number);
+
+ALTER TABLE additives DROP CONSTRAINT IF EXISTS unique_additive_code;
+ALTER TABLE additives ADD CONSTRAINT unique_additive_code UNIQUE (code);
+
+ALTER TABLE product_additives DROP CONSTRAINT IF EXISTS unique_product_additive;
+ALTER TABLE product_additives ADD CONSTRAINT unique_product_additive UNIQUE (product_id, additive_id);
+
+ALTER TABLE ingredient_raw DROP CONSTRAINT IF EXISTS unique_ingredient_source;
+ALTER TABLE ingredient_raw ADD CONSTRAINT unique_ingredient_source UNIQUE (product_id, source);
+
+-- 3. One-call ingest. Concurrent calls for the same barcode serialize on a
+--    transaction-scoped advisory lock and converge on a single product row;
+--    repeated calls update that row in place. Returns the product id.
+CREATE OR REPLACE FUNCTION ingest_product(
+  p_barcode text,
+  p_product_name text,
+  p_brand_name text DEFAULT NULL,
+  p_category text DEFAULT NULL,
+  p_off_product_id text DEFAULT NULL,
+  p_off_url text DEFAULT NULL,
+  p_raw_text text DEFAULT NULL,
+  p_additive_codes text[] DEFAULT '{}',
+  p_source text DEFAULT 'openfoodfacts'
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_product_id uuid;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtextextended('ingest:' || p_barcode, 0));
+
+  SELECT product_id INTO v_product_id
+  FROM barcodes
+  WHERE barcode_number = p_barcode;
+
+  IF v_product_id IS NULL THEN
+    INSERT INTO products (product_name, brand_name, category, off_product_id)
+    VALUES (p_product_name, p_brand_name, p_category, p_off_product_id)
+    RETURNING id INTO v_product_id;
+
+    INSERT INTO barcodes (barcode_number, barcode_type, product_id, source, confidence_score, off_url)
+    VALUES (p_barcode, 'EAN', v_product_id, p_source, 0.8, p_off_url);
+  ELSE
+    UPDATE products
+    SET product_name = p_product_name,
+        brand_name = p_brand_name,
+        category = p_category,
+        off_product_id = coalesce(p_off_product_id, off_product_id)
+    WHERE id = v_product_id;
+  END IF;
+
+  IF p_raw_text IS NOT NULL THEN
+    INSERT INTO ingredient_raw (product_id, raw_text, source)
+    VALUES (v_product_id, p_raw_text, p_source)
+    ON CONFLICT (product_id, source) DO UPDATE SET raw_text = EXCLUDED.raw_text;
+  END IF;
+
+  IF cardinality(p_additive_codes) > 0 THEN
+    INSERT INTO additives (code, name, category)
+    SELECT DISTINCT c, c, 'unknown' FROM unnest(p_additive_codes) AS c
+    ON CONFLICT (code) DO NOTHING;
+
+    INSERT INTO product_additives (product_id, additive_id)
+    SELECT v_product_id, a.id
+    FROM additives a
+    WHERE a.code = ANY (p_additive_codes)
+    ON CONFLICT (product_id, additive_id) DO NOTHING;
+  END IF;
+
+  RETURN v_product_id;
+END;
+$$;
+
+COMMIT;
@@ -0,0 +1,95 @@
+-- Migration v9: Nutrition facts + HFSS verdict stored with the product
+-- Run this in Supabase SQL Editor
+--
+-- Scored once at ingest (backend/nutrition.py) and returned as-is on
+-- cached reads. Backfill products ingested earlier with:
+--   python nutrition.py --backfill
+
+BEGIN;
+
+-- 1. Column
+ALTER TABLE products ADD COLUMN IF NOT EXISTS nutrition jsonb;
+
+-- 2. ingest_product gains p_nutrition (drop the v8 signature so calls
+--    with named parameters stay unambiguous)
+DROP FUNCTION IF EXISTS ingest_product(text, text, text, text, text, text, text, text[], text);
+
+CREATE OR REPLACE FUNCTION ingest_product(
+  p_barcode text,
+  p_product_name text,
+  p_brand_name text DEFAULT NULL,
+  p_category text DEFAULT NULL,
+  p_off_product_id text DEFAULT NULL,
+  p_off_url text DEFAULT NULL,
+  p_raw_text text DEFAULT NULL,
+  p_additive_codes text[] DEFAULT '{}',
+  p_source text DEFAULT 'openfoodfacts',
+  p_nutrition jsonb DEFAULT NULL
+)
+RETURNS uuid
+LANGUAGE plpgsql
+AS $$
+DECLARE
+  v_product_id uuid;
+BEGIN
+  PERFORM pg_advisory_xact_lock(hashtextextended('ingest:' || p_barcode, 0));
+
+  SELECT product_id INTO v_product_id
+  FROM barcodes
+  WHERE barcode_number = p_barcode;
+
+  IF v_product_id IS NULL THEN
+    INSERT INTO products (product_name, brand_name, category, off_product_id, nutrition)
+    VALUES (p_product_name, p_brand_name, p_category, p_off_product_id, p_nutrition)
+    RETURNING id INTO v_product_id;
+
+    INSERT INTO barcodes (barcode_number, barcode_type, product_id, source, confidence_score, off_url)
+    VALUES (p_barcode, 'EAN', v_product_id, p_source, 0.8, p_off_url);
+  ELSE
+    UPDATE products
+    SET product_name = p_product_name,
+        brand_name = p_brand_name,
+        category = p_category,
+        off_product_id = coalesce(p_off_product_id, off_product_id),
+        nutrition = coalesce(p_nutrition, nutrition)
+    WHERE id = v_product_id;
+  END IF;
+
+  IF p_raw_text IS NOT NULL THEN
+    INSERT INTO ingredient_raw (product_id, raw_text, source)
+    VALUES (v_product_id, p_raw_text, p_source)
+    ON CONFLICT (product_id, source) DO UPDATE SET raw_text = EXCLUDED.raw_text;
+  END IF;
+
+  IF cardinality(p_additive_codes) > 0 THEN
+    INSERT INTO additives (code, name, category)
+    SELECT DISTINCT c, c, 'unknown' FROM unnest(p_additive_codes) AS c
+    ON CONFLICT (code) DO NOTHING;
+
+    INSERT INTO product_additives (product_id, additive_id)
+    SELECT v_product_id, a.id
+    FROM additives a
+    WHERE a.code = ANY (p_additive_codes)
+    ON CONFLICT (product_id, additive_id) DO NOTHING;
+  END IF;
+
+  RETURN v_product_id;
+END;
+$$;
+
+-- 3. Bulk write for the backfill: [{"id": ..., "nutrition": {...}}, ...]
+CREATE OR REPLACE FUNCTION set_product_nutrition(p_rows jsonb)
+RETURNS int
+LANGUAGE sql
+AS $$
+  WITH updated AS (
+    UPDATE products p
+    SET nutrition = r.nutrition
+    FROM jsonb_to_recordset(p_rows) AS r(id uuid, nutrition jsonb)
+    WHERE p.id = r.id
+    RETURNING 1
+  )
+  SELECT count(*)::int FROM updated;
+$$;
+
+COMMIT;
@@ -0,0 +1,166 @@
+"""
+Supabase Pool - One process-wide, pooled Supabase client
+
+supabase-py gives every client its own default httpx session (no explicit
+pool sizing, 120 s timeout). This module builds a single shared client
+whose PostgREST session has:
+
+- a bounded connection pool sized for our worker threads
+  (SUPABASE_POOL_SIZE, SUPABASE_POOL_KEEPALIVE)
+- keep-alive reuse (SUPABASE_KEEPALIVE_EXPIRY seconds idle before closing)
+- explicit connect/read/pool timeouts (SUPABASE_*_TIMEOUT)
+- optional HTTP/2 (SUPABASE_HTTP2=true, needs the `h2` package)
+- an instrumented transport so /health can show pool utilization
+
+database.supabase and the FSSAI lookups both use get_supabase(), so
+product_service, ingest workers and jobs share one connection pool.
+"""
+import os
+import threading
+from typing import Optional, Dict, Any
+
+import httpx
+from postgrest import SyncPostgrestClient
+from postgrest.utils import SyncClient
+from supabase import Client
+from supabase.lib.client_options import ClientOptions
+
+
+def _env_float(name: str, default: str) -> float:
+    return float(os.getenv(name, default))
+
+
+class InstrumentedTransport(httpx.HTTPTransport):
+    """
+    HTTP transport that tracks pool pressure. in_flight counts requests
+    holding or waiting for a connection; when it sits at max_connections,
+    or pool_timeouts grows, the pool is too small for the worker count.
+    """
+
+    def __init__(self, **kwargs):
+        super().__init__(**kwargs)
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.pool_timeouts = 0
+
+    def handle_request(self, request: httpx.Request) -> httpx.Response:
+        with self._lock:
+            self.in_flight += 1
+            self.requests += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+        try:
+            return super().handle_request(request)
+        except httpx.PoolTimeout:
+            with self._lock:
+                self.pool_timeouts += 1
+            raise
+        except httpx.TransportError:
+            with self._lock:
+                self.errors += 1
+            raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        # Connection states come from httpcore's pool (no public API for them)
+        connections = list(getattr(self._pool, "connections", []))
+        idle = sum(1 for c in connections if c.is_idle())
+        return {
+            "in_flight": self.in_flight,
+            "peak_in_flight": self.peak_in_flight,
+            "open_connections": len(connections),
+            "idle_connections": idle,
+            "requests": self.requests,
+            "errors": self.errors,
+            "pool_timeouts": self.pool_timeouts,
+        }
+
+
+class PoolConfig:
+    """Pool/timeout settings, read from the environment."""
+
+    def __init__(self):
+        self.max_connections = int(os.getenv("SUPABASE_POOL_SIZE", "32"))
+        self.max_keepalive = int(os.getenv("SUPABASE_POOL_KEEPALIVE", str(self.max_connections)))
+        self.keepalive_expiry = _env_float("SUPABASE_KEEPALIVE_EXPIRY", "30")
+        self.timeout = httpx.Timeout(
+            _env_float("SUPABASE_READ_TIMEOUT", "10"),
+            connect=_env_float("SUPABASE_CONNECT_TIMEOUT", "3"),
+            pool=_env_float("SUPABASE_POOL_TIMEOUT", "5"),
+        )
+        self.http2 = os.getenv("SUPABASE_HTTP2", "false").lower() == "true"
+        if self.http2:
+            try:
+                import h2  # noqa: F401
+            except ImportError:
+                print("⚠️ SUPABASE_HTTP2=true but the h2 package is not installed, using HTTP/1.1")
+                self.http2 = False
+
+    def describe(self) -> Dict[str, Any]:
+        return {
+            "max_connections": self.max_connections,
+            "max_keepalive": self.max_keepalive,
+            "keepalive_expiry_s": self.keepalive_expiry,
+            "http2": self.http2,
+        }
+
+
+class PooledClient(Client):
+    """supabase Client whose PostgREST session uses the shared, instrumented transport."""
+
+    def __init__(self, url: str, key: str, config: PoolConfig):
+        self.pool_config = config
+        self.transport = InstrumentedTransport(
+            http2=config.http2,
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+        )
+        super().__init__(url, key, ClientOptions(postgrest_client_timeout=config.timeout))
+
+    def _init_postgrest_client(self, rest_url, headers, schema, timeout=None) -> SyncPostgrestClient:
+        client = SyncPostgrestClient(rest_url, headers=headers, schema=schema, timeout=timeout)
+        default_session = client.session
+        # Same base URL/headers as the default session, but on our transport.
+        # The client may be re-created (auth events); the transport and its
+        # pool are kept.
+        client.session = SyncClient(
+            base_url=default_session.base_url,
+            headers=default_session.headers,
+            timeout=timeout,
+            transport=self.transport,
+        )
+        default_session.close()
+        return client
+
+    def pool_stats(self) -> Dict[str, Any]:
+        return {**self.pool_config.describe(), **self.transport.stats()}
+
+
+_client: Optional[PooledClient] = None
+_client_lock = threading.Lock()
+
+
+def get_supabase() -> PooledClient:
+    """The process-wide Supabase client (created on first use)."""
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                url = os.getenv("SUPABASE_URL")
+                key = os.getenv("SUPABASE_KEY")
+                if not url or not key:
+                    raise ValueError("Missing SUPABASE_URL or SUPABASE_KEY in environment variables")
+                _client = PooledClient(url, key, PoolConfig())
+    return _client
+
+
+def pool_stats() -> Optional[Dict[str, Any]]:
+    """Pool utilization, or None if no client has been created in this process."""
+    return _client.pool_stats() if _client is not None else None
@@ -0,0 +1,231 @@
+"""
+Synthetic Catalog - Scale-test products and Zipf-distributed scan traffic
+
+Generates products shaped like demo_data.DEMO_PRODUCTS / OFF responses:
+valid EAN-13 barcodes (GS1 India prefix 890), category-typical
+ingredients, additive mixes drawn from fssai_data (banned additives
+are rare, as in real catalogs) and scored nutrition panels. Output is
+deterministic for a given seed, so a catalog and its traffic can be
+regenerated independently.
+
+Traffic is a stream of {"ts", "barcode"} records: Poisson arrivals at a
+target rate, product popularity Zipf-distributed (a few products get most
+scans), plus a configurable share of unknown barcodes that exercise the
+cold path.
+
+Usage:
+    python synthetic_catalog.py catalog -n 1000000 -o catalog.ndjson.gz
+    python synthetic_catalog.py traffic -n 1000000 --requests 200000 --rps 500 -o traffic.ndjson
+
+Load a catalog with PRODUCT_PROVIDERS=local LOCAL_CATALOG_PATH=catalog.ndjson.gz,
+or pad demo mode in-process with DEMO_SYNTHETIC_PRODUCTS=100000.
+"""
+import bisect
+import itertools
+import random
+import sys
+from typing import Optional, Dict, Any, List, Iterator, Tuple
+
+from fssai_data import FSSAI_DATABASE
+from fssai_regulations import BANNED, RESTRICTED
+from gtin import gtin_check_digit
+from nutrition import SOLID, LIQUID, score_nutrition
+
+GS1_INDIA_PREFIX = "890"
+_ITEM_SPACE = 10 ** 9          # 9 digits after the prefix
+_ITEM_STRIDE = 387_420_489     # 3^18, coprime with 10^9: spreads ids over the space
+_UNKNOWN_OFFSET = _ITEM_SPACE // 2
+
+# Relative odds of drawing an additive by FSSAI status
+_STATUS_WEIGHT = {BANNED: 0.02, RESTRICTED: 0.6}
+_DEFAULT_STATUS_WEIGHT = 1.0
+
+# name, typical additive classes, base ingredients, nutrition basis,
+# (sugars, saturated fat, salt) ranges per 100 g/ml
+CATEGORY_TEMPLATES = [
+    ("Biscuits, Sweet biscuits", ("raising agent", "emulsifier", "flour treatment agent", "preservative (Class II)"),
+     ("Wheat Flour (Maida)", "Sugar", "Edible Vegetable Oil (Palm Oil)", "Invert Syrup", "Milk Solids", "Salt"),
+     SOLID, ((15, 35), (6, 14), (0.3, 1.2))),
+    ("Instant noodles, Snacks", ("flavour enhancer", "thickener/stabilizer", "acidity regulator", "colour"),
+     ("Wheat Flour (Maida)", "Palm Oil", "Salt", "Wheat Gluten", "Spices and Condiments"),
+     SOLID, ((1, 5), (6, 10), (2.5, 5.5))),
+    ("Beverages, Fruit drinks", ("preservative (Class II)", "antioxidant", "acidity regulator", "natural colour"),
+     ("Water", "Sugar", "Fruit Pulp", "Black Salt"),
+     LIQUID, ((6, 16), (0, 0.2), (0.05, 0.9))),
+    ("Beverages, Carbonated drinks", ("acidity regulator", "colour", "artificial sweetener", "preservative (Class II)"),
+     ("Carbonated Water", "Sugar", "Natural Flavouring"),
+     LIQUID, ((0, 12), (0, 0.1), (0, 0.1))),
+    ("Snacks, Potato chips", ("flavour enhancer", "acidity regulator", "antioxidant"),
+     ("Potato", "Edible Vegetable Oil (Palmolein)", "Salt", "Sugar", "Onion Powder"),
+     SOLID, ((1, 6), (8, 16), (1.0, 3.0))),
+    ("Confectionery, Candies", ("synthetic colour", "artificial sweetener", "acidity regulator", "emulsifier/stabilizer"),
+     ("Sugar", "Liquid Glucose", "Milk Solids", "Cocoa Butter"),
+     SOLID, ((45, 80), (2, 20), (0.05, 0.5))),
+    ("Breads, White breads", ("flour treatment agent", "preservative", "emulsifier", "raising agent"),
+     ("Wheat Flour (Maida)", "Water", "Yeast", "Sugar", "Salt", "Edible Vegetable Oil"),
+     SOLID, ((3, 8), (0.5, 3), (0.8, 1.6))),
+    ("Sauces, Ketchup", ("preservative (Class II)", "thickener/stabilizer", "acidity regulator", "natural colour"),
+     ("Tomato Paste", "Sugar", "Vinegar", "Salt", "Onion", "Spices"),
+     SOLID, ((15, 30), (0, 0.5), (1.5, 3.5))),
+]
+
+_BRANDS = ["Amrit", "Bharat Foods", "Desi Kitchen", "Ganga", "Himalaya Farms", "Kaveri", "Malabar",
+           "Nilgiri", "Parampara", "Rasoi", "Sahyadri", "Swad", "Tanjore", "Udaya", "Vindhya"]
+_ADJECTIVES = ["Classic", "Masala", "Gold", "Lite", "Royal", "Crunchy", "Tangy", "Original", "Family Pack", "Zesty"]
+
+
+def synthetic_barcode(item: int) -> str:
+    """Valid EAN-13 for catalog item `item` (distinct items never collide)."""
+    body = GS1_INDIA_PREFIX + f"{(item * _ITEM_STRIDE) % _ITEM_SPACE:09d}"
+    return body + str(gtin_check_digit(body))
+
+
+def unknown_barcode(n: int) -> str:
+    """Valid EAN-13 guaranteed not to be in a catalog of fewer than 5e8 items."""
+    return synthetic_barcode(_UNKNOWN_OFFSET + n)
+
+
+def _additive_pools() -> List[Tuple[List[str], List[float]]]:
+    """Per template: candidate codes and cumulative draw weights."""
+    pools = []
+    for _, classes, _, _, _ in CATEGORY_TEMPLATES:
+        codes = sorted(c for c, info in FSSAI_DATABASE.items() if info.get("category") in classes)
+        weights = [_STATUS_WEIGHT.get(FSSAI_DATABASE[c]["fssai_status"], _DEFAULT_STATUS_WEIGHT) for c in codes]
+        pools.append((codes, list(itertools.accumulate(weights))))
+    return pools
+
+
+# ============================================================
+# PRODUCTS
+# ============================================================
+def generate_products(count: int, seed: int = 42) -> Iterator[Dict[str, Any]]:
+    """Yield `count` synthetic products in demo/OFF response shape."""
+    rng = random.Random(seed)
+    pools = _additive_pools()
+
+    for item in range(count):
+        t = rng.randrange(len(CATEGORY_TEMPLATES))
+        category, _, base, basis, ranges = CATEGORY_TEMPLATES[t]
+        codes, cum_weights = pools[t]
+
+        additives: List[str] = []
+        if codes:
+            for code in rng.choices(codes, cum_weights=cum_weights, k=min(len(codes), rng.randint(0, 5))):
+                if code not in additives:
+                    additives.append(code)
+
+        brand = rng.choice(_BRANDS)
+        noun = category.split(", ")[-1].rstrip("s")
+        ingredients = list(base[:rng.randint(2, len(base))])
+        ingredients += [f"{FSSAI_DATABASE[c]['category'].split(' (')[0].title()} ({c})" for c in additives]
+
+        (s_lo, s_hi), (f_lo, f_hi), (n_lo, n_hi) = ranges
+        nutrition = {
+            "basis": basis,
+            "sugars_g": round(rng.uniform(s_lo, s_hi), 1),
+            "saturated_fat_g": round(rng.uniform(f_lo, f_hi), 1),
+            "salt_g": round(rng.uniform(n_lo, n_hi), 2),
+            "nutriscore_grade": None,
+        }
+        nutrition["hfss"] = score_nutrition(nutrition)
+
+        barcode = synthetic_barcode(item)
+        yield {
+            "barcode": barcode,
+            "product_name": f"{brand} {rng.choice(_ADJECTIVES)} {noun} {item % 997}",
+            "brand": brand,
+            "category": category,
+            "ingredients": ", ".join(ingredients),
+            "additives": additives,
+            "flags": [],
+            "nutrition": nutrition,
+        }
+
+
+# ============================================================
+# TRAFFIC
+# ============================================================
+def zipf_cum_weights(n: int, s: float) -> List[float]:
+    """Cumulative Zipf(s) weights for ranks 1..n."""
+    return list(itertools.accumulate(1.0 / (rank ** s) for rank in range(1, n + 1)))
+
+
+def generate_traffic(
+    catalog_size: int,
+    requests: int,
+    zipf_s: float = 1.1,
+    rps: float = 100.0,
+    miss_rate: float = 0.05,
+    seed: int = 7,
+) -> Iterator[Dict[str, Any]]:
+    """Yield {"ts": seconds since start, "barcode"} scan records (rank r -> item r)."""
+    rng = random.Random(seed)
+    cum_weights = zipf_cum_weights(catalog_size, zipf_s)
+    total = cum_weights[-1]
+    ts = 0.0
+    unknown = 0
+    for _ in range(requests):
+        ts += rng.expovariate(rps)
+        if rng.random() < miss_rate:
+            barcode = unknown_barcode(unknown)
+            unknown += 1
+        else:
+            rank = bisect.bisect_left(cum_weights, rng.random() * total)
+            barcode = synthetic_barcode(rank)
+        yield {"ts": round(ts, 4), "barcode": barcode}
+
+
+def load_into_demo(count: int, seed: int = 42) -> int:
+    """Add synthetic products to demo_data.DEMO_PRODUCTS (before indexes are built)."""
+    from demo_data import DEMO_PRODUCTS
+
+    for product in generate_products(count, seed):
+        DEMO_PRODUCTS[product["barcode"]] = product
+    return count
+
+
+# ============================================================
+# CLI
+# ============================================================
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+    from catalog_export import iter_ndjson
+
+    parser = argparse.ArgumentParser(description="Synthetic catalog and traffic for scale testing")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    catalog = sub.add_parser("catalog", help="Write synthetic products as NDJSON")
+    catalog.add_argument("-n", "--products", type=int, default=100_000)
+    catalog.add_argument("--seed", type=int, default=42)
+    catalog.add_argument("-o", "--output", default="-", help="File path or - for stdout (.gz -> gzip)")
+
+    traffic = sub.add_parser("traffic", help="Write a Zipf-distributed scan stream as NDJSON")
+    traffic.add_argument("-n", "--products", type=int, default=100_000, help="Catalog size it targets")
+    traffic.add_argument("--requests", type=int, default=100_000)
+    traffic.add_argument("--zipf", type=float, default=1.1, help="Zipf exponent (higher = more skewed)")
+    traffic.add_argument("--rps", type=float, default=100.0, help="Mean arrival rate")
+    traffic.add_argument("--miss-rate", type=float, default=0.05, help="Share of barcodes not in the catalog")
+    traffic.add_argument("--seed", type=int, default=7)
+    traffic.add_argument("-o", "--output", default="-")
+
+    args = parser.parse_args(argv)
+    if args.command == "catalog":
+        records = generate_products(args.products, args.seed)
+    else:
+        records = generate_traffic(args.products, args.requests, args.zipf, args.rps, args.miss_rate, args.seed)
+
+    gzip = args.output.endswith(".gz")
+    out = sys.stdout.buffer if args.output == "-" else open(args.output, "wb")
+    try:
+        for chunk in iter_ndjson(records, gzip=gzip):
+            out.write(chunk)
+    finally:
+        if out is not sys.stdout.buffer:
+            out.close()
+    if args.output != "-":
+        print(f"✅ Wrote {args.command} to {args.output}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
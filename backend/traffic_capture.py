@@ -0,0 +1,232 @@
+"""
+Traffic Capture - Sampled /product request log and deterministic replay
+
+Recording (API side): with TRAFFIC_CAPTURE_PATH set, a sampled share of
+/product requests is appended to an NDJSON file as
+{"ts", "barcode", "outcome", "latency_ms"}. Nothing identifying the
+client (IP, API key, tokens, headers) is stored. Outcome classes:
+
+    found, not_found, invalid, rate_limited, shed, timeout, error
+
+Replay (CLI): drives a recorded (or synthetic_catalog traffic) file
+against a server at its original pace, scaled by --speed, and reports
+latency percentiles overall and per recorded outcome. Arrivals are
+open-loop: requests start on schedule whether or not earlier ones have
+finished, and latency is measured from the scheduled start so a stalled
+server cannot hide its queueing.
+
+    # Server with local stand-ins for Supabase / OFF
+    PRODUCT_PROVIDERS=local LOCAL_CATALOG_PATH=catalog.ndjson.gz DEMO_MODE=true \\
+        RATE_LIMIT_PER_SEC=0 uvicorn main:app --workers 4
+    python traffic_capture.py replay capture.ndjson --base-url http://localhost:8000 --speed 2
+"""
+import json
+import os
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Optional, Dict, Any, List, Iterator
+
+FOUND = "found"
+NOT_FOUND = "not_found"
+INVALID = "invalid"
+RATE_LIMITED = "rate_limited"
+SHED = "shed"
+TIMEOUT = "timeout"
+ERROR = "error"
+
+_STATUS_OUTCOMES = {400: INVALID, 422: INVALID, 429: RATE_LIMITED, 503: SHED, 504: TIMEOUT}
+
+
+def outcome_for_status(status: int, found: Optional[bool] = None) -> str:
+    """Outcome class for a /product response."""
+    if status == 200:
+        return NOT_FOUND if found is False else FOUND
+    return _STATUS_OUTCOMES.get(status, ERROR)
+
+
+# ============================================================
+# RECORDER
+# ============================================================
+class RequestRecorder:
+    """Appends sampled request records to an NDJSON file (one line per write)."""
+
+    def __init__(self, path: str, sample_rate: float):
+        self.path = path
+        self.sample_rate = sample_rate
+        self.recorded = 0
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # Line-buffered append: each record is one short write, so records
+        # from several uvicorn workers never interleave
+        self._file = open(path, "a", encoding="utf-8", buffering=1)
+        self._lock = threading.Lock()
+
+    def sampled(self) -> bool:
+        return random.random() < self.sample_rate
+
+    def record(self, barcode: str, outcome: str, latency_ms: float):
+        line = json.dumps({
+            "ts": round(time.time(), 3),
+            "barcode": barcode,
+            "outcome": outcome,
+            "latency_ms": round(latency_ms, 2),
+        })
+        with self._lock:
+            self._file.write(line + "\n")
+            self.recorded += 1
+
+    def stats(self) -> Dict[str, Any]:
+        return {"path": self.path, "sample_rate": self.sample_rate, "recorded": self.recorded}
+
+
+def recorder_from_env() -> Optional[RequestRecorder]:
+    """Recorder if TRAFFIC_CAPTURE_PATH is set, else None (capture disabled)."""
+    path = os.getenv("TRAFFIC_CAPTURE_PATH")
+    if not path:
+        return None
+    return RequestRecorder(path, float(os.getenv("TRAFFIC_CAPTURE_SAMPLE_RATE", "0.01")))
+
+
+# ============================================================
+# REPLAY
+# ============================================================
+def load_records(path: str) -> List[Dict[str, Any]]:
+    """Capture or synthetic traffic records, sorted by ts."""
+    import gzip
+
+    opener = gzip.open if path.endswith(".gz") else open
+    with opener(path, "rt", encoding="utf-8") as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    records.sort(key=lambda r: r["ts"])
+    return records
+
+
+def percentiles(values: List[float], points=(50, 90, 99, 99.9)) -> Dict[str, float]:
+    """Nearest-rank percentiles plus max, in the values' unit."""
+    if not values:
+        return {}
+    ordered = sorted(values)
+    result = {}
+    for p in points:
+        rank = max(1, -(-len(ordered) * p // 100))  # ceil
+        result[f"p{p:g}"] = round(ordered[int(rank) - 1], 2)
+    result["max"] = round(ordered[-1], 2)
+    return result
+
+
+def replay(
+    records: List[Dict[str, Any]],
+    base_url: str,
+    speed: float = 1.0,
+    concurrency: int = 64,
+    timeout: float = 30.0,
+) -> Dict[str, Any]:
+    """
+    Replay records at their recorded spacing divided by `speed`.
+
+    Returns a report with overall and per-outcome latency percentiles (ms,
+    from scheduled start), response status counts and schedule lag.
+    """
+    import httpx
+
+    if not records:
+        return {"requests": 0}
+
+    client = httpx.Client(
+        base_url=base_url,
+        timeout=timeout,
+        limits=httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency),
+    )
+    results: List[Optional[tuple]] = [None] * len(records)
+    first_ts = records[0]["ts"]
+    started = time.perf_counter()
+
+    def send(i: int, scheduled: float):
+        record = records[i]
+        sent = time.perf_counter()
+        try:
+            response = client.get("/product", params={"barcode": record["barcode"]})
+            status = response.status_code
+        except httpx.HTTPError:
+            status = 0
+        done = time.perf_counter()
+        results[i] = (record.get("outcome", "unknown"), status, (done - scheduled) * 1000, (sent - scheduled) * 1000)
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        for i, record in enumerate(records):
+            scheduled = started + (record["ts"] - first_ts) / speed
+            delay = scheduled - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            pool.submit(send, i, scheduled)
+    elapsed = time.perf_counter() - started
+    client.close()
+
+    by_outcome: Dict[str, List[float]] = {}
+    statuses: Dict[str, int] = {}
+    lags = []
+    for outcome, status, latency, lag in results:
+        by_outcome.setdefault(outcome, []).append(latency)
+        statuses[str(status)] = statuses.get(str(status), 0) + 1
+        lags.append(lag)
+
+    return {
+        "requests": len(records),
+        "duration_s": round(elapsed, 2),
+        "throughput_rps": round(len(records) / elapsed, 1),
+        "speed": speed,
+        "latency_ms": percentiles([r[2] for r in results]),
+        "latency_ms_by_outcome": {k: percentiles(v) for k, v in sorted(by_outcome.items())},
+        "status_counts": statuses,
+        "schedule_lag_ms": percentiles(lags),
+    }
+
+
+# ============================================================
+# CLI
+# ============================================================
+def main(argv: Optional[List[str]] = None) -> int:
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Replay captured /product traffic and report latency")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    rep = sub.add_parser("replay", help="Drive a capture file against a server")
+    rep.add_argument("capture", help="NDJSON capture (or synthetic traffic) file, .gz ok")
+    rep.add_argument("--base-url", default="http://localhost:8000")
+    rep.add_argument("--speed", type=float, default=1.0, help="Time scale: 2 = twice as fast as recorded")
+    rep.add_argument("--concurrency", type=int, default=64, help="Max in-flight requests")
+    rep.add_argument("--limit", type=int, help="Replay only the first N records")
+
+    summary = sub.add_parser("summary", help="Outcome mix and recorded latency of a capture file")
+    summary.add_argument("capture")
+
+    args = parser.parse_args(argv)
+    records = load_records(args.capture)
+
+    if args.command == "summary":
+        mix: Dict[str, int] = {}
+        for r in records:
+            mix[r.get("outcome", "unknown")] = mix.get(r.get("outcome", "unknown"), 0) + 1
+        span = records[-1]["ts"] - records[0]["ts"] if records else 0
+        report = {
+            "requests": len(records),
+            "span_s": round(span, 1),
+            "distinct_barcodes": len({r["barcode"] for r in records}),
+            "outcomes": mix,
+            "recorded_latency_ms": percentiles([r["latency_ms"] for r in records if "latency_ms" in r]),
+        }
+    else:
+        if args.limit:
+            records = records[:args.limit]
+        print(f"🔄 Replaying {len(records)} requests against {args.base_url} at {args.speed}x", file=sys.stderr)
+        report = replay(records, args.base_url, speed=args.speed, concurrency=args.concurrency)
+
+    print(json.dumps(report, indent=2))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,121 @@
+"""
+User Scans Service - Per-user scan history and analytics
+
+History is keyset-paginated (supabase_migration_v3_user_analytics.sql)
+and stats read the trigger-maintained weekly rollup
+(supabase_migration_v4_weekly_rollups.sql), so response size and
+latency stay flat no matter how long a user's history gets.
+
+Every call forwards the caller's Supabase access token, so the RPCs
+run under the user's identity and Row Level Security still applies.
+"""
+import base64
+import uuid
+from datetime import date, datetime
+from typing import Optional, Dict, Any, List, Tuple, Callable
+from database import supabase
+
+MAX_PAGE_SIZE = 100
+MAX_STATS_WEEKS = 52
+VALID_INTENTS = {"checked", "consumed", "avoided", "purchased"}
+
+
+# ============================================================
+# CURSOR ENCODING
+# ============================================================
+def encode_cursor(sort_value: str, row_id: str) -> str:
+    """Encode a (sort key, id) pair into an opaque URL-safe cursor."""
+    raw = f"{sort_value}|{row_id}".encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor: str, parse_sort: Callable[[str], Any] = datetime.fromisoformat) -> Tuple[str, str]:
+    """
+    Decode a cursor produced by encode_cursor. The sort key must parse with
+    `parse_sort` and the id must be a UUID, so a tampered cursor is a 400
+    rather than a database error. Raises ValueError if malformed.
+    """
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        sort_value, row_id = base64.urlsafe_b64decode(padded).decode("utf-8").split("|", 1)
+        parse_sort(sort_value)
+        row_id = str(uuid.UUID(row_id))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return sort_value, row_id
+
+
+# ============================================================
+# RPC HELPER
+# ============================================================
+def _rpc_as_user(access_token: str, fn: str, params: Dict[str, Any]):
+    """Call a Postgres function with the user's JWT instead of the service key."""
+    query = supabase.rpc(fn, params)
+    query.headers["Authorization"] = f"Bearer {access_token}"
+    return query.execute()
+
+
+def _page(rows: List[dict], limit: int, sort_field: str) -> Dict[str, Any]:
+    """Trim the look-ahead row and build the next cursor."""
+    has_more = len(rows) > limit
+    items = rows[:limit]
+    next_cursor = None
+    if has_more and items:
+        last = items[-1]
+        next_cursor = encode_cursor(str(last[sort_field]), str(last["id"]))
+    return {"items": items, "next_cursor": next_cursor}
+
+
+# ============================================================
+# SCAN HISTORY
+# ============================================================
+def get_scan_history(
+    access_token: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+    intent: Optional[str] = None,
+) -> Dict[str, Any]:
+    """
+    One page of the user's scans, newest first.
+
+    Returns:
+        {"items": [...], "next_cursor": str | None}
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    params = {"p_limit": limit + 1, "p_intent": intent}
+    if cursor:
+        params["p_before_scanned_at"], params["p_before_id"] = decode_cursor(cursor)
+
+    result = _rpc_as_user(access_token, "user_scan_history", params)
+    return _page(result.data or [], limit, "scanned_at")
+
+
+# ============================================================
+# PURCHASE HISTORY
+# ============================================================
+def get_purchase_history(
+    access_token: str,
+    limit: int = 20,
+    cursor: Optional[str] = None,
+) -> Dict[str, Any]:
+    """One page of the user's purchases, most recent purchase_date first."""
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    params = {"p_limit": limit + 1}
+    if cursor:
+        params["p_before_purchase_date"], params["p_before_id"] = decode_cursor(cursor, date.fromisoformat)
+
+    result = _rpc_as_user(access_token, "user_purchase_history", params)
+    return _page(result.data or [], limit, "purchase_date")
+
+
+# ============================================================
+# AGGREGATED STATS
+# ============================================================
+def get_scan_stats(access_token: str, weeks: int = 4) -> Dict[str, Any]:
+    """
+    Weekly scan/purchase counts, verdict mix and intents for the last N weeks.
+    Served from user_scan_weekly: O(weeks) rows, independent of scan count.
+    """
+    weeks = max(1, min(weeks, MAX_STATS_WEEKS))
+    result = _rpc_as_user(access_token, "user_scan_stats", {"p_weeks": weeks})
+    return result.data or {}